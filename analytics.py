@@ -0,0 +1,1423 @@
+"""Logika data dan analitik dashboard Perilaku Belanja, tanpa ketergantungan pada Streamlit.
+
+Modul ini memuat dan memproses CSV, membangun cube pra-agregasi beserta indeks bitmap filternya,
+menghitung agregat per tab, dan membuat teks kesimpulan. `app.py` hanya menambahkan cache Streamlit
+dan tampilan di atasnya, sehingga setiap tahap dapat diuji dan di-benchmark secara headless.
+"""
+import contextlib
+import copy
+import hashlib
+import io
+import json
+import math
+import os
+import pickle
+from collections import OrderedDict
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from profiling import profiled, stage
+from sketches import Z_95, CountMinSketch, HyperLogLog, QuantileSketch, Reservoir
+
+
+# --- Indeks Bitmap untuk Filter Sidebar ---
+FILTER_COLUMNS = ['Gender', 'Category', 'Season', 'Location', 'Payment Method']
+
+
+def build_filter_index(df):
+    """Membangun bitmap (bitset terpaket) per nilai untuk setiap kolom filter dan indeks usia terurut."""
+    bitmaps = {}
+    for col in FILTER_COLUMNS:
+        codes, uniques = pd.factorize(df[col])
+        bitmaps[col] = {value: np.packbits(codes == i) for i, value in enumerate(uniques)}
+
+    ages = df['Age'].to_numpy()
+    age_order = np.argsort(ages, kind='stable')
+
+    return {
+        'n_rows': len(df),
+        'bitmaps': bitmaps,
+        'age_order': age_order,
+        'age_sorted': ages[age_order],
+    }
+
+
+def _age_bitmap(index, age_range):
+    """Bitmap baris dengan usia di dalam rentang (inklusif), via pencarian biner pada usia terurut."""
+    lo = np.searchsorted(index['age_sorted'], age_range[0], side='left')
+    hi = np.searchsorted(index['age_sorted'], age_range[1], side='right')
+    mask = np.zeros(index['n_rows'], dtype=bool)
+    mask[index['age_order'][lo:hi]] = True
+    return np.packbits(mask)
+
+
+def query_filter_index(index, selections, age_range):
+    """Menggabungkan bitmap: OR antar nilai terpilih dalam satu kolom, AND antar kolom dan rentang usia."""
+    result = _age_bitmap(index, age_range)
+    for col, values in selections.items():
+        bitmaps = index['bitmaps'][col]
+        values = set(values)
+        # Semua nilai dipilih -> kolom ini tidak menyaring apa pun
+        if values.issuperset(bitmaps):
+            continue
+        col_bits = np.zeros_like(result)
+        for value in values:
+            if value in bitmaps:
+                np.bitwise_or(col_bits, bitmaps[value], out=col_bits)
+        np.bitwise_and(result, col_bits, out=result)
+    return result
+
+
+def filter_rows(df, index, selections, age_range, output='frame'):
+    """Mengembalikan hasil filter sebagai array posisi baris (output='rows') atau DataFrame (output='frame')."""
+    bits = query_filter_index(index, selections, age_range)
+    rows = np.flatnonzero(np.unpackbits(bits, count=index['n_rows']))
+    if output == 'rows':
+        return rows
+    return df.iloc[rows]
+
+
+# --- Preprocessing Kelompok Usia ---
+def add_age_groups(frame, compact=False, max_age=None):
+    """Menambahkan kolom 'Age Group' 10 tahunan (Plot 1) dan 'Age Group_Bar' rentang khusus (Plot 6).
+
+    Pada mode kompak 'Age Group' dibiarkan sebagai kategori (kode kecil), bukan string. `max_age` menetapkan
+    rentang bin dari luar (mis. usia maksimum seluruh dataset saat `frame` hanya sebagian hasil query).
+    """
+    # Preprocessing: Membuat kolom 'Age Group' 10 tahunan (Plot 1)
+    if max_age is None:
+        max_age = int(frame['Age'].max())
+    age_group = pd.cut(
+        frame['Age'],
+        bins=range(0, max_age + 11, 10),
+        right=False,
+        labels=[f'{i}-{i+9}' for i in range(0, max_age + 1, 10) if i <= max_age]
+    )
+    frame['Age Group'] = age_group if compact else age_group.astype(str)
+
+    # Preprocessing: Membuat kolom 'Age Group' rentang khusus (Plot 6)
+    bins_bar = [18, 25, 35, 45, 55, 65, 100]
+    labels_bar = ['18-25', '26-35', '36-45', '46-55', '56-65', '65+']
+    frame['Age Group_Bar'] = pd.cut(frame['Age'], bins=bins_bar, labels=labels_bar, right=False)
+    return frame
+
+
+# --- Data Cube Pra-agregasi ---
+# Usia disimpan per tahun agar slider usia tetap tepat; kelompok usia diturunkan darinya.
+# 'First Row' adalah posisi baris pertama sel di file sumber: nilai yang seri di peringkat kesimpulan
+# diurutkan menurut kemunculan pertamanya, sama seperti value_counts() pada baris mentah.
+CUBE_DIMS = ['Gender', 'Category', 'Season', 'Location', 'Payment Method', 'Age']
+
+
+def aggregate_cube(frame):
+    """Jumlah transaksi, total pembelian, dan posisi baris pertama untuk setiap kombinasi dimensi cube di `frame`.
+
+    Posisi baris diambil dari index `frame`, yaitu posisi baris di file sumber (RangeIndex read_csv).
+    """
+    cells = frame[CUBE_DIMS + ['Purchase Amount (USD)']].assign(**{'First Row': frame.index.to_numpy(np.int64)})
+    return (
+        cells.groupby(CUBE_DIMS, observed=True)
+        .agg(**{
+            'Count': ('Purchase Amount (USD)', 'size'),
+            'Purchase Sum': ('Purchase Amount (USD)', 'sum'),
+            'First Row': ('First Row', 'min'),
+        })
+        .reset_index()
+    )
+
+
+def merge_cubes(parts):
+    """Menggabungkan cube parsial (mis. per chunk): Count dan Purchase Sum dijumlahkan, First Row diambil minimumnya."""
+    return (
+        pd.concat(parts, ignore_index=True)
+        .groupby(CUBE_DIMS, observed=True, as_index=False)
+        .agg({'Count': 'sum', 'Purchase Sum': 'sum', 'First Row': 'min'})
+    )
+
+
+def finish_cube(cube, compact=False, max_age=None):
+    """Melengkapi cube mentah: dimensi teks menjadi kategori (mode kompak) dan kolom kelompok usia diturunkan dari Age."""
+    if compact:
+        cube = cube.astype({col: 'category' for col in FILTER_COLUMNS} | {'Age': 'uint8'})
+    return add_age_groups(cube, compact=compact, max_age=max_age)
+
+
+def build_cube(df, executor=None):
+    """Cube lengkap dari frame terproses, termasuk kolom kelompok usia yang diturunkan dari dimensi Age.
+
+    Dengan `executor`, frame besar diagregasi per rentang baris di process pool lalu digabung (`merge_cubes`).
+    """
+    compact = isinstance(df['Age Group'].dtype, pd.CategoricalDtype)
+    if executor is None:
+        cube = aggregate_cube(df)
+    else:
+        parts = executor.map_frame(aggregate_cube, df[CUBE_DIMS + ['Purchase Amount (USD)']])
+        cube = merge_cubes(parts) if len(parts) > 1 else parts[0]
+    return finish_cube(cube, compact=compact)
+
+
+def cube_total(cube_slice):
+    """Jumlah transaksi dalam irisan cube (DataFrame atau CubeSelection)."""
+    if isinstance(cube_slice, CubeSelection):
+        return cube_slice.total()
+    return int(cube_slice['Count'].sum())
+
+
+def cube_counts(cube_slice, by):
+    """Jumlah transaksi per nilai `by` dari irisan cube (setara value_counts/groupby().size() pada baris)."""
+    if isinstance(cube_slice, CubeSelection):
+        return cube_slice.counts(by)
+    return cube_slice.groupby(by, observed=True)['Count'].sum()
+
+
+def cube_first_rows(cube_slice, by):
+    """Posisi baris pertama per nilai `by` dari irisan cube (urutan kemunculan pertama, seperti value_counts)."""
+    if isinstance(cube_slice, CubeSelection):
+        return cube_slice.first_rows(by)
+    return cube_slice.groupby(by, observed=True)['First Row'].min()
+
+
+def cube_mean_pivot(cube_slice, index, columns, values='Purchase Sum'):
+    """Rata-rata `values` per index x columns dari pasangan total/jumlah (setara pivot_table aggfunc='mean')."""
+    if isinstance(cube_slice, CubeSelection):
+        return cube_slice.mean_pivot(index, columns, values)
+    sums = cube_slice.groupby([index, columns], observed=True)[[values, 'Count']].sum()
+    return (sums[values] / sums['Count']).unstack(columns)
+
+
+# --- Seleksi Cube Tanpa Salinan ---
+# Hasil filter disimpan sebagai array posisi sel di atas cube bersama; agregat dihitung dengan np.bincount
+# pada id grup yang dihitung sekali per dataset, sehingga tidak ada salinan kolom per sesi.
+GROUPINGS = [
+    'Age Group', 'Location', 'Category', 'Payment Method',
+    ('Category', 'Location'), ('Age Group_Bar', 'Category'), ('Category', 'Season'),
+]
+
+
+def build_cube_groups(cube):
+    """Id grup per sel cube (urutan sama dengan groupby terurut) dan index hasil groupby penuh, per pengelompokan."""
+    groups = {}
+    for by in GROUPINGS:
+        grouped = cube.groupby(list(by) if isinstance(by, tuple) else by, observed=True)
+        groups[by] = (grouped.ngroup().to_numpy(np.int32), grouped['Count'].sum().index)
+    return groups
+
+
+class CubeSelection:
+    """Irisan cube ringan: posisi sel terpilih di atas cube bersama, tanpa menyalin kolomnya.
+
+    Dengan `executor`, seleksi yang besar dijumlahkan per partisi posisi lalu total parsialnya digabung.
+    """
+
+    def __init__(self, cube, rows, groups, executor=None):
+        self.cube = cube
+        self.rows = rows
+        self.groups = groups
+        self.executor = executor
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def empty(self):
+        return len(self.rows) == 0
+
+    def frame(self):
+        """Materialisasi irisan sebagai DataFrame; hanya untuk tampilan yang butuh sel mentah."""
+        return self.cube.iloc[self.rows]
+
+    def _column(self, name):
+        return self.cube[name].to_numpy()[self.rows]
+
+    def _partials(self, partial):
+        """`partial(slice)` atas seluruh seleksi, atau per partisi posisi bila ada executor."""
+        if self.executor is None:
+            return [partial(slice(None))]
+        return self.executor.map_partitions(partial, len(self.rows))
+
+    def _sums(self, by, values):
+        """Total `values` per grup `by` yang muncul di seleksi, beserta index grupnya."""
+        ids, index = self.groups[by]
+        columns = [self.cube[name].to_numpy() for name in values]
+
+        def partial(part):
+            rows = self.rows[part]
+            part_ids = ids[rows]
+            return [np.bincount(part_ids, minlength=len(index))] + [
+                np.bincount(part_ids, weights=column[rows], minlength=len(index)) for column in columns]
+
+        parts = self._partials(partial)
+        # Total parsial berupa bilangan bulat (float eksak), jadi penjumlahan berurutan ini identik dengan jalur serial
+        totals = [np.sum(column, axis=0) for column in zip(*parts)]
+        present = totals[0] > 0
+        sums = dict(zip(values, totals[1:]))
+        index = index[present]
+        # Seperti groupby pada irisan: level MultiIndex dibangun ulang dari nilai yang muncul saja (terurut)
+        if isinstance(index, pd.MultiIndex):
+            levels = [pd.factorize(index.get_level_values(i), sort=True) for i in range(index.nlevels)]
+            index = pd.MultiIndex(
+                levels=[uniques for _, uniques in levels], codes=[codes for codes, _ in levels], names=index.names)
+        return {name: total[present] for name, total in sums.items()}, index
+
+    def total(self):
+        return int(self._column('Count').sum())
+
+    def counts(self, by):
+        by = tuple(by) if isinstance(by, list) else by
+        sums, index = self._sums(by, ['Count'])
+        return pd.Series(sums['Count'].astype(np.int64), index=index, name='Count')
+
+    def mean_pivot(self, index, columns, values='Purchase Sum'):
+        sums, group_index = self._sums((index, columns), [values, 'Count'])
+        return pd.Series(sums[values] / sums['Count'], index=group_index).unstack(columns)
+
+    def first_rows(self, by):
+        """Minimum 'First Row' per grup `by` (satu level) yang muncul di seleksi."""
+        ids, index = self.groups[by]
+        first = self.cube['First Row'].to_numpy()
+        missing = np.iinfo(np.int64).max
+
+        def partial(part):
+            rows = self.rows[part]
+            result = np.full(len(index), missing, dtype=np.int64)
+            np.minimum.at(result, ids[rows], first[rows])
+            return result
+
+        result = np.minimum.reduce(self._partials(partial))
+        present = result != missing
+        return pd.Series(result[present], index=index[present], name='First Row')
+
+
+def select_cube(data, selections, age_range, executor=None):
+    """Seleksi cube untuk state filter: posisi sel dari indeks bitmap, dibungkus sebagai CubeSelection."""
+    rows = filter_rows(data['cube'], data['cube_index'], selections, age_range, output='rows')
+    return CubeSelection(data['cube'], rows, data['cube_groups'], executor)
+
+
+# --- Graf Filter Inkremental ---
+# Per sesi: state filter -> mask per kolom (dan usia) -> mask gabungan -> seleksi -> agregat -> kesimpulan.
+# Saat rerun hanya node yang inputnya berubah yang dihitung ulang. Nilai satu kolom saling lepas per sel cube,
+# sehingga menambah nilai = OR satu bitmap dan menghapus nilai = XOR bitmap yang sama; rentang usia
+# hanya membalik sel di antara batas lama dan baru. Bila mask gabungan sama dengan yang pernah dilihat
+# (mis. slider dikembalikan ke posisi semula), konteks agregasi beserta kesimpulannya dipakai ulang.
+class FilterGraph:
+    """Graf dependensi filter untuk satu sesi dashboard di atas cube dan indeks bitmapnya.
+
+    `update()` membandingkan state filter baru dengan state sebelumnya lalu memperbarui mask secara
+    inkremental; `history` membatasi jumlah konteks agregasi (per mask gabungan) yang disimpan.
+    Graf hanya menyimpan versi dataset, mask, dan state filter: paket data diberikan ke setiap
+    `update()`, sehingga graf di session_state tidak menahan paket data sendiri.
+    """
+
+    def __init__(self, version, executor=None, history=8):
+        self.version = version
+        self.executor = executor
+        self.history = history
+        self.selections = None
+        self.age_range = None
+        self.masks = {}
+        self.contexts = OrderedDict()
+        self.last_update = {}
+
+    @staticmethod
+    def _value_bits(index, col, values):
+        bitmaps = index['bitmaps'][col]
+        return [bitmaps[value] for value in values if value in bitmaps]
+
+    def _column_mask(self, index, col, old, new):
+        """Mask kolom `col`: dibangun dari nol pada update pertama, selanjutnya hanya nilai yang berubah."""
+        if old is None:
+            mask = np.zeros((index['n_rows'] + 7) // 8, dtype=np.uint8)
+            for bits in self._value_bits(index, col, new):
+                np.bitwise_or(mask, bits, out=mask)
+            return mask
+        mask = self.masks[col].copy()
+        for bits in self._value_bits(index, col, new - old):
+            np.bitwise_or(mask, bits, out=mask)
+        for bits in self._value_bits(index, col, old - new):
+            np.bitwise_xor(mask, bits, out=mask)
+        return mask
+
+    def _age_mask(self, index, age_range):
+        if self.age_range is None:
+            return _age_bitmap(index, age_range)
+        ages = index['age_sorted']
+        old = [np.searchsorted(ages, self.age_range[0], 'left'), np.searchsorted(ages, self.age_range[1], 'right')]
+        new = [np.searchsorted(ages, age_range[0], 'left'), np.searchsorted(ages, age_range[1], 'right')]
+        delta = np.zeros(index['n_rows'], dtype=bool)
+        # Selisih simetris dua rentang = rentang antar batas bawah XOR rentang antar batas atas
+        for a, b in zip(old, new):
+            delta[index['age_order'][min(a, b):max(a, b)]] ^= True
+        return np.bitwise_xor(self.masks['Age'], np.packbits(delta))
+
+    def update(self, data, selections, age_range, key=None):
+        """Menerapkan state filter baru pada `data`; mengembalikan AggregationContext untuk mask gabungannya."""
+        if data['version'] != self.version:
+            raise ValueError(f"FilterGraph untuk versi {self.version}, bukan {data['version']}")
+        index = data['cube_index']
+        selections = {col: frozenset(selections[col]) for col in FILTER_COLUMNS}
+        age_range = (int(age_range[0]), int(age_range[1]))
+        changed = [
+            col for col in FILTER_COLUMNS
+            if self.selections is None or selections[col] != self.selections[col]
+        ]
+        for col in changed:
+            self.masks[col] = self._column_mask(index, col, self.selections and self.selections[col], selections[col])
+        if age_range != self.age_range:
+            self.masks['Age'] = self._age_mask(index, age_range)
+            changed.append('Age')
+        self.selections, self.age_range = selections, age_range
+
+        mask = self.masks['Age'].copy()
+        for col in FILTER_COLUMNS:
+            np.bitwise_and(mask, self.masks[col], out=mask)
+        digest = hashlib.blake2b(mask.tobytes(), digest_size=16).digest()
+        ctx = self.contexts.get(digest)
+        self.last_update = {'changed': len(changed), 'reused': ctx is not None}
+        if ctx is None:
+            rows = np.flatnonzero(np.unpackbits(mask, count=index['n_rows']))
+            selection = CubeSelection(data['cube'], rows, data['cube_groups'], self.executor)
+            ctx = AggregationContext(selection, key=key, executor=self.executor)
+            self.contexts[digest] = ctx
+            while len(self.contexts) > self.history:
+                self.contexts.popitem(last=False)
+        self.contexts.move_to_end(digest)
+        return ctx
+
+
+# --- Konteks Agregasi per Filter ---
+# Setiap agregat bernama dihitung dari irisan cube; grafik dan kesimpulan membaca dari sini.
+AGGREGATES = {
+    'total': cube_total,
+    'age_group_counts': lambda s: cube_counts(s, 'Age Group'),
+    'location_counts': lambda s: cube_counts(s, 'Location'),
+    'category_counts': lambda s: cube_counts(s, 'Category'),
+    'payment_counts': lambda s: cube_counts(s, 'Payment Method'),
+    'category_location_counts': lambda s: cube_counts(s, ['Category', 'Location']),
+    'age_bar_category_counts': lambda s: cube_counts(s, ['Age Group_Bar', 'Category']),
+    'category_season_mean': lambda s: cube_mean_pivot(s, 'Category', 'Season'),
+    'category_distinct': lambda s: len(cube_counts(s, 'Category')),
+    'location_distinct': lambda s: len(cube_counts(s, 'Location')),
+    # Urutan kemunculan pertama, untuk memecah nilai seri pada peringkat kesimpulan (top_k(..., first=))
+    'age_group_first': lambda s: cube_first_rows(s, 'Age Group'),
+    'location_first': lambda s: cube_first_rows(s, 'Location'),
+    'category_first': lambda s: cube_first_rows(s, 'Category'),
+    'payment_first': lambda s: cube_first_rows(s, 'Payment Method'),
+}
+
+
+class AggregationContext:
+    """Menghitung agregat bernama secara malas dan menyimpannya, sehingga tiap agregat dihitung sekali per filter."""
+
+    approximate = False
+
+    def __init__(self, cube_slice, key=None, executor=None, materialized=None):
+        self.cube_slice = cube_slice
+        self.key = key
+        self.executor = executor
+        # Entri view termaterialisasi (read_view_store) mengisi agregat dan kesimpulan tanpa menghitung ulang
+        self._results = dict(materialized['aggregates']) if materialized else {}
+        self._conclusions = dict(materialized['conclusions']) if materialized else {}
+
+    @property
+    def empty(self):
+        if self.cube_slice is None:
+            # Konteks dari view termaterialisasi tanpa irisan cube
+            return self['total'] == 0
+        return self.cube_slice.empty
+
+    def __getitem__(self, name):
+        if name not in self._results:
+            with stage(f'aggregate:{name}') as s:
+                self._results[name] = AGGREGATES[name](self.cube_slice)
+                s.set(rows=len(self.cube_slice))
+        return self._results[name]
+
+    def compute(self, names):
+        """Menghitung beberapa agregat sekaligus, bersamaan bila ada executor; hasilnya sama dengan jalur serial."""
+        pending = [name for name in dict.fromkeys(names) if name not in self._results]
+        if self.executor is None or len(pending) < 2:
+            for name in pending:
+                self[name]
+            return
+        with stage('aggregate:parallel') as s:
+            results = self.executor.map(lambda name: AGGREGATES[name](self.cube_slice), pending)
+            # Disimpan dari thread pemanggil, per nama, sehingga urutan selesai worker tidak berpengaruh
+            self._results.update(zip(pending, results))
+            s.set(rows=len(self.cube_slice), aggregates=len(pending))
+
+    def conclusion(self, fn, *args):
+        """Teks `fn(ctx, *args)` (generate_conclusion_*), dihitung sekali per filter."""
+        key = (fn.__name__, *args)
+        if key not in self._conclusions:
+            self._conclusions[key] = fn(self, *args)
+        return self._conclusions[key]
+
+
+# --- Top-K (Seleksi Parsial) ---
+# Peringkat untuk tab dan kesimpulan tanpa mengurutkan seluruh tabel: nilai ke-k dicari dengan np.partition
+# (O(n)), lalu hanya kandidat yang >= nilai itu yang diurutkan. Nilai sama diurutkan menurut posisi asal,
+# sehingga top-1 sama dengan idxmax() dan top-k sama dengan sort_values(kind='stable').head(k); dengan
+# `first` (agregat *_first) nilai sama diurutkan menurut kemunculan pertamanya, seperti value_counts().head(k).
+def _top_positions(values, k, ties=False, tiebreak=None):
+    """Posisi k nilai terbesar (menurun, seri menurut `tiebreak` atau posisi asal).
+
+    `ties=True` menyertakan semua yang seri dengan ke-k.
+    """
+    n = len(values)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = np.partition(values, n - k)[n - k]
+        candidates = np.flatnonzero(values >= kth)
+    else:
+        candidates = np.arange(n)
+    # lexsort: kunci terakhir paling utama (nilai menurun), lalu kunci seri (posisi asal) menaik
+    secondary = candidates if tiebreak is None else tiebreak[candidates]
+    order = candidates[np.lexsort((secondary, -values[candidates]))]
+    return order if ties else order[:k]
+
+
+def top_k(counts, k, ties=False, first=None):
+    """k baris teratas dari Series (mis. hasil cube_counts) dalam urutan peringkat.
+
+    `first` adalah posisi baris pertama per label (agregat *_first); None pada mode perkiraan.
+    """
+    tiebreak = None if first is None else first.reindex(counts.index).to_numpy()
+    return counts.iloc[_top_positions(counts.to_numpy(), k, ties, tiebreak)]
+
+
+def top_k_per_group(counts, level, k, ties=False):
+    """k baris teratas per nilai level `level` dari Series ber-MultiIndex; grup terurut, peringkat di dalam grup."""
+    if counts.empty:
+        return counts
+    codes, _ = pd.factorize(counts.index.get_level_values(level), sort=True)
+    values = counts.to_numpy()
+    members = np.argsort(codes, kind='stable')
+    bounds = np.cumsum(np.bincount(codes))
+    positions = [
+        group[_top_positions(values[group], k, ties)]
+        for group in np.split(members, bounds[:-1])
+    ]
+    return counts.iloc[np.concatenate(positions)]
+
+
+def make_filter_key(selections, age_range):
+    """Kunci ternormalisasi untuk state filter: nilai terpilih terurut per kolom plus rentang usia."""
+    return (
+        tuple((col, tuple(sorted(str(v) for v in selections[col]))) for col in sorted(selections)),
+        (int(age_range[0]), int(age_range[1])),
+    )
+
+
+# --- Mapping Dictionaries untuk Plot Peta ---
+US_STATE_ABBR = {
+    "Alabama":"AL","Alaska":"AK","Arizona":"AZ","Arkansas":"AR","California":"CA",
+    "Colorado":"CO","Connecticut":"CT","Delaware":"DE","Florida":"FL","Georgia":"GA",
+    "Hawaii":"HI","Idaho":"ID","Illinois":"IL","Indiana":"IN","Iowa":"IA",
+    "Kansas":"KS","Kentucky":"KY","Louisiana":"LA","Maine":"ME","Maryland":"MD",
+    "Massachusetts":"MA","Michigan":"MI","Minnesota":"MN","Mississippi":"MS","Missouri":"MO",
+    "Montana":"MT","Nebraska":"NE","Nevada":"NV","New Hampshire":"NH","New Jersey":"NJ",
+    "New Mexico":"NM","New York":"NY","North Carolina":"NC","North Dakota":"ND","Ohio":"OH",
+    "Oklahoma":"OK","Oregon":"OR","Pennsylvania":"PA","Rhode Island":"RI","South Carolina":"SC",
+    "South Dakota":"SD","Tennessee":"TN","Texas":"TX","Utah":"UT","Vermont":"VT",
+    "Virginia":"VA","Washington":"WA","West Virginia":"WV","Wisconsin":"WI","Wyoming":"WY",
+    "District of Columbia":"DC"
+}
+
+STATE_CENTROIDS = {
+    'AL': (32.806671, -86.791130), 'AK': (61.370716, -152.404419), 'AZ': (33.729759, -111.431221),
+    'AR': (34.969704, -92.373123), 'CA': (36.116203, -119.681564), 'CO': (39.059811, -105.311104),
+    'CT': (41.597782, -72.755371), 'DE': (39.318523, -75.507141), 'FL': (27.766279, -81.686783),
+    'GA': (33.040619, -83.643074), 'HI': (21.094318, -157.498337), 'ID': (44.240459, -114.478828),
+    'IL': (40.349457, -88.986137), 'IN': (39.849426, -86.258278), 'IA': (42.011539, -93.210526),
+    'KS': (38.526600, -96.726486), 'KY': (37.668140, -84.670067), 'LA': (31.169546, -91.867805),
+    'ME': (44.693947, -69.381927), 'MD': (39.063946, -76.802101), 'MA': (42.230171, -71.530106),
+    'MI': (43.326618, -84.536095), 'MN': (45.694454, -93.900192), 'MS': (32.741646, -89.678696),
+    'MO': (38.456085, -92.288368), 'MT': (46.921925, -110.454353), 'NE': (41.125370, -98.268082),
+    'NV': (38.313515, -117.055374), 'NH': (43.452492, -71.563896), 'NJ': (40.298904, -74.521011),
+    'NM': (34.840515, -106.248482), 'NY': (42.165726, -74.948051), 'NC': (35.630066, -79.806419),
+    'ND': (47.528912, -99.784012), 'OH': (40.388783, -82.764915), 'OK': (35.565342, -96.928917),
+    'OR': (44.572021, -122.070938), 'PA': (40.590752, -77.209755), 'RI': (41.680893, -71.511780),
+    'SC': (33.856892, -80.945007), 'SD': (44.299782, -99.438828), 'TN': (35.747845, -86.692345),
+    'TX': (31.054487, -97.563461), 'UT': (40.150032, -111.862434), 'VT': (44.045876, -72.710686),
+    'VA': (37.769337, -78.169968), 'WA': (47.400902, -121.490494), 'WV': (38.491226, -80.954453),
+    'WI': (44.268543, -89.616508), 'WY': (42.755966, -107.302490), 'DC': (38.9072, -77.0369)
+}
+
+
+# --- Representasi Kompak ---
+# Kolom teks berkardinalitas rendah disimpan sebagai kategori, angka kecil sebagai integer/float sempit.
+CATEGORY_COLUMNS = [
+    'Gender', 'Item Purchased', 'Category', 'Location', 'Size', 'Color', 'Season',
+    'Subscription Status', 'Shipping Type', 'Discount Applied', 'Promo Code Used',
+    'Payment Method', 'Frequency of Purchases',
+]
+
+COMPACT_DTYPES = {
+    'Customer ID': 'int32',
+    'Age': 'uint8',
+    'Review Rating': 'float32',
+    'Previous Purchases': 'uint8',
+    **{col: 'category' for col in CATEGORY_COLUMNS},
+}
+
+
+def read_source(source, compact=False, **read_kwargs):
+    """Membaca CSV (path atau buffer) dan menjalankan preprocessing; mode kompak memakai dtype eksplisit dan 'State Code'."""
+    if not compact:
+        return add_age_groups(pd.read_csv(source, **read_kwargs))
+
+    df = add_age_groups(pd.read_csv(source, dtype=COMPACT_DTYPES, **read_kwargs), compact=True)
+    df['State Code'] = df['Location'].map(US_STATE_ABBR).astype('category')
+    return df
+
+
+def memory_report(standard_df, compact_df):
+    """Membandingkan pemakaian memori per kolom antara frame standar dan frame kompak (dalam KB)."""
+    standard = standard_df.memory_usage(index=False, deep=True)
+    compact = compact_df.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({'Standar (KB)': standard, 'Kompak (KB)': compact}).reindex(compact.index) / 1024
+    report.loc['TOTAL'] = report.sum()
+    report['Hemat (%)'] = (1 - report['Kompak (KB)'] / report['Standar (KB)']) * 100
+    return report.round(1)
+
+
+# --- Snapshot Kolumnar (Arrow IPC) ---
+# Frame hasil preprocessing disimpan di samping CSV dan dipakai ulang selama ukuran/mtime CSV tidak berubah.
+# File ditulis sebagai satu record batch tanpa kompresi sehingga kolom dapat di-memory-map tanpa disalin.
+SNAPSHOT_VERSION = 3
+
+
+def source_signature(file_path):
+    """Ukuran dan mtime file sumber, dipakai untuk mendeteksi snapshot yang kedaluwarsa."""
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def dataset_version(file_path, signature):
+    """Versi dataset '<path>-<ukuran>-<mtime_ns>', kunci semua cache hasil (figur, prefetch, view store, ETag API).
+
+    <path> adalah digest path absolut sumber: dua ekspor dengan ukuran dan mtime sama tetap berbeda versi,
+    tanpa membocorkan path server lewat API.
+    """
+    path = hashlib.blake2b(os.path.realpath(file_path).encode(), digest_size=6).hexdigest()
+    return f"{path}-{signature['size']}-{signature['mtime_ns']}"
+
+
+def version_mtime_ns(version):
+    """mtime_ns sumber dari versi buatan dataset_version()."""
+    return int(version.rsplit('-', 1)[1])
+
+
+def snapshot_paths(file_path, compact=False):
+    """Path file snapshot Arrow dan file metadata JSON-nya untuk suatu CSV dan mode pemuatan."""
+    base = f"{file_path}.{'compact' if compact else 'standard'}"
+    return f"{base}.arrow", f"{base}.json"
+
+
+def write_arrow(df, path):
+    """Menulis frame sebagai file Arrow IPC satu batch secara atomik (file sementara lalu rename)."""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False).combine_chunks()
+    with pa.OSFile(path + '.tmp', 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(path + '.tmp', path)
+
+
+def map_arrow(path):
+    """Memetakan file Arrow IPC ke DataFrame tanpa salinan: kolom numerik dan string menunjuk ke halaman file.
+
+    Halaman yang sama dipakai bersama oleh semua proses yang memetakan file ini (page cache OS);
+    array hasilnya read-only.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, self_destruct=False)
+
+
+def read_snapshot(file_path, compact=False):
+    """Membaca snapshot (memory-mapped) bila masih valid; mengembalikan None bila tidak ada atau kedaluwarsa."""
+    arrow_path, meta_path = snapshot_paths(file_path, compact)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta != {'version': SNAPSHOT_VERSION, 'source': source_signature(file_path)}:
+            return None
+        return map_arrow(arrow_path)
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+def write_snapshot(df, file_path, compact=False):
+    """Menulis snapshot secara atomik (file sementara lalu rename); kegagalan tulis diabaikan."""
+    arrow_path, meta_path = snapshot_paths(file_path, compact)
+    meta = {'version': SNAPSHOT_VERSION, 'source': source_signature(file_path)}
+    try:
+        write_arrow(df, arrow_path)
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+    except (ImportError, OSError):
+        pass
+
+
+def load_frame(file_path, compact=False, use_snapshot=True):
+    """Memuat frame terproses dari snapshot bila valid, atau dari CSV lalu memperbarui snapshot."""
+    if use_snapshot:
+        df = read_snapshot(file_path, compact)
+        if df is not None:
+            return df
+
+    df = read_source(file_path, compact=compact)
+    if use_snapshot:
+        write_snapshot(df, file_path, compact)
+    return df
+
+
+# --- Ingesti Streaming (Chunked) ---
+# Untuk CSV yang lebih besar dari RAM: baris dibaca per chunk dan langsung dilipat ke cube,
+# sehingga memori puncak ~ satu chunk + cube (dibatasi kardinalitas dimensi, bukan jumlah baris).
+STREAM_COLUMNS = CUBE_DIMS + ['Purchase Amount (USD)']
+
+
+def filter_options(frame):
+    """Nilai unik setiap kolom filter sesuai urutan kemunculan pertama (untuk opsi multiselect sidebar)."""
+    return {col: list(frame[col].unique()) for col in FILTER_COLUMNS}
+
+
+def estimate_chunk_rows(file_path, max_memory_mb, sample_rows=1000):
+    """Jumlah baris per chunk agar chunk beserta salinan sementara groupby muat dalam anggaran memori."""
+    sample = pd.read_csv(file_path, usecols=STREAM_COLUMNS, nrows=sample_rows)
+    bytes_per_row = sample.memory_usage(index=False, deep=True).sum() / max(len(sample), 1)
+    # Faktor 4: chunk mentah, hasil groupby, dan salinan saat cube digabung
+    return max(1000, int(max_memory_mb * 1024 ** 2 / (bytes_per_row * 4)))
+
+
+def fold_chunks(chunks, cube=None, options=None):
+    """Melipat setiap chunk ke cube mentah dan opsi filter yang sudah ada (keduanya boleh None di awal)."""
+    options = {col: dict.fromkeys(options[col] if options else []) for col in FILTER_COLUMNS}
+    for chunk in chunks:
+        for col in FILTER_COLUMNS:
+            options[col].update(dict.fromkeys(chunk[col].unique()))
+        part = aggregate_cube(chunk)
+        cube = part if cube is None else merge_cubes([cube, part])
+    return cube, {col: list(values) for col, values in options.items()}
+
+
+def stream_cube(file_path, max_memory_mb=64, compact=False, sketch_set=None):
+    """Membangun cube dan opsi filter dengan membaca CSV per chunk tanpa pernah memuat semua baris sekaligus."""
+    chunk_rows = estimate_chunk_rows(file_path, max_memory_mb)
+    chunks = pd.read_csv(file_path, usecols=STREAM_COLUMNS, chunksize=chunk_rows)
+    if sketch_set is not None:
+        chunks = sketch_set.tap(chunks)
+    cube, options = fold_chunks(chunks)
+    return finish_cube(cube, compact=compact), options
+
+
+# --- Pemuatan dan Preprocessing Data ---
+def assemble_data(df, cube, options, source, version, sketches=None):
+    """Menyusun paket data yang dipakai dashboard, termasuk indeks bitmap sel cube dan versi dataset."""
+    return {
+        'df': df,
+        'cube': cube,
+        'cube_index': build_filter_index(cube),
+        'cube_groups': build_cube_groups(cube),
+        'options': options,
+        'n_rows': int(cube['Count'].sum()),
+        'age_bounds': (int(cube['Age'].min()), int(cube['Age'].max())),
+        'source': source,
+        'version': version,
+        'sketches': sketches,
+    }
+
+
+def build_data(file_path, compact=False, stream=False, use_snapshot=True, max_memory_mb=64, sketches=False,
+               executor=None):
+    """Memuat data, melakukan preprocessing awal (kolom kelompok usia), lalu membangun cube dan indeks filternya.
+
+    Pada mode streaming baris mentah tidak disimpan ('df' bernilai None); semua tampilan dilayani dari cube.
+    Dengan `sketches=True` sketch mode perkiraan ikut dibangun pada pemindaian yang sama; `executor`
+    (AggregateExecutor) membagi pembangunan cube dari frame besar per rentang baris.
+    """
+    signature = source_signature(file_path)
+    sketch_set = SketchSet() if sketches else None
+    if stream:
+        df = None
+        with stage('load:stream_cube') as s:
+            cube, options = stream_cube(file_path, max_memory_mb=max_memory_mb, compact=compact, sketch_set=sketch_set)
+            s.set(rows=len(cube))
+    else:
+        with stage('load:frame') as s:
+            df = load_frame(file_path, compact=compact, use_snapshot=use_snapshot)
+            s.set(rows=len(df), bytes=int(df.memory_usage(deep=False).sum()))
+        with stage('load:cube') as s:
+            cube = build_cube(df, executor)
+            options = filter_options(df)
+            s.set(rows=len(cube))
+        if sketch_set is not None:
+            with stage('load:sketches'):
+                sketch_set.add(df)
+    with stage('load:index'):
+        data = assemble_data(
+            df, cube, options, capture_source(file_path, signature), dataset_version(file_path, signature), sketch_set)
+    return data
+
+
+# --- View Termaterialisasi ---
+# Agregat per tab dan teks kesimpulan untuk state filter populer dihitung offline (precompute.py) dan
+# disimpan di samping CSV, sehingga dashboard yang baru di-deploy langsung melayani view tersebut.
+VIEW_STORE_VERSION = 2
+
+
+def view_store_path(file_path, compact=False):
+    return f"{file_path}.{'compact' if compact else 'standard'}.views.pkl"
+
+
+def materialize_view(ctx, conclusions):
+    """Semua AGGREGATES dan kesimpulan `conclusions` ([(fn, args)]) untuk satu konteks, siap disimpan."""
+    ctx.compute(AGGREGATES)
+    for fn, args in conclusions:
+        ctx.conclusion(fn, *args)
+    return {'aggregates': dict(ctx._results), 'conclusions': dict(ctx._conclusions)}
+
+
+def write_view_store(file_path, version, entries, compact=False):
+    """Menulis {filter_key: view} untuk dataset versi `version` secara atomik (file sementara lalu rename)."""
+    path = view_store_path(file_path, compact)
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump({'version': VIEW_STORE_VERSION, 'dataset_version': version, 'entries': entries}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def read_view_store(file_path, version, compact=False):
+    """{filter_key: view} yang ditulis precompute.py untuk dataset versi `version`; kosong bila tidak ada/kedaluwarsa.
+
+    File ini dibuat oleh alat deploy sendiri di samping CSV, sama tepercayanya dengan snapshot Arrow.
+    """
+    try:
+        with open(view_store_path(file_path, compact), 'rb') as f:
+            store = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return {}
+    if store.get('version') != VIEW_STORE_VERSION or store.get('dataset_version') != version:
+        return {}
+    # Hanya entri yang memuat semua agregat saat ini; sisanya dihitung ulang seperti biasa
+    return {key: view for key, view in store['entries'].items() if set(AGGREGATES) <= set(view['aggregates'])}
+
+
+# --- Refresh Inkremental ---
+# Posisi byte terakhir yang sudah di-ingest diingat; bila file hanya bertambah di akhir,
+# hanya baris tambahan yang di-parse lalu digabung ke frame, cube, dan indeks.
+DIGEST_BLOCK_BYTES = 4096
+
+
+class _ByteRange(io.RawIOBase):
+    """Pembaca file yang berhenti setelah `length` byte, agar read_csv hanya melihat rentang tertentu."""
+
+    def __init__(self, f, length):
+        self._f = f
+        self._left = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self._f.readinto(memoryview(buffer)[:min(len(buffer), self._left)])
+        self._left -= n
+        return n
+
+
+def content_digest(file_path, offset):
+    """Sidik isi file hingga `offset` (blok awal + blok tepat sebelum offset) untuk mendeteksi file yang ditulis ulang."""
+    with open(file_path, 'rb') as f:
+        head = f.read(min(offset, DIGEST_BLOCK_BYTES))
+        f.seek(max(0, offset - DIGEST_BLOCK_BYTES))
+        tail = f.read(offset - max(0, offset - DIGEST_BLOCK_BYTES))
+    return hashlib.blake2b(head + tail, digest_size=16).hexdigest()
+
+
+def complete_length(file_path):
+    """Panjang file hingga akhir baris lengkap terakhir (baris yang masih ditulis tidak ikut)."""
+    with open(file_path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)
+        while pos > 0:
+            start = max(0, pos - 65536)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            pos = start
+    return 0
+
+
+def capture_source(file_path, signature):
+    """Status ingest setelah pemuatan penuh; None bila file berubah selama dibaca atau berakhir di tengah baris."""
+    if source_signature(file_path) != signature or complete_length(file_path) != signature['size']:
+        return None
+    return {
+        'offset': signature['size'],
+        'mtime_ns': signature['mtime_ns'],
+        'digest': content_digest(file_path, signature['size']),
+    }
+
+
+def append_rows(df, tail):
+    """Menggabungkan baris baru ke frame; kategori kolom kategorikal diperluas agar dtype-nya tetap kategorikal."""
+    tail = tail.copy()
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            new_values = pd.Index(tail[col].dropna().unique()).difference(df[col].cat.categories)
+            if len(new_values):
+                categories = df[col].cat.categories.append(new_values)
+                # Kategori tak berurutan tetap disortir, sama seperti hasil read_csv(dtype='category')
+                if not df[col].cat.ordered:
+                    categories = categories.sort_values()
+                df = df.assign(**{col: df[col].cat.set_categories(categories)})
+            tail[col] = pd.Categorical(tail[col], categories=df[col].cat.categories, ordered=df[col].cat.ordered)
+    return pd.concat([df, tail], ignore_index=True)
+
+
+def refresh_data(data, file_path, compact=False, stream=False, use_snapshot=True, max_memory_mb=64):
+    """Memperbarui paket data bila CSV berubah: baris tambahan di akhir di-parse sendiri, selain itu dibangun ulang penuh.
+
+    Mengembalikan (data, status) dengan status 'unchanged', 'appended', atau 'rebuilt'.
+    """
+    source = data['source']
+    signature = source_signature(file_path)
+    if source is not None and signature == {'size': source['offset'], 'mtime_ns': source['mtime_ns']}:
+        return data, 'unchanged'
+
+    if (source is None or signature['size'] <= source['offset']
+            or content_digest(file_path, source['offset']) != source['digest']):
+        sketches = data.get('sketches') is not None
+        return build_data(file_path, compact, stream, use_snapshot, max_memory_mb, sketches), 'rebuilt'
+
+    offset, end = source['offset'], complete_length(file_path)
+    if end <= offset:
+        # Baris baru belum selesai ditulis
+        return data, 'unchanged'
+
+    names = list(pd.read_csv(file_path, nrows=0).columns)
+    # Baris tambahan diberi index lanjutan agar 'First Row' tetap posisi baris di file sumber
+    start = data['n_rows']
+    # Sketch dapat digabung: salinan sketch lama cukup ditambah baris baru
+    sketch_set = data['sketches'].copy() if data.get('sketches') is not None else None
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        reader = io.BufferedReader(_ByteRange(f, end - offset))
+        if stream:
+            df = None
+            chunks = pd.read_csv(
+                reader, header=None, names=names, usecols=STREAM_COLUMNS,
+                chunksize=estimate_chunk_rows(file_path, max_memory_mb),
+            )
+            chunks = (chunk.set_axis(chunk.index + start) for chunk in chunks)
+            if sketch_set is not None:
+                chunks = sketch_set.tap(chunks)
+            cube, options = fold_chunks(chunks, cube=data['cube'], options=data['options'])
+        else:
+            tail = read_source(reader, compact=compact, header=None, names=names)
+            tail.index += start
+            if sketch_set is not None:
+                sketch_set.add(tail)
+            df = append_rows(data['df'], tail)
+            cube = merge_cubes([data['cube'], aggregate_cube(tail)])
+            options = {
+                col: list(dict.fromkeys([*data['options'][col], *tail[col].unique()]))
+                for col in FILTER_COLUMNS
+            }
+
+    source = {'offset': end, 'mtime_ns': signature['mtime_ns'], 'digest': content_digest(file_path, end)}
+    signature = {'size': end, 'mtime_ns': signature['mtime_ns']}
+    version = dataset_version(file_path, signature)
+    return assemble_data(df, finish_cube(cube, compact=compact), options, source, version, sketch_set), 'appended'
+
+
+# --- Dataset Bersama Antar Proses (Memory-mapped) ---
+# Satu proses membangun frame dan cube lalu menulisnya sebagai file Arrow; setiap proses server
+# memetakannya read-only, sehingga beberapa replika di satu mesin berbagi halaman memori yang sama.
+def shared_paths(file_path, compact=False, stream=False):
+    """Path file frame, cube, dan metadata dataset bersama untuk suatu CSV dan mode pemuatan."""
+    base = f"{file_path}.{'compact' if compact else 'standard'}{'-stream' if stream else ''}.shared"
+    return f"{base}.frame.arrow", f"{base}.cube.arrow", f"{base}.json"
+
+
+@contextlib.contextmanager
+def exclusive_lock(path):
+    """Lock file eksklusif antar proses (flock); tanpa fcntl (mis. Windows) lock dilewati."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def map_shared(file_path, compact=False, stream=False):
+    """Paket data dari dataset bersama bila masih sesuai dengan CSV; None bila belum ada atau kedaluwarsa."""
+    frame_path, cube_path, meta_path = shared_paths(file_path, compact, stream)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        signature = source_signature(file_path)
+        if meta['version'] != SNAPSHOT_VERSION or meta['source'] != signature:
+            return None
+        df = None if stream else map_arrow(frame_path)
+        cube = map_arrow(cube_path)
+    except (ImportError, OSError, ValueError, KeyError):
+        return None
+    return assemble_data(
+        df, cube, meta['options'], capture_source(file_path, signature), dataset_version(file_path, signature))
+
+
+def open_shared(file_path, compact=False, stream=False, max_memory_mb=64):
+    """Memetakan dataset bersama; bila belum ada, satu proses (di bawah lock) membangun dan menulisnya dulu."""
+    data = map_shared(file_path, compact, stream)
+    if data is not None:
+        return data
+
+    frame_path, cube_path, meta_path = shared_paths(file_path, compact, stream)
+    with exclusive_lock(meta_path + '.lock'):
+        # Proses lain mungkin sudah selesai menulis selama kita menunggu lock
+        data = map_shared(file_path, compact, stream)
+        if data is not None:
+            return data
+        built = build_data(file_path, compact, stream, use_snapshot=False, max_memory_mb=max_memory_mb)
+        if built['df'] is not None:
+            write_arrow(built['df'], frame_path)
+        write_arrow(built['cube'], cube_path)
+        meta = {'version': SNAPSHOT_VERSION, 'source': source_signature(file_path), 'options': built['options']}
+        with open(meta_path + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+    data = map_shared(file_path, compact, stream)
+    return data if data is not None else built
+
+
+# --- Mode Perkiraan (Sketch + Sampel) ---
+# Sketch dibangun sekali saat ingest per partisi filter global (Gender x Category x Season), sehingga
+# filter global dijawab dengan menggabungkan partisi. Bila filter spesifik (lokasi, pembayaran, usia)
+# dipersempit, agregat diperkirakan dari reservoir sampel baris. Setiap agregat menyertakan batas galatnya.
+SKETCH_PARTITION_DIMS = ['Gender', 'Category', 'Season']
+SKETCH_KEY_COLUMNS = ['Location', 'Payment Method']
+SKETCH_QUANTILE_COLUMNS = ['Age', 'Purchase Amount (USD)']
+AGE_BAR_BINS = [18, 25, 35, 45, 55, 65, 100]
+AGE_BAR_LABELS = ['18-25', '26-35', '36-45', '46-55', '56-65', '65+']
+
+
+class SketchSet:
+    """Sketch per partisi filter global (jumlah, total pembelian, Count-Min, HyperLogLog, kuantil) plus reservoir sampel."""
+
+    def __init__(self, sample_size=100_000, eps=0.005, seed=0):
+        self.eps = eps
+        self.seed = seed
+        self.partitions = {}
+        self.reservoir = Reservoir(sample_size, seed=seed)
+
+    def _new_partition(self):
+        return {
+            'count': 0,
+            'purchase_sum': 0,
+            'cms': {col: CountMinSketch(self.eps, seed=self.seed) for col in SKETCH_KEY_COLUMNS},
+            'hll': {col: HyperLogLog(seed=self.seed) for col in SKETCH_KEY_COLUMNS},
+            'quantiles': {col: QuantileSketch(seed=self.seed) for col in SKETCH_QUANTILE_COLUMNS},
+        }
+
+    def add(self, frame):
+        """Memasukkan baris (frame penuh atau satu chunk) ke sketch partisinya dan ke reservoir."""
+        frame = frame[STREAM_COLUMNS]
+        for key, part in frame.groupby(SKETCH_PARTITION_DIMS, observed=True, sort=False):
+            partition = self.partitions.setdefault(tuple(str(k) for k in key), self._new_partition())
+            partition['count'] += len(part)
+            partition['purchase_sum'] += int(part['Purchase Amount (USD)'].sum())
+            for col in SKETCH_KEY_COLUMNS:
+                values = part[col].astype(str)
+                partition['cms'][col].add(values)
+                partition['hll'][col].add(values)
+            for col in SKETCH_QUANTILE_COLUMNS:
+                partition['quantiles'][col].add(part[col].to_numpy())
+        self.reservoir.add(frame)
+
+    def tap(self, chunks):
+        """Meneruskan chunk apa adanya sambil memasukkannya ke sketch (untuk ingesti streaming)."""
+        for chunk in chunks:
+            self.add(chunk)
+            yield chunk
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    @staticmethod
+    def merge_partitions(partitions):
+        """Menggabungkan daftar partisi menjadi satu (jumlah dijumlah, sketch di-merge)."""
+        merged = {
+            'count': sum(p['count'] for p in partitions),
+            'purchase_sum': sum(p['purchase_sum'] for p in partitions),
+        }
+        for kind in ('cms', 'hll', 'quantiles'):
+            merged[kind] = {}
+            for col in partitions[0][kind]:
+                sketch = partitions[0][kind][col]
+                for p in partitions[1:]:
+                    sketch = sketch.merge(p[kind][col])
+                merged[kind][col] = sketch
+        return merged
+
+
+def _age_bin_counts(quantile_sketch, edges):
+    """Perkiraan jumlah usia (bilangan bulat) per bin [edges[i], edges[i+1]) dari rank sketch kuantil."""
+    ranks = [quantile_sketch.rank(edge - 1) for edge in edges]
+    return np.round(np.diff(ranks)).astype(np.int64)
+
+
+def _z_simultaneous(cells):
+    """Nilai z untuk kepercayaan 95% serentak atas `cells` sel (koreksi Bonferroni)."""
+    return Z_95 if cells <= 1 else NormalDist().inv_cdf(1 - 0.025 / cells)
+
+
+class ApproxContext:
+    """Pengganti AggregationContext untuk mode perkiraan: agregat bernama yang sama beserta batas galatnya.
+
+    `bounds[name]` adalah galat absolut maksimum (transaksi, atau USD untuk rata-rata) pada kepercayaan ~95%.
+    """
+
+    approximate = True
+
+    def __init__(self, sketch_set, info, selections, age_range, key=None):
+        self.sketch_set = sketch_set
+        self.info = info
+        self.selections = selections
+        self.age_range = (int(age_range[0]), int(age_range[1]))
+        self.key = key
+        self.bounds = {}
+        self._results = {}
+        self._conclusions = {}
+        self.uses_sketches = self.age_range == tuple(info['age_bounds']) and all(
+            set(selections[col]).issuperset(info['options'][col]) for col in SKETCH_KEY_COLUMNS
+        )
+        if self.uses_sketches:
+            self.source = "sketch per partisi"
+            self._partitions = {
+                key: partition for key, partition in sketch_set.partitions.items()
+                if all(value in selections[col] for value, col in zip(key, SKETCH_PARTITION_DIMS))
+            }
+        else:
+            sample = sketch_set.reservoir.sample
+            self.source = f"sampel {len(sample):,} baris"
+            mask = sample['Age'].between(*self.age_range).to_numpy().copy()
+            for col in FILTER_COLUMNS:
+                mask &= sample[col].astype(str).isin(selections[col]).to_numpy()
+            self._sample = sample[mask].astype({col: 'str' for col in FILTER_COLUMNS})
+            self._sample_size = len(sample)
+            self._scale = sketch_set.reservoir.seen / max(len(sample), 1)
+            # Koreksi populasi hingga: sampel yang memuat seluruh baris tidak punya galat
+            seen = sketch_set.reservoir.seen
+            self._fpc = math.sqrt((seen - len(sample)) / (seen - 1)) if seen > 1 else 0.0
+            cube = finish_cube(aggregate_cube(self._sample), max_age=info['age_bounds'][1])
+            self._inner = AggregationContext(cube)
+
+    @property
+    def empty(self):
+        return self['total'] == 0
+
+    def __getitem__(self, name):
+        if name not in self._results:
+            with stage(f'approx:{name}'):
+                if name.endswith('_first'):
+                    # Sketch dan reservoir tidak menyimpan urutan baris: nilai seri diurutkan menurut label
+                    self._results[name], self.bounds[name] = None, 0.0
+                else:
+                    compute = getattr(self, f"_{'sketch' if self.uses_sketches else 'sample'}_{name}")
+                    self._results[name], self.bounds[name] = compute()
+        return self._results[name]
+
+    def compute(self, names):
+        for name in names:
+            self[name]
+
+    def conclusion(self, fn, *args):
+        key = (fn.__name__, *args)
+        if key not in self._conclusions:
+            self._conclusions[key] = fn(self, *args)
+        return self._conclusions[key]
+
+    def error_note(self, names):
+        """Kalimat batas galat untuk agregat-agregat yang dipakai suatu KPI atau kesimpulan."""
+        for name in names:
+            self[name]
+        units = {'category_season_mean': None, 'category_distinct': 'kategori', 'location_distinct': 'lokasi'}
+        counts = [self.bounds[n] for n in names if n not in units]
+        parts = []
+        if counts:
+            parts.append(f"±{max(counts):,.0f} transaksi")
+        for name, unit in units.items():
+            if name in names and unit:
+                parts.append(f"±{self.bounds[name]:,.0f} {unit}")
+        if 'category_season_mean' in names:
+            parts.append(f"±{self.bounds['category_season_mean']:.2f} USD untuk rata-rata")
+        return f"(Perkiraan dari {self.source}; galat maksimum {', '.join(parts)}, kepercayaan ~95%.)"
+
+    # Jalur sketch: hanya filter global yang aktif
+    def _merged(self, partitions=None):
+        partitions = list(self._partitions.values()) if partitions is None else partitions
+        return SketchSet.merge_partitions(partitions) if partitions else None
+
+    def _by_category(self):
+        groups = {}
+        for key, partition in self._partitions.items():
+            groups.setdefault(key[1], []).append(partition)
+        return {category: self._merged(parts) for category, parts in sorted(groups.items())}
+
+    def _key_counts(self, merged, col):
+        values = list(self.info['options'][col])
+        estimates = merged['cms'][col].estimate(values) if merged else np.zeros(len(values), dtype=np.int64)
+        counts = pd.Series(estimates, index=pd.Index(values, name=col), name='Count').sort_index()
+        return counts[counts > 0]
+
+    def _sketch_total(self):
+        return sum(p['count'] for p in self._partitions.values()), 0.0
+
+    def _sketch_category_counts(self):
+        counts = pd.Series(
+            {category: merged['count'] for category, merged in self._by_category().items()}, dtype=np.int64)
+        counts.index.name, counts.name = 'Category', 'Count'
+        return counts[counts > 0], 0.0
+
+    def _sketch_location_counts(self):
+        merged = self._merged()
+        return self._key_counts(merged, 'Location'), merged['cms']['Location'].error_bound() if merged else 0.0
+
+    def _sketch_payment_counts(self):
+        merged = self._merged()
+        return (self._key_counts(merged, 'Payment Method'),
+                merged['cms']['Payment Method'].error_bound() if merged else 0.0)
+
+    def _sketch_category_location_counts(self):
+        parts, bound = [], 0.0
+        for category, merged in self._by_category().items():
+            counts = self._key_counts(merged, 'Location')
+            parts.append(pd.concat({category: counts}, names=['Category']))
+            bound = max(bound, merged['cms']['Location'].error_bound())
+        if not parts:
+            empty = pd.MultiIndex.from_arrays([[], []], names=['Category', 'Location'])
+            return pd.Series([], index=empty, name='Count', dtype=np.int64), 0.0
+        return pd.concat(parts).rename('Count'), bound
+
+    def _sketch_age_group_counts(self):
+        merged = self._merged()
+        max_age = self.info['age_bounds'][1]
+        starts = list(range(0, max_age + 1, 10))
+        labels = [f'{i}-{i+9}' for i in starts]
+        if merged is None:
+            return pd.Series([], index=pd.Index([], name='Age Group'), name='Count', dtype=np.int64), 0.0
+        sketch = merged['quantiles']['Age']
+        counts = pd.Series(
+            _age_bin_counts(sketch, starts + [starts[-1] + 10]), index=pd.Index(labels, name='Age Group'), name='Count')
+        return counts[counts > 0], 2 * sketch.rank_error_bound()
+
+    def _sketch_age_bar_category_counts(self):
+        rows, bound = [], 0.0
+        for category, merged in self._by_category().items():
+            sketch = merged['quantiles']['Age']
+            for label, count in zip(AGE_BAR_LABELS, _age_bin_counts(sketch, AGE_BAR_BINS)):
+                if count > 0:
+                    rows.append((label, category, count))
+            bound = max(bound, 2 * sketch.rank_error_bound())
+        frame = pd.DataFrame(rows, columns=['Age Group_Bar', 'Category', 'Count'])
+        frame['Age Group_Bar'] = pd.Categorical(frame['Age Group_Bar'], categories=AGE_BAR_LABELS, ordered=True)
+        counts = frame.set_index(['Age Group_Bar', 'Category'])['Count'].sort_index()
+        return counts, bound
+
+    def _sketch_category_season_mean(self):
+        totals = pd.DataFrame(
+            [(key[1], key[2], p['purchase_sum'], p['count']) for key, p in self._partitions.items()],
+            columns=['Category', 'Season', 'Purchase Sum', 'Count'],
+        ).groupby(['Category', 'Season'])[['Purchase Sum', 'Count']].sum()
+        return (totals['Purchase Sum'] / totals['Count']).unstack('Season'), 0.0
+
+    def _sketch_category_distinct(self):
+        return len(self._sketch_category_counts()[0]), 0.0
+
+    def _sketch_location_distinct(self):
+        merged = self._merged()
+        if merged is None:
+            return 0, 0.0
+        hll = merged['hll']['Location']
+        return int(round(hll.estimate())), hll.error_bound()
+
+    # Jalur sampel: filter spesifik aktif, perkiraan dari reservoir
+    def _count_bound(self, counts):
+        """Batas galat 95% untuk jumlah hasil penskalaan sampel (binomial): z * N * sqrt(p(1-p)/n) * fpc.
+
+        z dikoreksi Bonferroni atas jumlah sel agar batas berlaku serentak untuk seluruh tabel.
+        """
+        p = np.asarray(counts, dtype=np.float64) / max(self._sample_size, 1)
+        if not p.size:
+            return 0.0
+        n_total = self._scale * self._sample_size
+        return float(np.max(_z_simultaneous(p.size) * n_total * np.sqrt(p * (1 - p) / max(self._sample_size, 1)))) \
+            * self._fpc
+
+    def _scaled(self, name):
+        counts = self._inner[name]
+        return (counts * self._scale).round().astype(np.int64), self._count_bound(counts)
+
+    def _sample_total(self):
+        matched = len(self._sample)
+        return int(round(matched * self._scale)), self._count_bound([matched])
+
+    def _sample_age_group_counts(self):
+        return self._scaled('age_group_counts')
+
+    def _sample_location_counts(self):
+        return self._scaled('location_counts')
+
+    def _sample_category_counts(self):
+        return self._scaled('category_counts')
+
+    def _sample_payment_counts(self):
+        return self._scaled('payment_counts')
+
+    def _sample_category_location_counts(self):
+        return self._scaled('category_location_counts')
+
+    def _sample_age_bar_category_counts(self):
+        return self._scaled('age_bar_category_counts')
+
+    def _sample_category_season_mean(self):
+        stats = self._sample.groupby(['Category', 'Season'])['Purchase Amount (USD)'].agg(['std', 'count'])
+        half_width = (_z_simultaneous(len(stats)) * stats['std'] / np.sqrt(stats['count'])).max() * self._fpc
+        return self._inner['category_season_mean'], float(0.0 if pd.isna(half_width) else half_width)
+
+    def _sample_category_distinct(self):
+        # Sampel hanya bisa kurang menghitung: batas atas adalah jumlah kategori yang lolos filter
+        found = self._inner['category_distinct']
+        return found, float(len(set(self.selections['Category'])) - found) if self._fpc else 0.0
+
+    def _sample_location_distinct(self):
+        found = self._inner['location_distinct']
+        return found, float(len(set(self.selections['Location'])) - found) if self._fpc else 0.0
+
+
+# --- FUNGSI KESIMPULAN OTOMATIS ---
+@profiled('conclusion:age')
+def generate_conclusion_age(ctx):
+    if ctx.empty:
+        return "Tidak ada data usia yang cukup untuk dianalisis."
+
+    top_group, count = next(iter(top_k(ctx['age_group_counts'], 1, first=ctx['age_group_first']).items()))
+    total = ctx['total']
+    percent = (count / total) * 100
+
+    return (
+        f"Kelompok usia **{top_group}** mendominasi transaksi dengan "
+        f"**{count} pembelian ({percent:.1f}%)**, menunjukkan bahwa rentang usia tersebut "
+        f"merupakan segmen pelanggan paling aktif pada filter saat ini."
+    )
+
+
+@profiled('conclusion:location')
+def generate_conclusion_location(ctx):
+    if ctx.empty:
+        return "Tidak ada data lokasi untuk dianalisis."
+
+    top_loc, count = next(iter(top_k(ctx['location_counts'], 1, first=ctx['location_first']).items()))
+
+    return (
+        f"Lokasi dengan transaksi terbanyak adalah **{top_loc}** dengan "
+        f"**{count} transaksi**, sehingga wilayah ini dapat diprioritaskan "
+        f"sebagai target utama aktivitas pemasaran."
+    )
+
+
+@profiled('conclusion:map')
+def generate_conclusion_map(ctx, k=3):
+    if ctx.empty:
+        return "Data lokasi tidak cukup untuk dianalisis di peta."
+
+    top_states = top_k(ctx['location_counts'], k, first=ctx['location_first'])
+    txt = ", ".join([f"{st} ({ct})" for st, ct in top_states.items()])
+    count_word = {1: "Satu", 2: "Dua", 3: "Tiga", 4: "Empat", 5: "Lima"}.get(k, str(k))
+
+    return (
+        f"{count_word} state dengan transaksi terbanyak adalah: **{txt}**. "
+        f"Hal ini menunjukkan konsentrasi aktivitas belanja yang kuat pada wilayah-wilayah tersebut."
+    )
+
+
+@profiled('conclusion:payment')
+def generate_conclusion_payment(ctx):
+    if ctx.empty:
+        return "Tidak ada data metode pembayaran untuk dianalisis."
+
+    top_pay, count = next(iter(top_k(ctx['payment_counts'], 1, first=ctx['payment_first']).items()))
+    total = ctx['total']
+    percent = (count / total) * 100
+
+    return (
+        f"Metode pembayaran yang paling banyak digunakan adalah **{top_pay}** dengan "
+        f"**{count} transaksi ({percent:.1f}%)**, menunjukkan preferensi pelanggan yang kuat "
+        f"terhadap metode pembayaran tersebut."
+    )
+
+
+@profiled('conclusion:heatmap')
+def generate_conclusion_heatmap(ctx):
+    if ctx.empty:
+        return "Tidak ada data yang cukup untuk membuat analisis musiman."
+
+    pivot = ctx['category_season_mean']
+
+    if pivot.empty:
+        return "Data tidak cukup untuk membentuk pola musiman antar kategori."
+
+    max_cat = pivot.max(axis=1).idxmax()
+    max_season = pivot.loc[max_cat].idxmax()
+    max_value = pivot.loc[max_cat].max()
+
+    return (
+        f"Kategori **{max_cat}** memiliki rata-rata pengeluaran tertinggi pada musim **{max_season}** "
+        f"yakni sekitar **${max_value:.2f}**, mengindikasikan adanya pola musiman yang kuat "
+        f"untuk kategori tersebut."
+    )
+
+
+@profiled('conclusion:age_product')
+def generate_conclusion_age_product(ctx):
+    if ctx.empty or ctx['age_bar_category_counts'].empty:
+        return "Tidak ada data yang cukup untuk analisis produk per kelompok usia."
+
+    (age, category), count = next(iter(top_k(ctx['age_bar_category_counts'], 1).items()))
+
+    return (
+        f"Kelompok usia **{age}** paling banyak membeli kategori **{category}** "
+        f"dengan **{count} transaksi**, menunjukkan preferensi produk yang cukup jelas "
+        f"berdasarkan segmen umur."
+    )
+
+
+# Kesimpulan per tab beserta argumennya; satu-satunya tabel yang dipakai API, precompute, dan benchmark,
+# dengan k peta yang sama seperti VIEWS['map'] di app.py sehingga teks tersimpan cocok dengan dashboard
+MAP_TOP_K = 3
+
+CONCLUSIONS = {
+    'age': (generate_conclusion_age, ()),
+    'location': (generate_conclusion_location, ()),
+    'map': (generate_conclusion_map, (MAP_TOP_K,)),
+    'payment': (generate_conclusion_payment, ()),
+    'heatmap': (generate_conclusion_heatmap, ()),
+    'age_product': (generate_conclusion_age_product, ()),
+}
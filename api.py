@@ -0,0 +1,311 @@
+"""API JSON headless untuk agregat dashboard, di atas http.server bawaan Python (tanpa Streamlit).
+
+Endpoint `GET /api/aggregates` menerima parameter filter yang sama dengan sidebar dan mengembalikan
+distribusi usia, jumlah per state, porsi metode pembayaran, heatmap rata-rata Category x Season,
+jumlah kelompok usia x kategori, dan teks kesimpulan sebagai JSON ringkas. Respons membawa ETag
+(versi dataset + state filter) dan Last-Modified (mtime CSV), dan GET bersyarat dijawab 304.
+
+Parameter filter: gender, category, season, location, payment_method (boleh diulang atau dipisah koma;
+tidak ada = semua opsi, kosong = tidak ada yang dipilih) serta age_min dan age_max.
+
+API dapat berjalan bersama dashboard (PB_API_PORT, memakai data dan indeks yang sama) atau sendiri:
+    python -m api --port 8600
+    curl 'http://127.0.0.1:8600/api/aggregates?season=Winter,Fall&age_min=25&age_max=50'
+"""
+import argparse
+import email.utils
+import hashlib
+import json
+import math
+import threading
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from analytics import (
+    CONCLUSIONS,
+    US_STATE_ABBR,
+    AggregationContext,
+    build_data,
+    dataset_version,
+    make_filter_key,
+    open_shared,
+    source_signature,
+    version_mtime_ns,
+)
+from backends import BACKENDS, PandasBackend, open_backend
+
+API_VERSION = 1
+
+# Parameter query -> kolom filter sidebar
+FILTER_PARAMS = {
+    'gender': 'Gender',
+    'category': 'Category',
+    'season': 'Season',
+    'location': 'Location',
+    'payment_method': 'Payment Method',
+}
+
+
+# --- Filter dan Payload ---
+def parse_filters(query, info):
+    """State filter (selections, age_range) dari query string; ValueError untuk nilai yang tidak dikenal."""
+    params = parse_qs(query, keep_blank_values=True)
+    unknown = set(params) - set(FILTER_PARAMS) - {'age_min', 'age_max'}
+    if unknown:
+        raise ValueError(f"Parameter tidak dikenal: {', '.join(sorted(unknown))}")
+
+    selections = {}
+    for param, col in FILTER_PARAMS.items():
+        if param not in params:
+            selections[col] = list(info['options'][col])
+            continue
+        values = [value for raw in params[param] for value in raw.split(',') if value]
+        invalid = set(values) - set(info['options'][col])
+        if invalid:
+            raise ValueError(f"Nilai {param} tidak dikenal: {', '.join(sorted(invalid))}")
+        selections[col] = values
+
+    lo, hi = info['age_bounds']
+    try:
+        age_range = (int(params.get('age_min', [lo])[-1]), int(params.get('age_max', [hi])[-1]))
+    except ValueError:
+        raise ValueError("age_min dan age_max harus bilangan bulat") from None
+    if age_range[0] > age_range[1]:
+        raise ValueError("age_min tidak boleh lebih besar dari age_max")
+    return selections, age_range
+
+
+def _counts(series):
+    return {str(key): int(value) for key, value in series.items()}
+
+
+def _nested(series):
+    """Series ber-MultiIndex dua level -> {level0: {level1: nilai}}."""
+    result = {}
+    for (outer, inner), value in series.items():
+        result.setdefault(str(outer), {})[str(inner)] = int(value)
+    return result
+
+
+def build_payload(ctx, info):
+    """Agregat dan kesimpulan untuk satu state filter, dalam bentuk yang siap di-serialisasi ke JSON."""
+    total = ctx['total']
+    payment = ctx['payment_counts']
+    means = ctx['category_season_mean']
+    return {
+        'api_version': API_VERSION,
+        'dataset_version': info['version'],
+        'n_rows': int(info['n_rows']),
+        'total': int(total),
+        'age_distribution': _counts(ctx['age_group_counts']),
+        'state_counts': {
+            str(location): {'state_code': US_STATE_ABBR.get(location), 'count': int(count)}
+            for location, count in ctx['location_counts'].items()
+        },
+        'payment_shares': {
+            str(method): {'count': int(count), 'share': round(count / total, 4)}
+            for method, count in payment.items()
+        },
+        'category_season_mean': {
+            str(category): {
+                str(season): None if math.isnan(value) else round(float(value), 4)
+                for season, value in row.items()
+            }
+            for category, row in means.iterrows()
+        },
+        'age_category_counts': _nested(ctx['age_bar_category_counts']),
+        'conclusions': {name: conclusion(ctx, *args) for name, (conclusion, args) in CONCLUSIONS.items()},
+    }
+
+
+def last_modified(info):
+    """Detik epoch mtime CSV, dari versi dataset (lihat dataset_version)."""
+    return version_mtime_ns(info['version']) // 1_000_000_000
+
+
+# --- Sumber Data ---
+class DataSource:
+    """Data dan backend yang dilayani API, beserta cache LRU respons per (versi dataset, state filter).
+
+    Saat berjalan bersama dashboard, `publish()` dipanggil setiap rerun dengan paket data yang sama yang
+    dipakai UI. Saat berdiri sendiri, `loader` dipanggil ulang bila versi CSV berubah.
+    """
+
+    def __init__(self, loader=None, csv_path=None, max_entries=256):
+        self.loader = loader
+        self.csv_path = csv_path
+        self.max_entries = max_entries
+        self.info = None
+        self.backend = None
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, info, backend):
+        with self._lock:
+            if self.info is not None and self.info['version'] != info['version']:
+                self._responses.clear()
+            self.info, self.backend = info, backend
+
+    def current(self):
+        """(info, backend) terbaru; memuat ulang lewat `loader` bila CSV sudah berubah."""
+        if self.loader is not None:
+            version = dataset_version(self.csv_path, source_signature(self.csv_path))
+            with self._lock:
+                stale = self.info is None or self.info['version'] != version
+            if stale:
+                self.publish(*self.loader())
+        with self._lock:
+            return self.info, self.backend
+
+    def response(self, key, build):
+        """Body JSON untuk `key` dari cache, atau dibangun dengan `build()` lalu disimpan."""
+        with self._lock:
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                return self._responses[key]
+        body = build()
+        with self._lock:
+            self._responses[key] = body
+            while len(self._responses) > self.max_entries:
+                self._responses.popitem(last=False)
+        return body
+
+
+# --- Server HTTP ---
+class AggregateHandler(BaseHTTPRequestHandler):
+    """Handler GET/HEAD untuk /api/aggregates dan /api/health."""
+
+    server_version = f'PerilakuBelanjaAPI/{API_VERSION}'
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send(self, status, body=b'', headers=None, send_body=True):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body and status != HTTPStatus.NOT_MODIFIED:
+            self.wfile.write(body)
+
+    def _error(self, status, message, send_body):
+        body = json.dumps({'error': message}, separators=(',', ':')).encode()
+        self._send(status, body, send_body=send_body)
+
+    def _not_modified(self, etag, modified):
+        """GET bersyarat: If-None-Match diutamakan; If-Modified-Since hanya dipakai bila tidak ada."""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return modified <= since
+        return False
+
+    def _handle(self, send_body):
+        url = urlsplit(self.path)
+        info, backend = self.server.source.current()
+        if url.path == '/api/health':
+            body = json.dumps({'ok': info is not None, 'dataset_version': info and info['version']}).encode()
+            self._send(HTTPStatus.OK, body, send_body=send_body)
+            return
+        if url.path != '/api/aggregates':
+            self._error(HTTPStatus.NOT_FOUND, f"Path tidak dikenal: {url.path}", send_body)
+            return
+        if info is None:
+            self._error(HTTPStatus.SERVICE_UNAVAILABLE, "Data belum dimuat", send_body)
+            return
+        try:
+            selections, age_range = parse_filters(url.query, info)
+        except ValueError as exc:
+            self._error(HTTPStatus.BAD_REQUEST, str(exc), send_body)
+            return
+
+        key = (info['version'], make_filter_key(selections, age_range))
+        modified = last_modified(info)
+        headers = {
+            'ETag': '"' + hashlib.sha1(repr((API_VERSION, key)).encode()).hexdigest()[:20] + '"',
+            'Last-Modified': email.utils.formatdate(modified, usegmt=True),
+            # Klien boleh menyimpan respons, tetapi harus memvalidasi ulang (GET bersyarat) setiap kali
+            'Cache-Control': 'no-cache',
+        }
+        if self._not_modified(headers['ETag'], modified):
+            self._send(HTTPStatus.NOT_MODIFIED, headers=headers)
+            return
+
+        def build():
+            ctx = AggregationContext(backend.filter_cube(selections, age_range), key=key)
+            return json.dumps(build_payload(ctx, info), separators=(',', ':'), ensure_ascii=False).encode()
+
+        self._send(HTTPStatus.OK, self.server.source.response(key, build), headers, send_body)
+
+
+def make_server(source, host='127.0.0.1', port=8600, quiet=False):
+    """ThreadingHTTPServer untuk `source` (belum berjalan; panggil serve_forever)."""
+    server = ThreadingHTTPServer((host, port), AggregateHandler)
+    server.daemon_threads = True
+    server.source = source
+    server.quiet = quiet
+    return server
+
+
+def start_in_thread(source, host='127.0.0.1', port=8600, quiet=True):
+    """Menjalankan server di thread daemon (mis. di samping dashboard); mengembalikan server-nya."""
+    server = make_server(source, host, port, quiet)
+    threading.Thread(target=server.serve_forever, name='pb-api', daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='shopping_behavior_updated.csv')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--backend', default='pandas', choices=list(BACKENDS))
+    parser.add_argument('--compact', action='store_true', help="mode kompak (dtype sempit)")
+    parser.add_argument('--stream', action='store_true', help="bangun cube secara streaming tanpa frame baris")
+    parser.add_argument('--shared', action='store_true',
+                        help="petakan dataset bersama yang sama dengan replika dashboard (PB_SHARED=1)")
+    parser.add_argument('--quiet', action='store_true', help="tanpa log per request")
+    args = parser.parse_args(argv)
+
+    def loader():
+        if args.backend != 'pandas':
+            backend = open_backend(args.backend, args.csv, compact=args.compact)
+            return backend.describe(), backend
+        if args.shared:
+            data = open_shared(args.csv, args.compact, args.stream)
+        else:
+            # Snapshot Arrow yang ditulis dashboard dipakai ulang (use_snapshot bawaan)
+            data = build_data(args.csv, args.compact, args.stream)
+        return data, PandasBackend(data)
+
+    server = make_server(DataSource(loader, args.csv), args.host, args.port, args.quiet)
+    print(f"API agregat berjalan di http://{args.host}:{server.server_address[1]}/api/aggregates")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,41 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
+import contextlib
+import functools
+import itertools
 import os
+import threading
+import uuid
+from collections import OrderedDict
+
+from analytics import (
+    MAP_TOP_K,
+    STATE_CENTROIDS,
+    US_STATE_ABBR,
+    AggregationContext,
+    ApproxContext,
+    FilterGraph,
+    build_data,
+    generate_conclusion_age,
+    generate_conclusion_age_product,
+    generate_conclusion_heatmap,
+    generate_conclusion_location,
+    generate_conclusion_map,
+    generate_conclusion_payment,
+    make_filter_key,
+    memory_report,
+    open_shared,
+    read_source,
+    read_view_store,
+    refresh_data,
+    top_k,
+    top_k_per_group,
+)
+from api import DataSource, start_in_thread
+from backends import PandasBackend, open_backend
+from parallel import AggregateExecutor
+from prefetch import Prefetcher, ResultCache, neighbor_states
+from profiling import StageMetrics, append_jsonl, finish_run, stage, start_run, write_prometheus
+from registry import DatasetRegistry
 
 # --- Konfigurasi Halaman ---
 st.set_page_config(
@@ -133,214 +163,722 @@ div[data-baseweb="notification"] {
 """, unsafe_allow_html=True)
 
 
-# --- Helper: Dark style untuk Matplotlib/Seaborn axes ---
-def style_dark_ax(ax):
-    """Menerapkan style gelap ke axis Matplotlib."""
-    fig = ax.get_figure()
-    fig.patch.set_facecolor("#020617")
-    ax.set_facecolor("#020617")
+# --- Konfigurasi Mode Data ---
+# PB_DATA_FILE menunjuk CSV lain (mis. data sintetis untuk benchmark/load test)
+DATA_FILE = os.environ.get('PB_DATA_FILE', 'shopping_behavior_updated.csv')
+# Registry: semua CSV di PB_DATA_DIR dapat dipilih dari sidebar dan dimuat malas oleh satu server pada
+# jalur pandas; PB_REGISTRY_MB membatasi total memori dataset yang dimuat (yang paling lama tidak dipakai dilepas)
+DATA_DIR = os.environ.get('PB_DATA_DIR', '')
+REGISTRY_MB = int(os.environ.get('PB_REGISTRY_MB', '1024'))
+COMPACT_MODE = os.environ.get('PB_COMPACT', '0') == '1'
+SNAPSHOT_MODE = os.environ.get('PB_SNAPSHOT', '1') == '1'
+STREAM_MODE = os.environ.get('PB_STREAM', '0') == '1'
+STREAM_MEMORY_MB = int(os.environ.get('PB_STREAM_MEMORY_MB', '64'))
+INCREMENTAL_MODE = os.environ.get('PB_INCREMENTAL', '0') == '1'
+# Dataset bersama: frame dan cube di-memory-map dari file Arrow yang dipakai bersama semua proses server
+SHARED_MODE = os.environ.get('PB_SHARED', '0') == '1'
+# Backend query: 'pandas' (default, cube di memori), engine out-of-core 'arrow'/'duckdb' atas CSV/Parquet,
+# atau 'partitioned' (layout Arrow per Season x Category di samping CSV, hanya partisi yang cocok dibaca)
+QUERY_BACKEND = os.environ.get('PB_BACKEND', 'pandas')
+BACKEND_SOURCE = os.environ.get('PB_BACKEND_SOURCE', DATA_FILE)
+# Mode perkiraan: sketch (Count-Min, HyperLogLog, kuantil) dan sampel reservoir dibangun saat ingest,
+# lalu dapat diaktifkan dari sidebar; hanya untuk jalur pandas non-bersama
+SKETCH_MODE = os.environ.get('PB_SKETCHES', '0') == '1'
+
+# --- Konfigurasi Eksekusi Paralel ---
+# PB_WORKERS=0 memakai semua core yang tersedia, 1 mematikan paralelisme; PB_PARTITION_ROWS dan
+# PB_PROCESS_ROWS adalah ukuran minimum partisi seleksi cube dan partisi baris mentah saat membangun cube
+WORKERS = int(os.environ.get('PB_WORKERS', '0'))
+PARTITION_ROWS = int(os.environ.get('PB_PARTITION_ROWS', '250000'))
+PROCESS_ROWS = int(os.environ.get('PB_PROCESS_ROWS', '1000000'))
+
+# --- Konfigurasi Graf Filter ---
+# Jalur pandas: mask filter diperbarui inkremental per sesi dan konteks agregasi dipakai ulang bila mask
+# gabungan tidak berubah; PB_FILTER_HISTORY = jumlah konteks (per mask) yang disimpan per sesi
+FILTER_GRAPH_MODE = os.environ.get('PB_FILTER_GRAPH', '1') == '1'
+FILTER_HISTORY = int(os.environ.get('PB_FILTER_HISTORY', '8'))
+
+# --- Konfigurasi View Termaterialisasi ---
+# View yang ditulis `python -m precompute` sebelum server dimulai dilayani tanpa filter dan agregasi
+VIEW_STORE_MODE = os.environ.get('PB_VIEW_STORE', '1') == '1'
+
+# --- Konfigurasi API JSON ---
+# PB_API_PORT menjalankan API agregat (api.py) di thread samping dashboard, memakai data dan indeks yang sama
+# (pada mode registry: dataset default, yaitu PB_DATA_FILE bila ada di PB_DATA_DIR)
+API_HOST = os.environ.get('PB_API_HOST', '127.0.0.1')
+API_PORT = int(os.environ.get('PB_API_PORT', '0'))
+
+# --- Konfigurasi Profiling ---
+# PB_PROFILE=1 menampilkan panel debug di sidebar; PB_PROFILE_LOG (JSONL) dan PB_PROFILE_PROM
+# (teks Prometheus) menulis hasil ke file. Bila ketiganya kosong, tidak ada tahap yang diukur.
+PROFILE_PANEL = os.environ.get('PB_PROFILE', '0') == '1'
+PROFILE_LOG = os.environ.get('PB_PROFILE_LOG', '')
+PROFILE_PROM = os.environ.get('PB_PROFILE_PROM', '')
+PROFILING = PROFILE_PANEL or bool(PROFILE_LOG) or bool(PROFILE_PROM)
+
+if PROFILING:
+    start_run()
+
+
+# --- Cache Data untuk Streamlit ---
+def data_file_available(file_path):
+    """Menampilkan pesan error bila file CSV tidak ada."""
+    if os.path.exists(file_path):
+        return True
+    st.error(f"File '{file_path}' tidak ditemukan. Pastikan file CSV berada di direktori yang sama dengan aplikasi Streamlit.")
+    return False
+
+
+@st.cache_resource
+def get_executor():
+    """Executor agregat tunggal per proses server; pool thread-nya dipakai bersama semua sesi."""
+    # Tanpa process pool: partisi baris mentah juga dikerjakan thread (lihat AggregateExecutor)
+    return AggregateExecutor(WORKERS, partition_rows=PARTITION_ROWS, process_rows=PROCESS_ROWS, processes=False)
+
+
+@st.cache_resource
+def load_data(compact=False, stream=False, sketches=False):
+    """Memuat paket data sekali per proses; semua sesi memakai objek yang sama, jadi perlakukan read-only.
+
+    Bukan st.cache_data: salinan per rerun akan ikut tertahan di session_state (FilterGraph, agg_ctx)
+    sehingga setiap sesi memegang satu paket data penuh.
+    """
+    if not data_file_available(DATA_FILE):
+        return None
+    return build_data(DATA_FILE, compact, stream, SNAPSHOT_MODE, STREAM_MEMORY_MB, sketches, get_executor())
+
+
+@st.cache_resource
+def load_data_shared(compact=False, stream=False, signature=None):
+    """Paket data yang dipetakan dari dataset bersama; hit cache mengembalikan objek (view) yang sama, bukan salinan."""
+    return open_shared(DATA_FILE, compact, stream, STREAM_MEMORY_MB)
+
 
-    # Spines
-    for spine in ax.spines.values():
-        spine.set_color("#4b5563")
+@st.cache_resource
+def get_data_store(compact=False, stream=False, sketches=False):
+    """Penyimpan paket data bersama untuk mode inkremental; hanya diganti di bawah lock."""
+    return {'data': None, 'lock': threading.Lock()}
 
-    # Ticks
-    ax.tick_params(colors="#e5e7eb")
 
-    # Labels & title
-    ax.title.set_color("#e5e7eb")
-    ax.xaxis.label.set_color("#e5e7eb")
-    ax.yaxis.label.set_color("#e5e7eb")
+def load_data_incremental(compact=False, stream=False, sketches=False):
+    """Paket data terbaru: dibangun penuh pada pemanggilan pertama, lalu hanya baris tambahan yang di-parse."""
+    if not data_file_available(DATA_FILE):
+        return None
+    store = get_data_store(compact, stream, sketches)
+    with store['lock']:
+        if store['data'] is None:
+            store['data'] = build_data(
+                DATA_FILE, compact, stream, SNAPSHOT_MODE, STREAM_MEMORY_MB, sketches, get_executor())
+        else:
+            store['data'], _ = refresh_data(store['data'], DATA_FILE, compact, stream, SNAPSHOT_MODE, STREAM_MEMORY_MB)
+        return store['data']
+
 
-    # Tick labels
-    for label in ax.get_xticklabels() + ax.get_yticklabels():
-        label.set_color("#e5e7eb")
+@st.cache_resource
+def get_query_backend(name, source, compact, signature):
+    """Backend engine per sumber dan versi file; opsi filter dipindai sekali lalu dipakai bersama semua sesi."""
+    backend = open_backend(name, source, compact=compact)
+    backend.describe()
+    return backend
 
-    # Legend
-    legend = ax.get_legend()
-    if legend is not None:
-        legend.get_frame().set_facecolor("#020617")
-        legend.get_frame().set_edgecolor("#4b5563")
-        for text in legend.get_texts():
-            text.set_color("#e5e7eb")
 
+@st.cache_resource
+def load_view_store(source, version, compact):
+    """View termaterialisasi untuk versi dataset ini, dimuat sekali per proses dan dipakai bersama semua sesi."""
+    return read_view_store(source, version, compact)
 
-# Global seaborn theme
-sns.set_theme(style="darkgrid")
+
+@st.cache_resource
+def get_api_source(host, port):
+    """Sumber data API yang berjalan bersama dashboard; server dimulai sekali per proses."""
+    source = DataSource()
+    start_in_thread(source, host, port)
+    return source
 
 
-# --- Pemuatan dan Preprocessing Data ---
 @st.cache_data
-def load_data():
-    """Memuat data dan melakukan preprocessing awal (termasuk membuat kolom kelompok usia)."""
-    file_path = 'shopping_behavior_updated.csv'
-    if not os.path.exists(file_path):
-        st.error(f"File '{file_path}' tidak ditemukan. Pastikan file CSV berada di direktori yang sama dengan aplikasi Streamlit.")
-        return None
+def load_memory_report(file_path):
+    """Laporan penghematan memori mode kompak dibanding frame standar."""
+    return memory_report(read_source(file_path), read_source(file_path, compact=True))
+
+
+def load_registry_dataset(file_path):
+    """Loader registry: paket data satu CSV dengan mode pemuatan yang sama seperti load_data()."""
+    return build_data(file_path, COMPACT_MODE, STREAM_MODE, SNAPSHOT_MODE, STREAM_MEMORY_MB, SKETCH_MODE, get_executor())
+
+
+@st.cache_resource
+def get_registry(directory, budget_mb):
+    """Registry dataset tunggal per proses server; dataset dan anggaran memorinya dipakai bersama semua sesi."""
+    return DatasetRegistry(directory, load_registry_dataset, budget_mb * 1024 ** 2)
+
+
+# Pemilih dataset (mode registry): file terpilih menggantikan DATA_FILE untuk seluruh skrip
+registry = dataset_name = default_dataset = None
+if DATA_DIR:
+    registry = get_registry(DATA_DIR, REGISTRY_MB)
+    dataset_names = registry.names()
+    if dataset_names:
+        default_name = os.path.basename(DATA_FILE)
+        default_dataset = default_name if default_name in dataset_names else dataset_names[0]
+        dataset_name = st.sidebar.selectbox("Dataset:", dataset_names, index=dataset_names.index(default_dataset))
+        DATA_FILE = registry.path(dataset_name)
+        if 'PB_BACKEND_SOURCE' not in os.environ:
+            BACKEND_SOURCE = DATA_FILE
+    else:
+        st.error(f"Tidak ada file CSV di direktori dataset '{DATA_DIR}'.")
+
+with stage('load_data') as s:
+    if QUERY_BACKEND != 'pandas':
+        backend = data = None
+        if data_file_available(BACKEND_SOURCE):
+            stat = os.stat(BACKEND_SOURCE)
+            backend = get_query_backend(QUERY_BACKEND, BACKEND_SOURCE, COMPACT_MODE, (stat.st_size, stat.st_mtime_ns))
+            data = backend.describe()
+    else:
+        if DATA_DIR:
+            data = None
+            if dataset_name is not None:
+                try:
+                    data = registry.get(dataset_name)
+                except KeyError as exc:
+                    # File bisa dihapus setelah daftar dataset dibaca pada rerun ini
+                    st.error(f"{exc.args[0]}. Pilih dataset lain atau muat ulang halaman.")
+        elif INCREMENTAL_MODE:
+            data = load_data_incremental(COMPACT_MODE, STREAM_MODE, SKETCH_MODE)
+        elif SHARED_MODE:
+            data = None
+            if data_file_available(DATA_FILE):
+                stat = os.stat(DATA_FILE)
+                data = load_data_shared(COMPACT_MODE, STREAM_MODE, (stat.st_size, stat.st_mtime_ns))
+        else:
+            data = load_data(COMPACT_MODE, STREAM_MODE, SKETCH_MODE)
+        backend = PandasBackend(data, get_executor()) if data is not None else None
+    if data is not None:
+        s.set(rows=data['n_rows'])
+        # Mode registry: API hanya melayani dataset default, bukan dataset yang terakhir dipilih suatu sesi
+        if API_PORT and dataset_name == default_dataset:
+            get_api_source(API_HOST, API_PORT).publish(data, backend)
+    view_store = {}
+    if data is not None and VIEW_STORE_MODE:
+        view_store = load_view_store(
+            BACKEND_SOURCE if QUERY_BACKEND != 'pandas' else DATA_FILE, data['version'], COMPACT_MODE)
+
+
+# --- Cache Figur (Proses) ---
+# Objek Figure Plotly yang sudah jadi dan teks kesimpulan disimpan per state filter ternormalisasi,
+# dipakai bersama oleh semua sesi dan dibatasi jumlah entri serta total byte (LRU). Figur di cache
+# bersifat read-only: hit cache langsung diteruskan ke st.plotly_chart tanpa di-parse ulang dari JSON.
+class FigureCache:
+    """Cache LRU thread-safe dengan batas entri dan byte serta penghitung hit/miss."""
+
+    def __init__(self, max_entries=512, max_bytes=64 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sizeof(value):
+        # Ukuran spesifikasi JSON figur ('bytes', diukur sekali saat build) plus teks kesimpulan
+        if value is None:
+            return 0
+        return value['bytes'] + len(value['conclusion'])
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def __contains__(self, key):
+        # Tanpa menyentuh urutan LRU maupun penghitung hit/miss
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries[key][1]
+            self._entries[key] = (value, size)
+            self._entries.move_to_end(key)
+            self.nbytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+def cached_view(cache, name, ctx):
+    """Hasil build_view untuk `name` pada state filter `ctx.key`, dari cache bila ada."""
+    key = (ctx.key, name)
+    entry = cache.get(key)
+    if entry is not None:
+        return entry[0]
+    with stage(f'build:{name}') as s:
+        view = VIEWS[name]['build'](ctx, **VIEWS[name].get('params', {}))
+        if view is not None:
+            _, _, pio = plotly_modules()
+
+            if ctx.approximate:
+                view['conclusion'] += ' ' + ctx.error_note(VIEWS[name]['aggregates'])
+            view['bytes'] = len(pio.to_json(view['figure'], validate=False))
+            s.set(bytes=FigureCache._sizeof(view))
+    cache.put(key, view)
+    return view
+
+
+# --- RENDER TAB ---
+# Plotly diimpor malas saat view pertama dibangun
+PLOTLY_IMPORT_LOCK = threading.Lock()
+
+
+def plotly_modules():
+    """(plotly.express, plotly.graph_objects, plotly.io), diimpor sekaligus di bawah satu kunci.
+
+    plotly.express memuat PIL.Image, sedangkan pio.to_json membaca PIL.Image dari sys.modules tanpa menunggu
+    impornya selesai; bila sesi lain (atau prefetch) sedang mengimpor plotly.express, thread ini bisa melihat
+    modul yang baru setengah terinisialisasi. Mengimpor ketiganya bersama di bawah kunci menutup celah itu.
+    """
+    with PLOTLY_IMPORT_LOCK:
+        import plotly.express as px
+        import plotly.graph_objects as go
+        import plotly.io as pio
+    return px, go, pio
+
+
+def build_view_age(ctx, k=3):
+    """Tab 1: Distribusi Usia: figur dan kesimpulan, atau None bila tidak ada data."""
+    _, go, _ = plotly_modules()
+
+    if not ctx.empty:
+        age_group_counts = ctx['age_group_counts']
+        # Kelompok yang seri dengan peringkat ke-k ikut ditandai dan berbagi nomor peringkat yang sama
+        top_age_groups = top_k(age_group_counts, k, ties=True)
+        ranks = top_age_groups.rank(method='min', ascending=False).astype(int)
+
+        fig_age = go.Figure()
+
+        fig_age.add_bar(
+            x=age_group_counts.index,
+            y=age_group_counts.values,
+            marker=dict(
+                color=age_group_counts.values,
+                colorscale="Teal",
+            ),
+            name="Jumlah Pelanggan"
+        )
 
-    df = pd.read_csv(file_path)
+        fig_age.add_trace(
+            go.Scatter(
+                x=list(age_group_counts.index),
+                y=age_group_counts.values,
+                mode="lines+markers",
+                line=dict(color="#22d3ee", width=2),
+                name="Tren Usia"
+            )
+        )
 
-    # Preprocessing: Membuat kolom 'Age Group' 10 tahunan (Plot 1)
-    max_age = df['Age'].max()
-    df['Age Group'] = pd.cut(
-        df['Age'],
-        bins=range(0, max_age + 11, 10),
-        right=False,
-        labels=[f'{i}-{i+9}' for i in range(0, max_age + 1, 10) if i <= max_age]
-    ).astype(str)
-    
-    # Preprocessing: Membuat kolom 'Age Group' rentang khusus (Plot 6)
-    bins_bar = [18, 25, 35, 45, 55, 65, 100]
-    labels_bar = ['18-25', '26-35', '36-45', '46-55', '56-65', '65+']
-    df['Age Group_Bar'] = pd.cut(df['Age'], bins=bins_bar, labels=labels_bar, right=False)
-
-    return df
-
-
-df = load_data()
-
-# --- Mapping Dictionaries untuk Plot Peta ---
-US_STATE_ABBR = {
-    "Alabama":"AL","Alaska":"AK","Arizona":"AZ","Arkansas":"AR","California":"CA",
-    "Colorado":"CO","Connecticut":"CT","Delaware":"DE","Florida":"FL","Georgia":"GA",
-    "Hawaii":"HI","Idaho":"ID","Illinois":"IL","Indiana":"IN","Iowa":"IA",
-    "Kansas":"KS","Kentucky":"KY","Louisiana":"LA","Maine":"ME","Maryland":"MD",
-    "Massachusetts":"MA","Michigan":"MI","Minnesota":"MN","Mississippi":"MS","Missouri":"MO",
-    "Montana":"MT","Nebraska":"NE","Nevada":"NV","New Hampshire":"NH","New Jersey":"NJ",
-    "New Mexico":"NM","New York":"NY","North Carolina":"NC","North Dakota":"ND","Ohio":"OH",
-    "Oklahoma":"OK","Oregon":"OR","Pennsylvania":"PA","Rhode Island":"RI","South Carolina":"SC",
-    "South Dakota":"SD","Tennessee":"TN","Texas":"TX","Utah":"UT","Vermont":"VT",
-    "Virginia":"VA","Washington":"WA","West Virginia":"WV","Wisconsin":"WI","Wyoming":"WY",
-    "District of Columbia":"DC"
-}
+        for (age_group, count), rank in zip(top_age_groups.items(), ranks):
+            fig_age.add_annotation(
+                x=age_group,
+                y=count,
+                text=f"Top {rank}",
+                showarrow=True,
+                arrowhead=2,
+                ax=0,
+                ay=-30,
+                bgcolor="rgba(15,23,42,0.9)",
+                font=dict(color="#e5e7eb", size=12)
+            )
 
-STATE_CENTROIDS = {
-    'AL': (32.806671, -86.791130), 'AK': (61.370716, -152.404419), 'AZ': (33.729759, -111.431221),
-    'AR': (34.969704, -92.373123), 'CA': (36.116203, -119.681564), 'CO': (39.059811, -105.311104),
-    'CT': (41.597782, -72.755371), 'DE': (39.318523, -75.507141), 'FL': (27.766279, -81.686783),
-    'GA': (33.040619, -83.643074), 'HI': (21.094318, -157.498337), 'ID': (44.240459, -114.478828),
-    'IL': (40.349457, -88.986137), 'IN': (39.849426, -86.258278), 'IA': (42.011539, -93.210526),
-    'KS': (38.526600, -96.726486), 'KY': (37.668140, -84.670067), 'LA': (31.169546, -91.867805),
-    'ME': (44.693947, -69.381927), 'MD': (39.063946, -76.802101), 'MA': (42.230171, -71.530106),
-    'MI': (43.326618, -84.536095), 'MN': (45.694454, -93.900192), 'MS': (32.741646, -89.678696),
-    'MO': (38.456085, -92.288368), 'MT': (46.921925, -110.454353), 'NE': (41.125370, -98.268082),
-    'NV': (38.313515, -117.055374), 'NH': (43.452492, -71.563896), 'NJ': (40.298904, -74.521011),
-    'NM': (34.840515, -106.248482), 'NY': (42.165726, -74.948051), 'NC': (35.630066, -79.806419),
-    'ND': (47.528912, -99.784012), 'OH': (40.388783, -82.764915), 'OK': (35.565342, -96.928917),
-    'OR': (44.572021, -122.070938), 'PA': (40.590752, -77.209755), 'RI': (41.680893, -71.511780),
-    'SC': (33.856892, -80.945007), 'SD': (44.299782, -99.438828), 'TN': (35.747845, -86.692345),
-    'TX': (31.054487, -97.563461), 'UT': (40.150032, -111.862434), 'VT': (44.045876, -72.710686),
-    'VA': (37.769337, -78.169968), 'WA': (47.400902, -121.490494), 'WV': (38.491226, -80.954453),
-    'WI': (44.268543, -89.616508), 'WY': (42.755966, -107.302490), 'DC': (38.9072, -77.0369)
-}
+        fig_age.update_layout(
+            title_text="Distribusi Usia Pelanggan (Rentang 10 Tahun)",
+            xaxis_title="Rentang Usia Pelanggan",
+            yaxis_title="Jumlah Pelanggan",
+            bargap=0.15,
+            font=dict(size=13, color="#e5e7eb"),
+            title_x=0.5,
+            template="plotly_dark",
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="#020617",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+        )
 
+        return {'kind': 'plotly', 'figure': fig_age, 'conclusion': ctx.conclusion(generate_conclusion_age)}
+    return None
 
-# --- FUNGSI KESIMPULAN OTOMATIS ---
-def generate_conclusion_age(filtered_df):
-    if filtered_df.empty or 'Age Group' not in filtered_df.columns:
-        return "Tidak ada data usia yang cukup untuk dianalisis."
-    
-    counts = filtered_df['Age Group'].value_counts()
-    top_group = counts.idxmax()
-    count = counts.max()
-    total = len(filtered_df)
-    percent = (count / total) * 100
-
-    return (
-        f"Kelompok usia **{top_group}** mendominasi transaksi dengan "
-        f"**{count} pembelian ({percent:.1f}%)**, menunjukkan bahwa rentang usia tersebut "
-        f"merupakan segmen pelanggan paling aktif pada filter saat ini."
-    )
 
+def build_view_location(ctx, k=5):
+    """Tab 2: Lokasi per Kategori: figur dan kesimpulan, atau None bila tidak ada data."""
+    px, _, _ = plotly_modules()
 
-def generate_conclusion_location(filtered_df):
-    if filtered_df.empty or 'Location' not in filtered_df.columns:
-        return "Tidak ada data lokasi untuk dianalisis."
+    counts = ctx['category_location_counts']
 
-    counts = filtered_df['Location'].value_counts()
-    top_loc = counts.idxmax()
-    count = counts.max()
+    if not counts.empty:
+        top_locations = top_k_per_group(counts, 'Category', k).reset_index(name='Count')
 
-    return (
-        f"Lokasi dengan transaksi terbanyak adalah **{top_loc}** dengan "
-        f"**{count} transaksi**, sehingga wilayah ini dapat diprioritaskan "
-        f"sebagai target utama aktivitas pemasaran."
-    )
+        # Plotly bar chart (INTERAKTIF)
+        fig = px.bar(
+            top_locations,
+            x="Count",
+            y="Category",
+            color="Location",
+            barmode="group",
+            hover_data=["Location", "Count"],
+            title=f"Top {k} Lokasi dengan Pembelian Terbanyak per Kategori Produk",
+            height=400 + (50 * top_locations['Category'].nunique())
+        )
+
+        fig.update_layout(
+            legend_title_text="Lokasi",
+            title_font_size=16,
+            xaxis_title="Jumlah Pembelian",
+            yaxis_title="Kategori Produk",
+            plot_bgcolor='#0f172a',
+            paper_bgcolor='#0f172a',
+            font_color='white'
+        )
 
+        return {'kind': 'plotly', 'figure': fig, 'conclusion': ctx.conclusion(generate_conclusion_location)}
+    return None
 
-def generate_conclusion_map(filtered_df):
-    if filtered_df.empty or 'Location' not in filtered_df.columns:
-        return "Data lokasi tidak cukup untuk dianalisis di peta."
 
-    top_states = filtered_df['Location'].value_counts().head(3)
-    txt = ", ".join([f"{st} ({ct})" for st, ct in top_states.items()])
+def build_view_map(ctx, k=3):
+    """Tab 3: Peta USA: figur dan kesimpulan, atau None bila tidak ada data."""
+    px, go, _ = plotly_modules()
 
-    return (
-        f"Tiga state dengan transaksi terbanyak adalah: **{txt}**. "
-        f"Hal ini menunjukkan konsentrasi aktivitas belanja yang kuat pada wilayah-wilayah tersebut."
-    )
+    location_counts = ctx['location_counts'].reset_index(name='Count')
+    location_counts['state_code'] = location_counts['Location'].map(US_STATE_ABBR)
+    location_counts = location_counts.dropna(subset=['state_code'])
 
+    if not location_counts.empty:
+        fig_map = px.choropleth(
+            location_counts,
+            locations='state_code',
+            locationmode='USA-states',
+            scope='usa',
+            color='Count',
+            color_continuous_scale='Tealgrn',
+            title='Jumlah Transaksi per Lokasi (Peta USA)',
+            template='plotly_dark'
+        )
 
-def generate_conclusion_payment(filtered_df):
-    if filtered_df.empty or 'Payment Method' not in filtered_df.columns:
-        return "Tidak ada data metode pembayaran untuk dianalisis."
+        # State yang seri dengan peringkat ke-k ikut ditandai dengan nomor peringkat yang sama
+        top3 = location_counts.loc[top_k(location_counts['Count'], k, ties=True).index].reset_index(drop=True)
+        top3['lat'] = top3['state_code'].map(lambda c: STATE_CENTROIDS.get(c, (None, None))[0])
+        top3['lon'] = top3['state_code'].map(lambda c: STATE_CENTROIDS.get(c, (None, None))[1])
+        rank_text = [f"Top {rank}" for rank in top3['Count'].rank(method='min', ascending=False).astype(int)]
+
+        fig_map.add_trace(go.Scattergeo(
+            lat=top3['lat'],
+            lon=top3['lon'],
+            mode='markers+text',
+            text=rank_text,
+            textposition='top center',
+            marker=dict(size=10, line=dict(width=1, color="#22d3ee"), color="#22d3ee"),
+            hovertemplate="State: %{customdata[0]}<br>Jumlah: %{customdata[1]}<extra></extra>",
+            customdata=top3[['Location', 'Count']].values,
+            showlegend=False
+        ))
+
+        fig_map.update_layout(
+            margin=dict(l=10, r=10, t=60, b=10),
+            title_x=0.5,
+            paper_bgcolor="rgba(0,0,0,0)",
+            geo_bgcolor="#020617",
+        )
 
-    counts = filtered_df['Payment Method'].value_counts()
-    top_pay = counts.idxmax()
-    count = counts.max()
-    total = len(filtered_df)
-    percent = (count / total) * 100
+        return {'kind': 'plotly', 'figure': fig_map, 'conclusion': ctx.conclusion(generate_conclusion_map, k)}
+    return None
 
-    return (
-        f"Metode pembayaran yang paling banyak digunakan adalah **{top_pay}** dengan "
-        f"**{count} transaksi ({percent:.1f}%)**, menunjukkan preferensi pelanggan yang kuat "
-        f"terhadap metode pembayaran tersebut."
-    )
 
+def build_view_payment(ctx):
+    """Tab 4: Metode Pembayaran (Donut): figur dan kesimpulan, atau None bila tidak ada data."""
+    px, _, _ = plotly_modules()
 
-def generate_conclusion_heatmap(filtered_df):
-    if filtered_df.empty:
-        return "Tidak ada data yang cukup untuk membuat analisis musiman."
+    if not ctx.empty:
+        payment_counts = ctx['payment_counts'].sort_values(ascending=False).reset_index()
+        payment_counts.columns = ['Payment Method', 'Count']
 
-    pivot = filtered_df.pivot_table(
-        index='Category',
-        columns='Season',
-        values='Purchase Amount (USD)',
-        aggfunc='mean'
-    )
+        fig_pay = px.pie(
+            payment_counts,
+            names='Payment Method',
+            values='Count',
+            hole=0.55,
+            template='plotly_dark',
+        )
 
-    if pivot.empty:
-        return "Data tidak cukup untuk membentuk pola musiman antar kategori."
+        fig_pay.update_traces(
+            textposition='inside',
+            textinfo='percent+label'
+        )
 
-    max_cat = pivot.max(axis=1).idxmax()
-    max_season = pivot.loc[max_cat].idxmax()
-    max_value = pivot.loc[max_cat].max()
+        fig_pay.update_layout(
+            title_text="Proporsi Penggunaan Metode Pembayaran",
+            title_x=0.5,
+            showlegend=False,
+            paper_bgcolor="rgba(0,0,0,0)",
+        )
+
+        return {'kind': 'plotly', 'figure': fig_pay, 'conclusion': ctx.conclusion(generate_conclusion_payment)}
+    return None
+
+
+def build_view_heatmap(ctx):
+    """Tab 5: Heatmap Musim: figur dan kesimpulan, atau None bila tidak ada data."""
+    _, go, _ = plotly_modules()
+
+    pivot_data = ctx['category_season_mean']
+
+    if not pivot_data.empty:
+        # Heatmap Plotly beranotasi (pengganti seaborn) dengan tema gelap yang sama
+        fig_heat = go.Figure(go.Heatmap(
+            z=pivot_data.values,
+            x=[str(c) for c in pivot_data.columns],
+            y=[str(i) for i in pivot_data.index],
+            colorscale='Viridis',
+            texttemplate="%{z:.2f}",
+            textfont=dict(size=13),
+            hovertemplate="Kategori: %{y}<br>Musim: %{x}<br>Rata-rata: $%{z:.2f}<extra></extra>",
+        ))
+
+        fig_heat.update_layout(
+            title=dict(
+                text="<b>Rata-rata Jumlah Pembelian ($) per Kategori dan Musim</b>",
+                x=0.5,
+                font=dict(size=16),
+            ),
+            xaxis_title="Musim (Season)",
+            yaxis_title="Kategori (Category)",
+            yaxis=dict(autorange="reversed"),
+            height=560,
+            template="plotly_dark",
+            font=dict(color="#e5e7eb"),
+            paper_bgcolor="#020617",
+            plot_bgcolor="#020617",
+        )
+
+        return {'kind': 'plotly', 'figure': fig_heat, 'conclusion': ctx.conclusion(generate_conclusion_heatmap)}
+    return None
+
+
+def build_view_age_product(ctx):
+    """Tab 6: Produk per Usia: figur dan kesimpulan, atau None bila tidak ada data."""
+    _, go, _ = plotly_modules()
+
+    if not ctx.empty:
+        product_sales_by_age = ctx['age_bar_category_counts'].reset_index(name='Count')
+
+        pivot_stack = product_sales_by_age.pivot(
+            index='Age Group_Bar',
+            columns='Category',
+            values='Count'
+        ).fillna(0)
+
+        pivot_stack = pivot_stack.sort_index()
+
+        fig_stack = go.Figure()
+        for cat in pivot_stack.columns:
+            fig_stack.add_bar(
+                x=pivot_stack.index.astype(str),
+                y=pivot_stack[cat],
+                name=str(cat)
+            )
+
+        fig_stack.update_layout(
+            barmode='stack',
+            title_text="Produk Paling Laris per Kelompok Umur (Stacked)",
+            xaxis_title="Kelompok Umur",
+            yaxis_title="Jumlah Pembelian",
+            template="plotly_dark",
+            paper_bgcolor="rgba(0,0,0,0)",
+            plot_bgcolor="#020617",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+        )
+
+        return {'kind': 'plotly', 'figure': fig_stack, 'conclusion': ctx.conclusion(generate_conclusion_age_product)}
+    return None
+
+
+# 'params' diteruskan ke fungsi build (mis. k untuk peringkat top-k; k peta sama dengan analytics.CONCLUSIONS
+# agar kesimpulan dari view termaterialisasi cocok); 'aggregates' dipakai untuk prefetch
+# agregat dan catatan galat mode perkiraan
+VIEWS = {
+    'age': {
+        'label': "👦🏼 Distribusi Usia",
+        'title': "Distribusi Usia Pelanggan (Rentang 10 Tahun)",
+        'build': build_view_age,
+        'params': {'k': 3},
+        'aggregates': ['age_group_counts', 'age_group_first', 'total'],
+        'empty': "Tidak ada data untuk visualisasi ini.",
+    },
+    'location': {
+        'label': "🌎 Lokasi per Kategori",
+        'title': "Lokasi dengan Pembelian Terbanyak per Kategori Produk",
+        'build': build_view_location,
+        'params': {'k': 5},
+        'aggregates': ['category_location_counts'],
+        'empty': "Tidak ada data untuk kategori yang difilter.",
+    },
+    'map': {
+        'label': "🗺️ Peta USA",
+        'title': "Jumlah Transaksi per Lokasi (Peta USA)",
+        'build': build_view_map,
+        'params': {'k': MAP_TOP_K},
+        'aggregates': ['location_counts', 'location_first'],
+        'empty': "Tidak ada data lokasi yang valid untuk ditampilkan di peta.",
+    },
+    'payment': {
+        'label': "💳 Metode Pembayaran",
+        'title': "Penggunaan Metode Pembayaran",
+        'build': build_view_payment,
+        'aggregates': ['payment_counts', 'payment_first', 'total'],
+        'empty': "Tidak ada data untuk metode pembayaran yang difilter.",
+    },
+    'heatmap': {
+        'label': "🔎 Heatmap Musim",
+        'title': "Heatmap Rata-rata Jumlah Pembelian berdasarkan Kategori dan Musim",
+        'build': build_view_heatmap,
+        'aggregates': ['category_season_mean'],
+        'empty': "Tidak ada data untuk membuat Heatmap.",
+    },
+    'age_product': {
+        'label': "🛍️ Produk per Usia",
+        'title': "Produk Paling Laris per Kelompok Umur",
+        'build': build_view_age_product,
+        'aggregates': ['age_bar_category_counts'],
+        'empty': "Tidak ada data untuk Produk Paling Laris per Kelompok Umur.",
+    },
+}
+
+
+def render_view(name, ctx, cache):
+    """Menampilkan satu tab: judul, figur, dan kesimpulan (diambil dari cache figur bila tersedia)."""
+    view = VIEWS[name]
+    st.markdown("<div class='neon-card'>", unsafe_allow_html=True)
+    st.subheader(view['title'])
+
+    result = cached_view(cache, name, ctx)
+    if result is None:
+        st.write(view['empty'])
+    else:
+        with stage(f'serialize:{name}') as s:
+            st.plotly_chart(result['figure'], width="stretch")
+            s.set(bytes=result['bytes'])
+
+        st.markdown("### Kesimpulan")
+        st.info(result['conclusion'])
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+LAZY_TABS = os.environ.get('PB_LAZY_TABS', '1') == '1'
+# Prefetch: state filter yang berjarak satu interaksi dihitung di thread latar saat pengguna diam.
+# PB_PREFETCH_CPU = porsi maksimum satu core, PB_PREFETCH_STATES = state tetangga per interaksi.
+# Hanya pada jalur pandas: query engine (DuckDB/Arrow) memakai thread-nya sendiri di luar anggaran CPU worker
+# dan tidak bisa dihentikan di tengah jalan, sehingga akan bersaing langsung dengan rerun nyata
+PREFETCH_MODE = os.environ.get('PB_PREFETCH', '1') == '1' and QUERY_BACKEND == 'pandas'
+PREFETCH_CPU = float(os.environ.get('PB_PREFETCH_CPU', '0.25'))
+PREFETCH_IDLE_S = float(os.environ.get('PB_PREFETCH_IDLE_S', '0.3'))
+PREFETCH_STATES = int(os.environ.get('PB_PREFETCH_STATES', '32'))
+PREFETCH_CACHE_ENTRIES = int(os.environ.get('PB_PREFETCH_CACHE_ENTRIES', '256'))
+KPI_AGGREGATES = [
+    'total', 'category_distinct', 'location_distinct', 'age_group_counts', 'location_counts', 'category_counts',
+    'age_group_first', 'location_first', 'category_first',
+]
+FIGURE_CACHE_ENTRIES = int(os.environ.get('PB_FIGURE_CACHE_ENTRIES', '512'))
+FIGURE_CACHE_MB = int(os.environ.get('PB_FIGURE_CACHE_MB', '64'))
 
-    return (
-        f"Kategori **{max_cat}** memiliki rata-rata pengeluaran tertinggi pada musim **{max_season}** "
-        f"yakni sekitar **${max_value:.2f}**, mengindikasikan adanya pola musiman yang kuat "
-        f"untuk kategori tersebut."
-    )
 
+@st.cache_resource
+def get_figure_cache():
+    """Cache figur tunggal per proses server, dipakai bersama oleh semua sesi."""
+    return FigureCache(max_entries=FIGURE_CACHE_ENTRIES, max_bytes=FIGURE_CACHE_MB * 1024 ** 2)
 
-def generate_conclusion_age_product(filtered_df):
-    if filtered_df.empty or 'Age Group_Bar' not in filtered_df.columns:
-        return "Tidak ada data yang cukup untuk analisis produk per kelompok usia."
 
-    group = filtered_df.groupby(['Age Group_Bar', 'Category']).size()
-    top = group.idxmax()
-    count = group.max()
-    age, category = top
+# --- Prefetch Spekulatif (Proses) ---
+@st.cache_resource
+def get_prefetcher():
+    """Worker prefetch tunggal per proses server; rencana semua sesi dijalankan bergiliran."""
+    return Prefetcher(cpu_budget=PREFETCH_CPU, idle_s=PREFETCH_IDLE_S)
 
-    return (
-        f"Kelompok usia **{age}** paling banyak membeli kategori **{category}** "
-        f"dengan **{count} transaksi**, menunjukkan preferensi produk yang cukup jelas "
-        f"berdasarkan segmen umur."
+
+@st.cache_resource
+def get_result_cache():
+    """Konteks agregasi hasil prefetch per state filter, dipakai bersama oleh semua sesi."""
+    return ResultCache(PREFETCH_CACHE_ENTRIES)
+
+
+def prefetch_backend(backend):
+    """Backend worker prefetch atas paket data sesi (objek bersama, bukan salinan), dibuat per rencana.
+
+    Sengaja tidak di-cache per versi: pembungkusnya murah, sedangkan cache per versi menahan paket data
+    lama (mis. versi sebelum refresh atau dataset yang sudah dilepas registry) selama proses hidup.
+    """
+    # Tanpa executor: semua kerja prefetch berjalan di thread worker, sehingga anggaran CPU-nya terukur
+    return PandasBackend(backend.data)
+
+
+def foreground():
+    """Blok request nyata: prefetch latar berhenti di batas berikutnya dan rencana sesi ini dibuang."""
+    if not PREFETCH_MODE:
+        return contextlib.nullcontext()
+    return get_prefetcher().foreground(st.session_state.setdefault('prefetch_session', uuid.uuid4().hex))
+
+
+def prefetch_state(backend, version, views, result_cache, figure_cache, selections, age_range, should_stop):
+    """Satu state tetangga: agregat KPI dan tab ke cache hasil, lalu figur tab ke cache figur (di thread worker)."""
+    key = (version, make_filter_key(selections, age_range), False)
+    if key in result_cache:
+        return None
+    ctx = AggregationContext(backend.filter_cube(selections, age_range), key=key)
+    for aggregate in KPI_AGGREGATES + [aggregate for name in views for aggregate in VIEWS[name]['aggregates']]:
+        if should_stop():
+            return False
+        ctx[aggregate]
+    result_cache.put(key, ctx)
+    for name in views:
+        if should_stop():
+            return False
+        cached_view(figure_cache, name, ctx)
+    return True
+
+
+def submit_prefetch(data, backend, selections, age_range, views):
+    """Mengganti rencana prefetch sesi ini dengan state yang berjarak satu interaksi dari state sekarang."""
+    compute = functools.partial(
+        prefetch_state, prefetch_backend(backend), data['version'], views,
+        get_result_cache(), get_figure_cache(),
+    )
+    states = neighbor_states(selections, age_range, data['options'], data['age_bounds'])
+    get_prefetcher().submit(
+        st.session_state.setdefault('prefetch_session', uuid.uuid4().hex),
+        itertools.islice(states, PREFETCH_STATES), compute,
     )
 
 
 # --- MAIN DASHBOARD ---
-if df is not None:
+if data is not None:
+    options = data['options']
+
     # Header
     st.markdown("<div class='neon-card'>", unsafe_allow_html=True)
     st.title("📊 Analisis Perilaku Belanja Pelanggan 📊")
@@ -351,9 +889,9 @@ if df is not None:
     # Sidebar: Filter Global & Spesifik
     st.sidebar.header("📍 Filter Global")
 
-    all_gender = df['Gender'].unique()
-    all_category = df['Category'].unique()
-    all_season = df['Season'].unique()
+    all_gender = options['Gender']
+    all_category = options['Category']
+    all_season = options['Season']
 
     selected_gender = st.sidebar.multiselect("Pilih Gender:", all_gender, default=all_gender)
     selected_category = st.sidebar.multiselect("Pilih Kategori Produk:", all_category, default=all_category)
@@ -362,50 +900,93 @@ if df is not None:
     st.sidebar.markdown("---")
     st.sidebar.header("📍 Filter Spesifik")
 
-    min_age, max_age = int(df['Age'].min()), int(df['Age'].max())
+    min_age, max_age = data['age_bounds']
     age_range = st.sidebar.slider("Rentang Usia:", min_age, max_age, (min_age, max_age), step=1)
 
-    all_location = df['Location'].unique()
-    all_payment = df['Payment Method'].unique()
+    all_location = options['Location']
+    all_payment = options['Payment Method']
 
     selected_location = st.sidebar.multiselect("Lokasi:", all_location, default=all_location)
     selected_payment = st.sidebar.multiselect("Metode Pembayaran:", all_payment, default=all_payment)
 
-    # Terapkan semua filter
-    filtered_df = df[
-        (df['Gender'].isin(selected_gender)) &
-        (df['Category'].isin(selected_category)) &
-        (df['Season'].isin(selected_season)) &
-        (df['Location'].isin(selected_location)) &
-        (df['Payment Method'].isin(selected_payment)) &
-        (df['Age'].between(age_range[0], age_range[1]))
-    ]
+    selections = {
+        'Gender': selected_gender,
+        'Category': selected_category,
+        'Season': selected_season,
+        'Location': selected_location,
+        'Payment Method': selected_payment,
+    }
+
+    approximate = data.get('sketches') is not None and st.sidebar.toggle(
+        "Mode perkiraan (sketch & sampel)",
+        help="Agregat diperkirakan dari sketch per partisi atau sampel acak, lengkap dengan batas galatnya.",
+    )
+
+    # Request nyata: prefetch latar berhenti selama filter dan agregat sesi ini dihitung
+    with foreground():
+        # Terapkan semua filter pada sel cube; konteks agregasi dipakai ulang selama state filter sama
+        filter_key = (data['version'], make_filter_key(selections, age_range), approximate)
+        if st.session_state.get('agg_filter_key') != filter_key:
+            prefetched = get_result_cache().get(filter_key) if PREFETCH_MODE and not approximate else None
+            if approximate:
+                ctx = ApproxContext(data['sketches'], data, selections, age_range, key=filter_key)
+            elif filter_key[1] in view_store:
+                ctx = AggregationContext(None, key=filter_key, materialized=view_store[filter_key[1]])
+            elif prefetched is not None:
+                ctx = prefetched
+            elif FILTER_GRAPH_MODE and QUERY_BACKEND == 'pandas':
+                graph = st.session_state.get('filter_graph')
+                if graph is None or graph.version != data['version']:
+                    graph = FilterGraph(data['version'], get_executor(), FILTER_HISTORY)
+                    st.session_state['filter_graph'] = graph
+                with stage('filter:graph') as s:
+                    ctx = graph.update(data, selections, age_range, key=filter_key)
+                    s.set(rows=len(ctx.cube_slice), **graph.last_update)
+            else:
+                with stage('filter') as s:
+                    cube_slice = backend.filter_cube(selections, age_range)
+                    s.set(rows=len(cube_slice))
+                ctx = AggregationContext(cube_slice, key=filter_key, executor=get_executor())
+            st.session_state['agg_filter_key'] = filter_key
+            st.session_state['agg_ctx'] = ctx
+        ctx = st.session_state['agg_ctx']
+
+        # Agregat KPI dan tab yang akan dirender (dan belum ada di cache figur) dihitung bersamaan
+        tab_labels = [view['label'] for view in VIEWS.values()]
+        figure_cache = get_figure_cache()
+        active_label = st.session_state.get('active_tab', tab_labels[0])
+        ctx.compute(KPI_AGGREGATES + [
+            aggregate for name, view in VIEWS.items()
+            if (not LAZY_TABS or view['label'] == active_label) and (ctx.key, name) not in figure_cache
+            for aggregate in view['aggregates']
+        ])
 
     st.sidebar.markdown("---")
-    st.sidebar.info(f"Menampilkan {len(filtered_df)} dari {len(df)} transaksi.")
+    total_filtered = ctx['total']
+    st.sidebar.info(f"Menampilkan {'≈' if ctx.approximate else ''}{total_filtered} dari {data['n_rows']} transaksi.")
+
+    if COMPACT_MODE and st.sidebar.checkbox("Tampilkan laporan memori (mode kompak)"):
+        st.sidebar.dataframe(load_memory_report(DATA_FILE))
 
     # KPI + Insight Cepat
     st.markdown("<div class='neon-card'>", unsafe_allow_html=True)
     col_a, col_b, col_c = st.columns(3)
+    kpi_help = {
+        name: ctx.error_note([name]) if ctx.approximate else None
+        for name in ('total', 'category_distinct', 'location_distinct')
+    }
     with col_a:
-        st.metric("Total Transaksi Terfilter", len(filtered_df))
+        st.metric("Total Transaksi Terfilter", total_filtered, help=kpi_help['total'])
     with col_b:
-        st.metric("Jumlah Kategori Aktif", filtered_df['Category'].nunique() if not filtered_df.empty else 0)
+        st.metric("Jumlah Kategori Aktif", ctx['category_distinct'], help=kpi_help['category_distinct'])
     with col_c:
-        st.metric("Jumlah Lokasi Aktif", filtered_df['Location'].nunique() if not filtered_df.empty else 0)
-
-    if not filtered_df.empty and 'Age Group' in filtered_df.columns:
-        ag_counts = filtered_df['Age Group'].value_counts(normalize=True) * 100
-        top_age = ag_counts.idxmax()
-        top_age_pct = ag_counts.max()
+        st.metric("Jumlah Lokasi Aktif", ctx['location_distinct'], help=kpi_help['location_distinct'])
 
-        loc_counts = filtered_df['Location'].value_counts()
-        top_loc = loc_counts.idxmax()
-        top_loc_val = loc_counts.max()
-
-        cat_counts = filtered_df['Category'].value_counts()
-        top_cat = cat_counts.idxmax()
-        top_cat_val = cat_counts.max()
+    if not ctx.empty:
+        top_age, top_age_count = next(iter(top_k(ctx['age_group_counts'], 1, first=ctx['age_group_first']).items()))
+        top_age_pct = top_age_count / total_filtered * 100
+        top_loc, top_loc_val = next(iter(top_k(ctx['location_counts'], 1, first=ctx['location_first']).items()))
+        top_cat, top_cat_val = next(iter(top_k(ctx['category_counts'], 1, first=ctx['category_first']).items()))
 
         st.markdown(
             f"**Insight Cepat:** Kelompok usia yang paling dominan saat ini adalah **{top_age}** "
@@ -413,294 +994,74 @@ if df is not None:
             f"Lokasi dengan transaksi terbanyak adalah **{top_loc}** (**{top_loc_val} transaksi**), "
             f"dan kategori produk yang paling sering dibeli adalah **{top_cat}** "
             f"(**{top_cat_val} transaksi**)."
+            + (' ' + ctx.error_note(['age_group_counts', 'location_counts', 'category_counts'])
+               if ctx.approximate else '')
         )
     else:
         st.markdown("_Tidak ada data yang cukup setelah filter diterapkan untuk membentuk insight cepat._")
     st.markdown("</div>", unsafe_allow_html=True)
 
-    # Tabs
-    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
-        "👦🏼 Distribusi Usia",
-        "🌎 Lokasi per Kategori",
-        "🗺️ Peta USA",
-        "💳 Metode Pembayaran",
-        "🔎 Heatmap Musim",
-        "🛍️ Produk per Usia"
-    ])
-
-    # Tab 1: Distribusi Usia
-    with tab1:
-        st.markdown("<div class='neon-card'>", unsafe_allow_html=True)
-        st.subheader("Distribusi Usia Pelanggan (Rentang 10 Tahun)")
-        
-        if 'Age Group' in filtered_df.columns and not filtered_df.empty:
-            age_group_counts = filtered_df['Age Group'].value_counts().sort_index()
-            top_age_groups = age_group_counts.sort_values(ascending=False).head(3)
-
-            fig_age = go.Figure()
-
-            fig_age.add_bar(
-                x=age_group_counts.index,
-                y=age_group_counts.values,
-                marker=dict(
-                    color=age_group_counts.values,
-                    colorscale="Teal",
-                ),
-                name="Jumlah Pelanggan"
-            )
-
-            fig_age.add_trace(
-                go.Scatter(
-                    x=list(age_group_counts.index),
-                    y=age_group_counts.values,
-                    mode="lines+markers",
-                    line=dict(color="#22d3ee", width=2),
-                    name="Tren Usia"
-                )
-            )
-
-            for rank, (age_group, count) in enumerate(top_age_groups.items(), start=1):
-                fig_age.add_annotation(
-                    x=age_group,
-                    y=count,
-                    text=f"Top {rank}",
-                    showarrow=True,
-                    arrowhead=2,
-                    ax=0,
-                    ay=-30,
-                    bgcolor="rgba(15,23,42,0.9)",
-                    font=dict(color="#e5e7eb", size=12)
-                )
-
-            fig_age.update_layout(
-                title_text="Distribusi Usia Pelanggan (Rentang 10 Tahun)",
-                xaxis_title="Rentang Usia Pelanggan",
-                yaxis_title="Jumlah Pelanggan",
-                bargap=0.15,
-                font=dict(size=13, color="#e5e7eb"),
-                title_x=0.5,
-                template="plotly_dark",
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="#020617",
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
-            )
-            st.plotly_chart(fig_age, use_container_width=True)
-
-            st.markdown("### Kesimpulan ")
-            st.info(generate_conclusion_age(filtered_df))
-        else:
-            st.write("Tidak ada data untuk visualisasi ini.")
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    # Tab 2: Lokasi per Kategori
-    with tab2:
-        st.markdown("<div class='neon-card'>", unsafe_allow_html=True)
-        st.subheader("Lokasi dengan Pembelian Terbanyak per Kategori Produk")
-
-    grouped = filtered_df.groupby(['Category', 'Location']).size().reset_index(name='Count')
-
-    if not grouped.empty:
-        grouped_sorted = grouped.sort_values(['Category', 'Count'], ascending=[True, False])
-        top_locations = grouped_sorted.groupby('Category').head(5)   # sudah jadi top 5
-
-        # Plotly bar chart (INTERAKTIF)
-        fig = px.bar(
-            top_locations,
-            x="Count",
-            y="Category",
-            color="Location",
-            barmode="group",
-            hover_data=["Location", "Count"],
-            title="Top 5 Lokasi dengan Pembelian Terbanyak per Kategori Produk",
-            height=400 + (50 * top_locations['Category'].nunique())
-        )
-
-        fig.update_layout(
-            legend_title_text="Lokasi",
-            title_font_size=16,
-            xaxis_title="Jumlah Pembelian",
-            yaxis_title="Kategori Produk",
-            plot_bgcolor='#0f172a',
-            paper_bgcolor='#0f172a',
-            font_color='white'
-        )
-
-        st.plotly_chart(fig, use_container_width=True)
-
-        st.markdown("### Kesimpulan")
-        st.info(generate_conclusion_location(filtered_df))
-
+    # Tabs: pada mode lazy hanya tab yang sedang dibuka yang dihitung dan dikirim ke browser
+    if LAZY_TABS:
+        tab_containers = st.tabs(tab_labels, key='active_tab', on_change='rerun')
     else:
-        st.write("Tidak ada data untuk kategori yang difilter.")
-
-    st.markdown("</div>", unsafe_allow_html=True)
-
-
-    # Tab 3: Peta USA
-    with tab3:
-        st.markdown("<div class='neon-card'>", unsafe_allow_html=True)
-        st.subheader("Jumlah Transaksi per Lokasi (Peta USA)")
-        
-        location_counts = filtered_df.groupby('Location').size().reset_index(name='Count')
-        location_counts['state_code'] = location_counts['Location'].map(US_STATE_ABBR)
-        location_counts = location_counts.dropna(subset=['state_code'])
-        
-        if not location_counts.empty:
-            fig_map = px.choropleth(
-                location_counts,
-                locations='state_code',
-                locationmode='USA-states',
-                scope='usa',
-                color='Count',
-                color_continuous_scale='Tealgrn',
-                title='Jumlah Transaksi per Lokasi (Peta USA)',
-                template='plotly_dark'
-            )
-
-            top3 = location_counts.sort_values('Count', ascending=False).head(3).reset_index(drop=True)
-            top3['lat'] = top3['state_code'].map(lambda c: STATE_CENTROIDS.get(c, (None, None))[0])
-            top3['lon'] = top3['state_code'].map(lambda c: STATE_CENTROIDS.get(c, (None, None))[1])
-            rank_text = [f"Top {i+1}" for i in range(len(top3))]
-
-            fig_map.add_trace(go.Scattergeo(
-                lat=top3['lat'],
-                lon=top3['lon'],
-                mode='markers+text',
-                text=rank_text,
-                textposition='top center',
-                marker=dict(size=10, line=dict(width=1, color="#22d3ee"), color="#22d3ee"),
-                hovertemplate="State: %{customdata[0]}<br>Jumlah: %{customdata[1]}<extra></extra>",
-                customdata=top3[['Location', 'Count']].values,
-                showlegend=False
-            ))
-
-            fig_map.update_layout(
-                margin=dict(l=10, r=10, t=60, b=10),
-                title_x=0.5,
-                paper_bgcolor="rgba(0,0,0,0)",
-                geo_bgcolor="#020617",
-            )
-            st.plotly_chart(fig_map, use_container_width=True)
-
-            st.markdown("### Kesimpulan")
-            st.info(generate_conclusion_map(filtered_df))
-        else:
-            st.write("Tidak ada data lokasi yang valid untuk ditampilkan di peta.")
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    # Tab 4: Metode Pembayaran (Donut)
-    with tab4:
-        st.markdown("<div class='neon-card'>", unsafe_allow_html=True)
-        st.subheader("Penggunaan Metode Pembayaran")
-
-        if not filtered_df.empty:
-            payment_counts = filtered_df['Payment Method'].value_counts().reset_index()
-            payment_counts.columns = ['Payment Method', 'Count']
-
-            fig_pay = px.pie(
-                payment_counts,
-                names='Payment Method',
-                values='Count',
-                hole=0.55,
-                template='plotly_dark',
-            )
-
-            fig_pay.update_traces(
-                textposition='inside',
-                textinfo='percent+label'
-            )
-
-            fig_pay.update_layout(
-                title_text="Proporsi Penggunaan Metode Pembayaran",
-                title_x=0.5,
-                showlegend=False,
-                paper_bgcolor="rgba(0,0,0,0)",
-            )
-
-            st.plotly_chart(fig_pay, use_container_width=True)
-
-            st.markdown("### Kesimpulan")
-            st.info(generate_conclusion_payment(filtered_df))
-        else:
-            st.write("Tidak ada data untuk metode pembayaran yang difilter.")
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    # Tab 5: Heatmap Musim
-    with tab5:
-        st.markdown("<div class='neon-card'>", unsafe_allow_html=True)
-        st.subheader("Heatmap Rata-rata Jumlah Pembelian berdasarkan Kategori dan Musim")
-        
-        pivot_data = filtered_df.pivot_table(
-            index='Category',
-            columns='Season',
-            values='Purchase Amount (USD)',
-            aggfunc='mean'
+        tab_containers = st.tabs(tab_labels)
+
+    with foreground():
+        for container, name in zip(tab_containers, VIEWS):
+            with container:
+                if not LAZY_TABS or container.open:
+                    with stage(f'tab:{name}'):
+                        render_view(name, ctx, figure_cache)
+
+    # Setelah render: state tetangga dihitung di latar selama pengguna diam
+    if PREFETCH_MODE and not ctx.approximate:
+        submit_prefetch(
+            data, backend, selections, age_range,
+            [name for name, view in VIEWS.items() if not LAZY_TABS or view['label'] == active_label][:1],
         )
-        
-        if not pivot_data.empty:
-            fig, ax = plt.subplots(figsize=(10, 7))
-            sns.heatmap(
-                pivot_data,
-                annot=True,
-                fmt=".2f",
-                cmap='viridis',
-                ax=ax
-            )
-
-            ax.set_title('Rata-rata Jumlah Pembelian ($) per Kategori dan Musim', fontsize=14, fontweight='bold', pad=15)
-            ax.set_xlabel('Musim (Season)', fontsize=12)
-            ax.set_ylabel('Kategori (Category)', fontsize=12)
-
-            style_dark_ax(ax)
-            plt.tight_layout()
-            st.pyplot(fig)
 
-            st.markdown("### Kesimpulan")
-            st.info(generate_conclusion_heatmap(filtered_df))
-        else:
-            st.write("Tidak ada data untuk membuat Heatmap.")
-        st.markdown("</div>", unsafe_allow_html=True)
-
-    # Tab 6: Produk per Usia
-    with tab6:
-        st.markdown("<div class='neon-card'>", unsafe_allow_html=True)
-        st.subheader("Produk Paling Laris per Kelompok Umur")
-
-        if 'Age Group_Bar' in filtered_df.columns and not filtered_df.empty:
-            product_sales_by_age = filtered_df.groupby(['Age Group_Bar', 'Category']).size().reset_index(name='Count')
-
-            pivot_stack = product_sales_by_age.pivot(
-                index='Age Group_Bar',
-                columns='Category',
-                values='Count'
-            ).fillna(0)
-
-            pivot_stack = pivot_stack.sort_index()
-
-            fig_stack = go.Figure()
-            for cat in pivot_stack.columns:
-                fig_stack.add_bar(
-                    x=pivot_stack.index.astype(str),
-                    y=pivot_stack[cat],
-                    name=str(cat)
-                )
-
-            fig_stack.update_layout(
-                barmode='stack',
-                title_text="Produk Paling Laris per Kelompok Umur (Stacked)",
-                xaxis_title="Kelompok Umur",
-                yaxis_title="Jumlah Pembelian",
-                template="plotly_dark",
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="#020617",
-                legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    cache_stats = figure_cache.stats()
+    st.sidebar.caption(
+        f"Cache figur: {cache_stats['hits']} hit / {cache_stats['misses']} miss, "
+        f"{cache_stats['entries']} entri ({cache_stats['bytes'] / 1024 ** 2:.1f} MB)"
+    )
+    if registry is not None:
+        registry_stats = registry.stats()
+        with st.sidebar.expander(
+            f"🗂️ Registry dataset: {registry_stats['total_mb']:.0f} / {registry_stats['budget_mb']:.0f} MB"
+        ):
+            st.caption(f"{registry_stats['evictions']} dataset dilepas (LRU) sejak server dimulai")
+            st.dataframe(registry_stats['datasets'], hide_index=True)
+
+
+# --- Panel Profiling ---
+@st.cache_resource
+def get_stage_metrics():
+    """Akumulator metrik tahap per proses server untuk file Prometheus."""
+    return StageMetrics()
+
+
+profile = finish_run()
+if profile is not None:
+    if PROFILE_LOG:
+        append_jsonl(profile, PROFILE_LOG)
+    if PROFILE_PROM:
+        stage_metrics = get_stage_metrics()
+        stage_metrics.add(profile)
+        write_prometheus(stage_metrics, PROFILE_PROM)
+    if PROFILE_PANEL:
+        with st.sidebar.expander("⏱️ Profil Rerun", expanded=False):
+            st.caption(f"Total rerun: {profile.seconds * 1000:.1f} ms, {len(profile.stages)} tahap")
+            st.dataframe(
+                [
+                    {
+                        'Tahap': '  ' * record['depth'] + record['stage'],
+                        'ms': round(record['seconds'] * 1000, 2),
+                        'Baris': record.get('rows'),
+                        'Byte': record.get('bytes'),
+                    }
+                    for record in sorted(profile.stages, key=lambda r: r['start'])
+                ],
+                hide_index=True,
             )
-
-            st.plotly_chart(fig_stack, use_container_width=True)
-
-            st.markdown("### Kesimpulan")
-            st.info(generate_conclusion_age_product(filtered_df))
-        else:
-            st.write("Tidak ada data untuk Produk Paling Laris per Kelompok Umur.")
-        st.markdown("</div>", unsafe_allow_html=True)
-
@@ -0,0 +1,451 @@
+"""Backend query untuk irisan cube: jalur pandas in-memory (default) dan engine kolumnar out-of-core.
+
+Setiap backend menerjemahkan state sidebar (nilai terpilih per kolom filter dan rentang usia) menjadi
+irisan cube yang sudah jadi (`finish_cube`), sehingga `AggregationContext`, grafik, dan kesimpulan
+tidak perlu tahu dari mana datanya berasal. Backend engine (Arrow/Acero atau DuckDB) mendorong filter
+dan group-by ke engine dan membaca CSV atau Parquet secara streaming; hanya sel cube hasil yang
+masuk ke pandas. Backend terpartisi menyimpan baris per Season x Category di samping CSV dan hanya
+membuka partisi yang cocok dengan filter.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from analytics import (
+    CUBE_DIMS,
+    FILTER_COLUMNS,
+    STREAM_COLUMNS,
+    aggregate_cube,
+    build_data,
+    dataset_version,
+    estimate_chunk_rows,
+    exclusive_lock,
+    finish_cube,
+    map_arrow,
+    select_cube,
+    source_signature,
+    write_arrow,
+)
+from profiling import stage
+
+MEASURE = 'Purchase Amount (USD)'
+
+
+def _is_parquet(source):
+    """Sumber Parquet: file .parquet atau direktori dataset hasil `export_parquet`."""
+    return os.path.isdir(source) or source.endswith('.parquet')
+
+
+def _active_filters(info, selections):
+    """Kolom filter yang benar-benar menyaring (tidak semua opsinya dipilih), beserta nilai terpilihnya."""
+    return {
+        col: list(values) for col, values in selections.items()
+        if not set(values).issuperset(info['options'][col])
+    }
+
+
+def _describe_batches(batches, source):
+    """Opsi filter (urutan kemunculan pertama), jumlah baris, rentang usia, dan baris pertama per sel cube.
+
+    `batches` berisi kolom CUBE_DIMS dalam urutan baris file. Sel cube ditentukan oleh semua kolom filter,
+    sehingga baris pertamanya tidak bergantung pada filter dan cukup dihitung sekali di sini.
+    """
+    import pyarrow.compute as pc
+
+    options = {col: {} for col in FILTER_COLUMNS}
+    n_rows, age_lo, age_hi = 0, None, None
+    first_rows = []
+    for batch in batches:
+        cells = batch.to_pandas().astype({col: 'str' for col in FILTER_COLUMNS} | {'Age': 'int64'})
+        cells['First Row'] = np.arange(n_rows, n_rows + batch.num_rows, dtype=np.int64)
+        first_rows.append(cells[CUBE_DIMS + ['First Row']].drop_duplicates(CUBE_DIMS))
+        n_rows += batch.num_rows
+        for col in FILTER_COLUMNS:
+            options[col].update(dict.fromkeys(pc.unique(batch.column(col)).to_pylist()))
+        bounds = pc.min_max(batch.column('Age')).as_py()
+        if bounds['min'] is not None:
+            age_lo = bounds['min'] if age_lo is None else min(age_lo, bounds['min'])
+            age_hi = bounds['max'] if age_hi is None else max(age_hi, bounds['max'])
+    signature = source_signature(source)
+    return {
+        'options': {col: list(values) for col, values in options.items()},
+        'n_rows': n_rows,
+        'age_bounds': (age_lo, age_hi),
+        'version': dataset_version(source, signature),
+        'first_rows': (
+            pd.concat(first_rows, ignore_index=True).drop_duplicates(CUBE_DIMS, ignore_index=True) if first_rows
+            else pd.DataFrame({col: pd.Series(dtype='int64' if col == 'Age' else 'str') for col in CUBE_DIMS}
+                              | {'First Row': pd.Series(dtype='int64')})
+        ),
+    }
+
+
+def _finish_engine_cube(cube, info, compact):
+    """Menyamakan cube hasil engine dengan cube pandas: urutan sel, dtype, kategori, First Row, dan bin kelompok usia.
+
+    Cube yang sudah membawa 'First Row' (backend terpartisi) dipakai apa adanya; selain itu kolom itu
+    diambil dari `info['first_rows']` (describe()).
+    """
+    cube = cube.sort_values(CUBE_DIMS, ignore_index=True)
+    cube = cube.astype({'Count': 'int64', 'Purchase Sum': 'int64', 'Age': 'int64'})
+    cube = cube.astype({col: 'str' for col in FILTER_COLUMNS})
+    if 'First Row' not in cube:
+        cube = cube.merge(info['first_rows'], on=CUBE_DIMS, how='left', validate='one_to_one')
+    if compact:
+        # Kategori lengkap dan terurut (seperti read_csv dtype='category'), bukan hanya yang muncul di irisan
+        cube = cube.astype({col: pd.CategoricalDtype(sorted(info['options'][col])) for col in FILTER_COLUMNS})
+    return finish_cube(cube, compact=compact, max_age=info['age_bounds'][1])
+
+
+# --- Backend Pandas (Default) ---
+class PandasBackend:
+    """Jalur bawaan: seluruh cube di memori, irisan diambil lewat indeks bitmap."""
+
+    name = 'pandas'
+
+    def __init__(self, data, executor=None):
+        self.data = data
+        self.executor = executor
+
+    @classmethod
+    def open(cls, source, compact=False, **build_kwargs):
+        return cls(build_data(source, compact=compact, **build_kwargs), build_kwargs.get('executor'))
+
+    def describe(self):
+        return self.data
+
+    def filter_cube(self, selections, age_range):
+        return select_cube(self.data, selections, age_range, self.executor)
+
+
+# --- Backend Arrow (Acero) ---
+class ArrowBackend:
+    """Dataset pyarrow atas CSV/Parquet; filter dan group-by dijalankan oleh plan Acero secara streaming."""
+
+    name = 'arrow'
+
+    def __init__(self, source, compact=False):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        self.source = source
+        self.compact = compact
+        if _is_parquet(source):
+            self.dataset = ds.dataset(source, format='parquet')
+        else:
+            import pyarrow.csv as pa_csv
+
+            column_types = {col: pa.string() for col in FILTER_COLUMNS} | {'Age': pa.int64(), MEASURE: pa.int64()}
+            self.dataset = ds.dataset(source, format=ds.CsvFileFormat(
+                convert_options=pa_csv.ConvertOptions(column_types=column_types)))
+        self._info = None
+
+    @classmethod
+    def open(cls, source, compact=False, **_):
+        return cls(source, compact=compact)
+
+    def describe(self):
+        """Opsi filter, jumlah baris, rentang usia, dan versi sumber dari satu pemindaian (disimpan)."""
+        if self._info is None:
+            # Tanpa thread agar batch datang berurutan dan urutan opsi sama dengan jalur pandas
+            batches = self.dataset.to_batches(columns=FILTER_COLUMNS + ['Age'], use_threads=False)
+            self._info = _describe_batches(batches, self.source)
+        return self._info
+
+    def expression(self, selections, age_range):
+        """Ekspresi filter Arrow: isin per kolom aktif, AND dengan rentang usia (inklusif)."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        expr = (pc.field('Age') >= int(age_range[0])) & (pc.field('Age') <= int(age_range[1]))
+        for col, values in _active_filters(self.describe(), selections).items():
+            expr = expr & pc.field(col).isin(pa.array(values, type=pa.string()))
+        return expr
+
+    def filter_cube(self, selections, age_range):
+        import pyarrow.acero as acero
+
+        expr = self.expression(selections, age_range)
+        plan = acero.Declaration.from_sequence([
+            # Filter pada node scan hanya untuk pruning (mis. statistik row group Parquet); node filter yang menyaring
+            acero.Declaration('scan', acero.ScanNodeOptions(self.dataset, columns=STREAM_COLUMNS, filter=expr)),
+            acero.Declaration('filter', acero.FilterNodeOptions(expr)),
+            acero.Declaration('aggregate', acero.AggregateNodeOptions(
+                [([], 'hash_count_all', None, 'Count'), (MEASURE, 'hash_sum', None, 'Purchase Sum')],
+                keys=CUBE_DIMS,
+            )),
+        ])
+        cube = plan.to_table().to_pandas()
+        return _finish_engine_cube(cube, self.describe(), self.compact)
+
+
+# --- Backend DuckDB ---
+class DuckDBBackend:
+    """DuckDB embedded atas CSV/Parquet; state sidebar diterjemahkan menjadi satu query SQL berparameter.
+
+    Satu instance dipakai bersama sesi dashboard, thread API, dan worker prefetch. Koneksi DuckDB tidak
+    thread-safe, jadi setiap query berjalan di cursor-nya sendiri (koneksi turunan atas database yang sama).
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, source, compact=False):
+        import duckdb
+
+        self.source = source
+        self.compact = compact
+        self.connection = duckdb.connect()
+        if _is_parquet(source):
+            pattern = os.path.join(source, '**', '*.parquet') if os.path.isdir(source) else source
+            self.relation = "read_parquet('{}', hive_partitioning=true)".format(pattern.replace("'", "''"))
+        else:
+            self.relation = "read_csv('{}', header=true)".format(source.replace("'", "''"))
+        self._info = None
+
+    @classmethod
+    def open(cls, source, compact=False, **_):
+        return cls(source, compact=compact)
+
+    @staticmethod
+    def _quote(col):
+        return '"' + col.replace('"', '""') + '"'
+
+    def describe(self):
+        """Opsi filter, jumlah baris, rentang usia, dan versi sumber dari satu pemindaian (disimpan)."""
+        if self._info is None:
+            # Proyeksi sederhana mempertahankan urutan baris file (preserve_insertion_order bawaan DuckDB)
+            columns = ', '.join(self._quote(col) for col in FILTER_COLUMNS + ['Age'])
+            with self.connection.cursor() as cursor:
+                reader = cursor.execute(f'SELECT {columns} FROM {self.relation}').fetch_record_batch()
+                self._info = _describe_batches(reader, self.source)
+        return self._info
+
+    def query(self, selections, age_range):
+        """SQL dan parameter untuk irisan cube: WHERE dari state filter, GROUP BY dimensi cube."""
+        dims = ', '.join(self._quote(col) for col in CUBE_DIMS)
+        where = ['"Age" BETWEEN ? AND ?']
+        params = [int(age_range[0]), int(age_range[1])]
+        for col, values in _active_filters(self.describe(), selections).items():
+            if values:
+                where.append(f"{self._quote(col)} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                where.append('FALSE')
+        sql = (
+            f'SELECT {dims}, count(*) AS "Count", CAST(sum({self._quote(MEASURE)}) AS BIGINT) AS "Purchase Sum" '
+            f'FROM {self.relation} WHERE {" AND ".join(where)} GROUP BY {dims}'
+        )
+        return sql, params
+
+    def filter_cube(self, selections, age_range):
+        sql, params = self.query(selections, age_range)
+        with self.connection.cursor() as cursor:
+            cube = cursor.execute(sql, params).df()
+        return _finish_engine_cube(cube, self.describe(), self.compact)
+
+
+# --- Backend Terpartisi (Season x Category) ---
+# Baris (kolom cube saja, plus posisi barisnya di CSV) ditulis sebagai file Arrow per kombinasi Season x Category,
+# masing-masing terurut menurut Age. Manifest JSON mencatat jumlah baris dan rentang usia tiap partisi, sehingga
+# filter global dan slider usia memangkas partisi tanpa membukanya, dan rentang usia di dalam partisi cukup
+# dicari biner.
+PARTITION_COLUMNS = ['Season', 'Category']
+PARTITION_VERSION = 2
+ROW_COLUMN = 'Row'
+
+
+def partition_dir(csv_path):
+    """Direktori layout terpartisi untuk suatu CSV (berisi manifest.json dan file part-*.arrow)."""
+    return f"{csv_path}.partitions"
+
+
+def read_manifest(csv_path):
+    """Manifest layout terpartisi bila masih sesuai dengan CSV; None bila belum ada atau kedaluwarsa."""
+    try:
+        with open(os.path.join(partition_dir(csv_path), 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != PARTITION_VERSION or manifest.get('source') != source_signature(csv_path):
+        return None
+    return manifest
+
+
+def write_partitions(csv_path, max_memory_mb=64):
+    """Menulis layout terpartisi dari CSV secara streaming; mengembalikan manifest-nya.
+
+    Fase 1 membaca CSV per chunk dan menambahkan baris setiap partisi ke stream Arrow-nya. Fase 2
+    mengurutkan tiap partisi menurut Age (memori puncak ~ satu partisi) dan menulisnya sebagai file satu
+    batch yang dapat di-memory-map. Layout ditulis ke direktori sementara lalu ditukar dengan yang lama.
+    """
+    import pyarrow as pa
+
+    out_dir = partition_dir(csv_path)
+    tmp_dir = out_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    signature = source_signature(csv_path)
+
+    options = {col: {} for col in FILTER_COLUMNS}
+    streams = {}
+    try:
+        chunks = pd.read_csv(csv_path, usecols=STREAM_COLUMNS, chunksize=estimate_chunk_rows(csv_path, max_memory_mb))
+        for chunk in chunks:
+            # Index chunk read_csv berlanjut antar chunk, yaitu posisi baris di file
+            chunk = chunk[STREAM_COLUMNS].assign(**{ROW_COLUMN: chunk.index.to_numpy(np.int64)})
+            for col in FILTER_COLUMNS:
+                options[col].update(dict.fromkeys(chunk[col].unique()))
+            for key, part in chunk.groupby(PARTITION_COLUMNS, sort=False):
+                table = pa.Table.from_pandas(part, preserve_index=False)
+                if key not in streams:
+                    path = os.path.join(tmp_dir, f'part-{len(streams):05d}.stream')
+                    sink = pa.OSFile(path, 'wb')
+                    streams[key] = (path, sink, pa.ipc.new_stream(sink, table.schema))
+                streams[key][2].write_table(table)
+    finally:
+        for _, sink, writer in streams.values():
+            writer.close()
+            sink.close()
+
+    partitions = []
+    for (season, category), (stream_path, _, _) in streams.items():
+        with pa.memory_map(stream_path) as source:
+            part = pa.ipc.open_stream(source).read_all().to_pandas()
+        part = part.sort_values('Age', kind='stable', ignore_index=True)
+        file_name = os.path.basename(stream_path).replace('.stream', '.arrow')
+        write_arrow(part, os.path.join(tmp_dir, file_name))
+        os.remove(stream_path)
+        partitions.append({
+            'file': file_name, 'Season': season, 'Category': category,
+            'rows': len(part), 'age_min': int(part['Age'].iloc[0]), 'age_max': int(part['Age'].iloc[-1]),
+        })
+
+    manifest = {
+        'version': PARTITION_VERSION,
+        'source': signature,
+        'options': {col: list(values) for col, values in options.items()},
+        'n_rows': sum(p['rows'] for p in partitions),
+        'age_bounds': [min(p['age_min'] for p in partitions), max(p['age_max'] for p in partitions)],
+        'partitions': partitions,
+    }
+    with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+
+    # File lama yang masih di-memory-map proses lain tetap valid setelah direktorinya dihapus (POSIX)
+    old_dir = out_dir + '.old'
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return manifest
+
+
+def open_partitions(csv_path, max_memory_mb=64):
+    """Manifest layout terpartisi; bila belum ada atau kedaluwarsa, satu proses (di bawah lock) menulisnya dulu."""
+    manifest = read_manifest(csv_path)
+    if manifest is not None:
+        return manifest
+    with exclusive_lock(partition_dir(csv_path) + '.lock'):
+        manifest = read_manifest(csv_path)
+        if manifest is None:
+            manifest = write_partitions(csv_path, max_memory_mb)
+    return manifest
+
+
+class PartitionedBackend:
+    """Layout Arrow terpartisi di samping CSV; biaya query sebanding dengan jumlah baris partisi yang cocok."""
+
+    name = 'partitioned'
+
+    def __init__(self, source, compact=False, max_memory_mb=64):
+        if _is_parquet(source):
+            raise ValueError("Backend 'partitioned' membangun layout-nya sendiri dari CSV, bukan dari Parquet")
+        self.source = source
+        self.compact = compact
+        self.manifest = open_partitions(source, max_memory_mb)
+        self._frames = {}
+        self.last_scan = None
+
+    @classmethod
+    def open(cls, source, compact=False, max_memory_mb=64, **_):
+        return cls(source, compact=compact, max_memory_mb=max_memory_mb)
+
+    def describe(self):
+        """Opsi filter, jumlah baris, rentang usia, dan versi sumber langsung dari manifest (tanpa pemindaian)."""
+        return {
+            'options': self.manifest['options'],
+            'n_rows': self.manifest['n_rows'],
+            'age_bounds': tuple(self.manifest['age_bounds']),
+            'version': dataset_version(self.source, self.manifest['source']),
+        }
+
+    def prune(self, selections, age_range):
+        """Entri manifest yang cocok dengan Season/Category terpilih dan rentang usianya beririsan dengan slider."""
+        seasons, categories = set(selections['Season']), set(selections['Category'])
+        return [
+            entry for entry in self.manifest['partitions']
+            if entry['Season'] in seasons and entry['Category'] in categories
+            and entry['age_max'] >= age_range[0] and entry['age_min'] <= age_range[1]
+        ]
+
+    def _frame(self, entry):
+        # Dipetakan sekali per partisi; halaman file dibagi lewat page cache OS
+        if entry['file'] not in self._frames:
+            self._frames[entry['file']] = map_arrow(os.path.join(partition_dir(self.source), entry['file']))
+        return self._frames[entry['file']]
+
+    def filter_cube(self, selections, age_range):
+        lo, hi = int(age_range[0]), int(age_range[1])
+        active = {
+            col: values for col, values in _active_filters(self.describe(), selections).items()
+            if col not in PARTITION_COLUMNS
+        }
+        parts, scanned = [], 0
+        with stage('scan:partitions') as s:
+            entries = self.prune(selections, (lo, hi))
+            for entry in entries:
+                frame = self._frame(entry)
+                # Partisi terurut menurut Age: rentang slider menjadi potongan berurutan
+                ages = frame['Age'].to_numpy()
+                part = frame.iloc[np.searchsorted(ages, lo, side='left'):np.searchsorted(ages, hi, side='right')]
+                scanned += len(part)
+                for col, values in active.items():
+                    part = part[part[col].isin(values)]
+                parts.append(part)
+            self.last_scan = {'partitions': len(entries), 'of': len(self.manifest['partitions']), 'rows': scanned}
+            s.set(rows=scanned)
+        frame = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+            {col: pd.Series(dtype='int64' if col in ('Age', MEASURE, ROW_COLUMN) else 'str')
+             for col in STREAM_COLUMNS + [ROW_COLUMN]})
+        # Posisi baris CSV menjadi index, sehingga aggregate_cube mengisi 'First Row' seperti jalur pandas
+        return _finish_engine_cube(aggregate_cube(frame.set_index(ROW_COLUMN)), self.describe(), self.compact)
+
+
+BACKENDS = {
+    'pandas': PandasBackend,
+    'arrow': ArrowBackend,
+    'duckdb': DuckDBBackend,
+    'partitioned': PartitionedBackend,
+}
+
+
+def open_backend(name, source, compact=False, **build_kwargs):
+    """Membuka backend bernama `name` atas `source` (CSV, file .parquet, atau direktori dataset Parquet)."""
+    if name not in BACKENDS:
+        raise ValueError(f"Backend tidak dikenal: {name!r} (pilihan: {', '.join(BACKENDS)})")
+    return BACKENDS[name].open(source, compact=compact, **build_kwargs)
+
+
+def export_parquet(csv_path, out_dir, partitioning=None):
+    """Mengonversi CSV ke dataset Parquet secara streaming (batch demi batch), untuk sumber backend engine."""
+    import pyarrow.dataset as ds
+
+    ds.write_dataset(
+        ArrowBackend(csv_path).dataset, out_dir, format='parquet',
+        partitioning=partitioning, existing_data_behavior='overwrite_or_ignore',
+    )
+    return out_dir
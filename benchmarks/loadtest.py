@@ -0,0 +1,353 @@
+"""Load test sesi bersamaan untuk app.py: N pengguna simulasi pada satu server `streamlit run` sungguhan.
+
+Setiap pengguna adalah klien websocket yang berbicara protokol yang sama dengan browser (BackMsg/ForwardMsg):
+klien menyimpan state widget dari delta yang diterima dan mengirimnya utuh pada setiap rerun, lalu mengulang
+interaksi sidebar yang realistis (menambah/menghapus opsi multiselect, menggeser slider usia, berpindah tab)
+secara acak ber-seed. Semua sesi dilayani satu proses server, sehingga cache proses (cache_data/cache_resource,
+cache figur, executor, prefetch) dipakai bersama dan saling bersaing seperti di produksi. Klien hanya mengurai
+protobuf dan berjalan dalam satu event loop, jadi latensi yang terukur didominasi server.
+
+Setiap kombinasi (ukuran dataset, jumlah pengguna) menjalankan server baru di proses anak tersendiri.
+Laporan per kombinasi: latensi rerun p50/p95/p99 (keseluruhan dan per jenis interaksi, diukur dari BackMsg
+rerun sampai script_finished), throughput rerun per detik, waktu muat dingin sesi pertama, serta RSS puncak
+proses server. Mode dashboard diatur lewat variabel lingkungan PB_* biasa.
+
+Contoh:
+    python -m benchmarks.loadtest --scales 1 10 --users 1 4 16 --actions 20
+    PB_COMPACT=1 python -m benchmarks.loadtest --scales 100 --users 8 --output benchmarks/results/load.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.run_benchmarks import DATA_DIR, REFERENCE_CSV, RESULTS_DIR, ROOT, environment
+from benchmarks.synthetic import write_synthetic_csv
+
+APP_PATH = os.path.join(ROOT, 'app.py')
+SCHEMA_VERSION = 3
+ACTIONS = ('multiselect', 'slider', 'tab')
+
+
+# --- Klien Websocket ---
+class Session:
+    """Satu sesi browser simulasi: state widget disimpan di klien dan dikirim utuh pada setiap rerun.
+
+    `widgets` memetakan id widget ke dict berisi 'kind' (multiselect, slider, atau tabs), 'options'
+    (opsi multiselect atau label tab), 'min'/'max' (slider), dan 'value' yang sedang dipilih.
+    """
+
+    def __init__(self, websocket, timeout):
+        self.websocket = websocket
+        self.timeout = timeout
+        self.widgets = {}
+
+    @classmethod
+    @contextlib.asynccontextmanager
+    async def open(cls, url, timeout):
+        from websockets.asyncio.client import connect
+
+        async with connect(url, subprotocols=['streamlit'], max_size=None, open_timeout=timeout) as websocket:
+            yield cls(websocket, timeout)
+
+    def of_kind(self, kind):
+        return [widget for widget in self.widgets.values() if widget['kind'] == kind]
+
+    def _widget_states(self):
+        from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+        states = []
+        for widget_id, widget in self.widgets.items():
+            state = WidgetState(id=widget_id)
+            if widget['kind'] == 'multiselect':
+                state.string_array_value.data.extend(widget['value'])
+            elif widget['kind'] == 'slider':
+                state.double_array_value.data.extend(float(v) for v in widget['value'])
+            else:
+                state.string_value = widget['value']
+            states.append(state)
+        return states
+
+    def _register(self, delta, tabs):
+        """Mencatat widget baru dari satu delta; nilai widget yang sudah dikenal tidak ditimpa."""
+        kind = delta.WhichOneof('type')
+        if kind == 'add_block':
+            block = delta.add_block
+            if block.WhichOneof('type') == 'tab_container':
+                tabs.append(block.tab_container)
+            elif block.WhichOneof('type') == 'tab' and tabs:
+                self.widgets.setdefault(tabs[-1].id, {'kind': 'tabs', 'options': [], 'value': None})
+                widget = self.widgets[tabs[-1].id]
+                if block.tab.label not in widget['options']:
+                    widget['options'].append(block.tab.label)
+                if widget['value'] is None and len(widget['options']) > tabs[-1].default_tab_index:
+                    widget['value'] = widget['options'][tabs[-1].default_tab_index]
+            return None
+        if kind != 'new_element':
+            return None
+        element = delta.new_element
+        element_kind = element.WhichOneof('type')
+        if element_kind == 'exception':
+            return f"{element.exception.type}: {element.exception.message}"
+        if element_kind == 'multiselect' and element.multiselect.id not in self.widgets:
+            proto = element.multiselect
+            self.widgets[proto.id] = {
+                'kind': 'multiselect', 'options': list(proto.options),
+                'value': [proto.options[i] for i in proto.default],
+            }
+        elif element_kind == 'slider' and element.slider.id not in self.widgets:
+            proto = element.slider
+            self.widgets[proto.id] = {
+                'kind': 'slider', 'min': proto.min, 'max': proto.max, 'value': list(proto.default),
+            }
+        return None
+
+    async def rerun(self):
+        """Mengirim rerun dengan state widget saat ini dan menunggu script_finished; mengembalikan galat skrip."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.page_script_hash = ''
+        message.rerun_script.widget_states.widgets.extend(self._widget_states())
+        await self.websocket.send(message.SerializeToString())
+
+        problems, tabs = [], []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await asyncio.wait_for(self.websocket.recv(), self.timeout))
+            kind = forward.WhichOneof('type')
+            if kind == 'delta':
+                problem = self._register(forward.delta, tabs)
+                if problem:
+                    problems.append(problem)
+            elif kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    problems.append("skrip gagal dikompilasi")
+                return problems
+
+
+# --- Pengguna Simulasi ---
+def choose_action(session, rng):
+    """Menerapkan satu interaksi acak pada state widget `session` (tanpa rerun); mengembalikan namanya."""
+    actions = [name for name in ACTIONS if name != 'tab' or session.of_kind('tabs')]
+    action = rng.choice(actions)
+    if action == 'multiselect':
+        widget = rng.choice(session.of_kind('multiselect'))
+        option = rng.choice(widget['options'])
+        widget['value'] = [o for o in widget['options'] if (o in widget['value']) != (o == option)]
+    elif action == 'slider':
+        widget = session.of_kind('slider')[0]
+        widget['value'] = sorted(rng.randint(int(widget['min']), int(widget['max'])) for _ in range(2))
+    else:
+        widget = session.of_kind('tabs')[0]
+        widget['value'] = rng.choice([label for label in widget['options'] if label != widget['value']])
+    return action
+
+
+async def run_user(user, session, args, samples, errors):
+    """`args.actions` interaksi berurutan pada satu sesi yang sudah dimuat."""
+    rng = random.Random(args.seed * 1_000_003 + user)
+    for _ in range(args.actions):
+        action = 'choose_action'
+        try:
+            action = choose_action(session, rng)
+            began = time.perf_counter()
+            problems = await session.rerun()
+        except Exception as exc:  # pemilihan interaksi, timeout, atau koneksi putus dicatat sebagai galat sesi
+            errors.append(f"user {user} {action}: {type(exc).__name__}: {exc}")
+            return
+        samples.append((action, time.perf_counter() - began))
+        errors.extend(f"user {user} {action}: {problem}" for problem in problems)
+        if args.think_ms:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_ms) / 1000)
+
+
+async def drive(url, args):
+    """Satu muat dingin lalu `args.users` sesi bersamaan; mengembalikan (muat dingin, sampel, galat, durasi)."""
+    samples, errors = [], []
+    async with Session.open(url, args.timeout) as session:
+        began = time.perf_counter()
+        errors.extend(f"cold_start: {problem}" for problem in await session.rerun())
+        cold = time.perf_counter() - began
+
+    async def start(user, session):
+        began = time.perf_counter()
+        problems = await session.rerun()
+        samples.append(('session_start', time.perf_counter() - began))
+        errors.extend(f"user {user} session_start: {problem}" for problem in problems)
+
+    async with contextlib.AsyncExitStack() as stack:
+        sessions = [await stack.enter_async_context(Session.open(url, args.timeout)) for _ in range(args.users)]
+        # Throughput diukur setelah semua sesi selesai dimuat
+        await asyncio.gather(*(start(user, session) for user, session in enumerate(sessions)))
+        began = time.perf_counter()
+        await asyncio.gather(*(run_user(user, session, args, samples, errors)
+                               for user, session in enumerate(sessions)))
+        elapsed = time.perf_counter() - began
+    return cold, samples, errors, elapsed
+
+
+# --- Server ---
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_healthy(port, server, timeout):
+    """Menunggu endpoint health server siap; RuntimeError bila server mati atau melewati batas waktu."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server streamlit berhenti dengan kode {server.returncode}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server streamlit tidak siap dalam {timeout:.0f} detik")
+
+
+def server_peak_rss_mb():
+    """RSS puncak proses anak yang sudah selesai (di sini: satu-satunya server) dalam MB, atau None."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss dalam KB di Linux, dalam byte di macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def percentiles(values):
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return {'n': 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'n': len(values), 'p50_s': p50, 'p95_s': p95, 'p99_s': p99, 'max_s': float(values.max())}
+
+
+def run_load(args):
+    """Proses anak: menjalankan satu server streamlit, mengarahkan klien ke sana, lalu meringkas hasilnya.
+
+    Server adalah satu-satunya anak proses ini, jadi RUSAGE_CHILDREN setelah server selesai memberi RSS
+    puncaknya.
+    """
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'streamlit', 'run', APP_PATH, '--server.headless', 'true',
+         '--server.port', str(port), '--server.address', '127.0.0.1', '--server.fileWatcherType', 'none',
+         '--browser.gatherUsageStats', 'false'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_healthy(port, server, args.timeout)
+        cold, samples, errors, elapsed = asyncio.run(drive(f'ws://127.0.0.1:{port}/_stcore/stream', args))
+    finally:
+        server.terminate()
+        try:
+            server.wait(30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+    interactions = [seconds for action, seconds in samples if action != 'session_start']
+    return {
+        'cold_start_s': cold,
+        'session_start': percentiles([s for action, s in samples if action == 'session_start']),
+        'rerun': percentiles(interactions),
+        'by_action': {
+            action: percentiles([s for a, s in samples if a == action]) for action in ACTIONS
+        },
+        'wall_s': elapsed,
+        'throughput_rps': len(interactions) / elapsed if elapsed else None,
+        'errors': len(errors),
+        'error_samples': errors[:10],
+        'server_peak_rss_mb': server_peak_rss_mb(),
+    }
+
+
+# --- Orkestrasi ---
+def run_child(csv_path, users, args):
+    """Menjalankan satu kombinasi di proses anak dengan PB_DATA_FILE menunjuk `csv_path`."""
+    command = [
+        sys.executable, '-m', 'benchmarks.loadtest', '--child',
+        '--users', str(users), '--actions', str(args.actions), '--think-ms', str(args.think_ms),
+        '--seed', str(args.seed), '--timeout', str(args.timeout),
+    ]
+    completed = subprocess.run(
+        command, cwd=ROOT, env={**os.environ, 'PB_DATA_FILE': csv_path},
+        capture_output=True, text=True, check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"load test gagal ({users} pengguna, {csv_path}):\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10],
+                        help="kelipatan ukuran CSV referensi (1 = file asli)")
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 4, 16], help="jumlah pengguna bersamaan")
+    parser.add_argument('--actions', type=int, default=20, help="interaksi per pengguna")
+    parser.add_argument('--think-ms', type=float, default=0, help="rata-rata jeda antar interaksi (ms)")
+    parser.add_argument('--seed', type=int, default=0, help="seed interaksi dan data sintetis")
+    parser.add_argument('--timeout', type=float, default=300, help="batas waktu satu rerun (detik)")
+    parser.add_argument('--output', help="file JSON hasil (default: benchmarks/results/load-<waktu>.json)")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        args.users = args.users[0]
+        print(json.dumps(run_load(args)))
+        return
+
+    results = []
+    for scale in args.scales:
+        if scale == 1:
+            name, csv_path = 'reference', REFERENCE_CSV
+        else:
+            name = f'synthetic_x{scale}'
+            csv_path = write_synthetic_csv(
+                REFERENCE_CSV, os.path.join(DATA_DIR, f'{name}_seed{args.seed}.csv'), scale, seed=args.seed)
+        for users in args.users:
+            row = {'dataset': name, 'scale': scale, 'users': users, **run_child(csv_path, users, args)}
+            rerun = row['rerun']
+            print(
+                f"[{name}] {users:>3} pengguna: p50 {rerun.get('p50_s', float('nan')):.3f}s"
+                f" p95 {rerun.get('p95_s', float('nan')):.3f}s p99 {rerun.get('p99_s', float('nan')):.3f}s"
+                f" | {row['throughput_rps'] or 0:.1f} rerun/s | RSS puncak server {row['server_peak_rss_mb'] or 0:.0f} MB"
+                f" | galat {row['errors']}",
+                file=sys.stderr,
+            )
+            results.append(row)
+
+    created = datetime.now(timezone.utc)
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{created:%Y%m%dT%H%M%SZ}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'schema': SCHEMA_VERSION,
+            'created': created.isoformat(),
+            'environment': environment(),
+            'config': {**vars(args), 'pb_env': {k: v for k, v in os.environ.items() if k.startswith('PB_')}},
+            'results': results,
+        }, f, indent=1)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
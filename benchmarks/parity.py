@@ -0,0 +1,235 @@
+"""Uji paritas backend query: setiap backend harus menghasilkan irisan cube, agregat, dan kesimpulan yang identik
+dengan jalur pandas bawaan, pada mode standar dan kompak serta untuk state filter tetap dan acak.
+Jalur paralel (`--workers`) juga diuji: cube dan agregatnya harus identik dengan jalur serial, dan graf filter
+inkremental (`--walk`) harus menghasilkan seleksi yang sama dengan filter penuh di setiap langkah interaksi acak.
+Satu instance backend juga dipanggil dari banyak thread sekaligus (`--threads`), seperti saat dipakai bersama
+sesi dashboard, API, dan worker prefetch: setiap panggilan harus menghasilkan irisan yang sama dengan jalur serial.
+
+Contoh:
+    python -m benchmarks.parity --backends arrow duckdb --scenarios 50
+    python -m benchmarks.parity --source benchmarks/.data/synthetic_x100_seed0.csv --parquet
+    python -m benchmarks.parity --backends --workers 8
+"""
+import argparse
+import importlib.util
+import os
+import random
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import analytics
+from backends import BACKENDS, PandasBackend, _is_parquet, export_parquet, open_backend
+from benchmarks.run_benchmarks import REFERENCE_CSV
+from parallel import AggregateExecutor
+
+
+def scenarios(info, n_random, seed):
+    """State filter tetap (semua, sempit, kosong, usia di luar data) ditambah `n_random` state acak."""
+    options = info['options']
+    lo, hi = info['age_bounds']
+    everything = {col: list(options[col]) for col in analytics.FILTER_COLUMNS}
+    fixed = {
+        'default': (everything, (lo, hi)),
+        'narrow': ({**everything, 'Season': options['Season'][:1], 'Category': options['Category'][:2]}, (25, 45)),
+        'single_location': ({**everything, 'Location': options['Location'][:1]}, (lo, hi)),
+        'no_gender': ({**everything, 'Gender': []}, (lo, hi)),
+        'single_age': (everything, (lo, lo)),
+    }
+    rng = random.Random(seed)
+    for i in range(n_random):
+        selections = {
+            col: rng.sample(values, rng.randint(1, len(values))) for col, values in options.items()
+        }
+        a, b = sorted(rng.randint(lo, hi) for _ in range(2))
+        fixed[f'random_{i}'] = (selections, (a, b))
+    return fixed
+
+
+def compare(reference, candidate, label, executor=None):
+    """Daftar perbedaan antara dua irisan cube beserta semua agregat dan kesimpulannya (kosong bila identik).
+
+    Dengan `executor`, agregat kandidat dihitung bersamaan lewat `AggregationContext.compute`.
+    """
+    problems = []
+    frames = [s.frame() if isinstance(s, analytics.CubeSelection) else s for s in (reference, candidate)]
+    try:
+        pd.testing.assert_frame_equal(frames[0].reset_index(drop=True), frames[1].reset_index(drop=True))
+    except AssertionError as exc:
+        problems.append(f"{label}: irisan cube berbeda: {str(exc).splitlines()[0]}")
+
+    ref_ctx = analytics.AggregationContext(reference)
+    cand_ctx = analytics.AggregationContext(candidate, executor=executor)
+    cand_ctx.compute(analytics.AGGREGATES)
+    for name in analytics.AGGREGATES:
+        ref_value, cand_value = ref_ctx[name], cand_ctx[name]
+        try:
+            if isinstance(ref_value, (pd.Series, pd.DataFrame)):
+                assert type(ref_value) is type(cand_value)
+                (pd.testing.assert_series_equal if isinstance(ref_value, pd.Series)
+                 else pd.testing.assert_frame_equal)(ref_value, cand_value)
+            else:
+                assert ref_value == cand_value, f"{ref_value!r} != {cand_value!r}"
+        except AssertionError as exc:
+            problems.append(f"{label}: agregat {name} berbeda: {str(exc).splitlines()[0] if str(exc) else ''}")
+    if not reference.empty:
+        for conclusion, args in analytics.CONCLUSIONS.values():
+            if conclusion(ref_ctx, *args) != conclusion(cand_ctx, *args):
+                problems.append(f"{label}: {conclusion.__name__} berbeda")
+    return problems
+
+
+def check_backend(name, source, reference_source, compact, args):
+    """Membandingkan backend `name` atas `source` dengan jalur pandas atas `reference_source`."""
+    reference = open_backend('pandas', reference_source, compact=compact, use_snapshot=False)
+    candidate = open_backend(name, source, compact=compact)
+    ref_info, cand_info = reference.describe(), candidate.describe()
+
+    problems = []
+    for key in ('options', 'n_rows', 'age_bounds'):
+        if ref_info[key] != cand_info[key]:
+            problems.append(f"describe()['{key}'] berbeda: {ref_info[key]!r} != {cand_info[key]!r}")
+
+    for label, (selections, age_range) in scenarios(ref_info, args.scenarios, args.seed).items():
+        problems.extend(compare(
+            reference.filter_cube(selections, age_range), candidate.filter_cube(selections, age_range), label))
+    return problems
+
+
+def check_concurrent(name, source, compact, args):
+    """Satu instance backend `name` dipanggil dari `args.threads` thread sekaligus; hasil dibandingkan dengan serial."""
+    backend = open_backend(name, source, compact=compact)
+    states = list(scenarios(backend.describe(), args.scenarios, args.seed).items())
+
+    def frame(selection):
+        selection = selection.frame() if isinstance(selection, analytics.CubeSelection) else selection
+        return selection.reset_index(drop=True)
+
+    expected = {label: frame(backend.filter_cube(*state)) for label, state in states}
+
+    def run(thread):
+        problems = []
+        # Urutan digeser per thread agar query berbeda berjalan bersamaan
+        for label, state in states[thread:] + states[:thread]:
+            try:
+                pd.testing.assert_frame_equal(frame(backend.filter_cube(*state)), expected[label])
+            except AssertionError as exc:
+                problems.append(f"thread {thread} {label}: irisan cube berbeda: {str(exc).splitlines()[0]}")
+            except Exception as exc:
+                problems.append(f"thread {thread} {label}: {type(exc).__name__}: {exc}")
+        return problems
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        return [problem for problems in pool.map(run, range(args.threads)) for problem in problems]
+
+
+def check_parallel(source, compact, args):
+    """Membandingkan jalur pandas serial dengan jalur paralel (partisi kecil agar semua cabang paralel terpakai)."""
+    executor = AggregateExecutor(args.workers, partition_rows=64, process_rows=256)
+    try:
+        reference = open_backend('pandas', source, compact=compact, use_snapshot=False)
+        candidate = PandasBackend(
+            analytics.build_data(source, compact=compact, use_snapshot=False, executor=executor), executor)
+        problems = []
+        try:
+            pd.testing.assert_frame_equal(reference.data['cube'], candidate.data['cube'])
+        except AssertionError as exc:
+            problems.append(f"cube paralel berbeda: {str(exc).splitlines()[0]}")
+        for label, (selections, age_range) in scenarios(reference.describe(), args.scenarios, args.seed).items():
+            problems.extend(compare(
+                reference.filter_cube(selections, age_range), candidate.filter_cube(selections, age_range),
+                label, executor))
+        return problems
+    finally:
+        executor.shutdown()
+
+
+def check_incremental(source, compact, args):
+    """Jalan acak `args.walk` interaksi satu widget: FilterGraph dibandingkan dengan select_cube per langkah."""
+    data = analytics.build_data(source, compact=compact, use_snapshot=False)
+    graph = analytics.FilterGraph(data['version'], history=4)
+    options = data['options']
+    lo, hi = data['age_bounds']
+    selections = {col: list(values) for col, values in options.items()}
+    age_range = (lo, hi)
+    rng = random.Random(args.seed)
+    problems = []
+    for step in range(args.walk):
+        col = rng.choice(analytics.FILTER_COLUMNS + ['Age'])
+        if col == 'Age':
+            age_range = tuple(sorted(rng.randint(lo, hi) for _ in range(2)))
+        else:
+            value = rng.choice(options[col])
+            selections[col] = [v for v in options[col] if (v in selections[col]) != (v == value)]
+        ctx = graph.update(data, selections, age_range)
+        problems.extend(compare(
+            analytics.select_cube(data, selections, age_range), ctx.cube_slice, f"langkah {step} ({col})"))
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='*', default=[name for name in BACKENDS if name != 'pandas'])
+    parser.add_argument('--source', default=REFERENCE_CSV, help="CSV acuan (default: dataset asli)")
+    parser.add_argument('--parquet', action='store_true', help="juga menguji backend atas salinan Parquet dari CSV")
+    parser.add_argument('--scenarios', type=int, default=25, help="jumlah state filter acak")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=0, help="worker jalur paralel (0 = tidak diuji)")
+    parser.add_argument('--threads', type=int, default=8,
+                        help="thread pemanggil bersamaan per instance backend (0 = tidak diuji)")
+    parser.add_argument('--walk', type=int, default=200, help="langkah uji graf filter inkremental (0 = tidak diuji)")
+    args = parser.parse_args(argv)
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = [args.source]
+        if args.parquet:
+            sources.append(export_parquet(args.source, os.path.join(tmp, 'parquet')))
+
+        for name in args.backends:
+            module = {'arrow': 'pyarrow', 'duckdb': 'duckdb', 'partitioned': 'pyarrow'}.get(name)
+            if module and importlib.util.find_spec(module) is None:
+                print(f"[{name}] dilewati: paket {module} tidak terpasang")
+                continue
+            for source in sources:
+                if name == 'partitioned' and _is_parquet(source):
+                    continue
+                for compact in (False, True):
+                    label = f"[{name}] {os.path.basename(source)} {'kompak' if compact else 'standar'}"
+                    problems = check_backend(name, source, args.source, compact, args)
+                    print(f"{label}: {'OK' if not problems else f'{len(problems)} perbedaan'}")
+                    for problem in problems[:20]:
+                        print(f"    {problem}")
+                    failures += len(problems)
+                    if args.threads:
+                        problems = check_concurrent(name, source, compact, args)
+                        print(f"{label} bersamaan x{args.threads}: "
+                              f"{'OK' if not problems else f'{len(problems)} perbedaan'}")
+                        for problem in problems[:20]:
+                            print(f"    {problem}")
+                        failures += len(problems)
+
+        if args.workers:
+            for compact in (False, True):
+                label = f"[paralel x{args.workers}] {'kompak' if compact else 'standar'}"
+                problems = check_parallel(args.source, compact, args)
+                print(f"{label}: {'OK' if not problems else f'{len(problems)} perbedaan'}")
+                for problem in problems[:20]:
+                    print(f"    {problem}")
+                failures += len(problems)
+
+        if args.walk:
+            for compact in (False, True):
+                label = f"[graf filter x{args.walk}] {'kompak' if compact else 'standar'}"
+                problems = check_incremental(args.source, compact, args)
+                print(f"{label}: {'OK' if not problems else f'{len(problems)} perbedaan'}")
+                for problem in problems[:20]:
+                    print(f"    {problem}")
+                failures += len(problems)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""Benchmark skala untuk tahap-tahap analytics: pemuatan, filter, agregasi per tab, dan kesimpulan.
+
+Setiap tahap diukur pada shopping_behavior_updated.csv (skala 1) dan pada data sintetis 100x, 1.000x,
+dan 10.000x ukurannya. Hasil ditulis sebagai JSON agar dapat dibandingkan antar rilis; RSS puncak dicatat
+sekali per run (seluruh dataset dalam satu proses), bukan per tahap.
+
+Contoh:
+    python -m benchmarks.run_benchmarks --scales 1 100 --output benchmarks/results/dev.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from backends import PartitionedBackend
+from benchmarks.synthetic import write_synthetic_csv
+from parallel import AggregateExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCE_CSV = os.path.join(ROOT, 'shopping_behavior_updated.csv')
+DATA_DIR = os.path.join(ROOT, 'benchmarks', '.data')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+SCHEMA_VERSION = 2
+
+
+def peak_rss_mb():
+    """RSS puncak proses dalam MB, atau None pada platform tanpa modul resource."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss dalam KB di Linux, dalam byte di macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def time_call(fn, repeats):
+    """Menjalankan `fn` sebanyak `repeats` kali; mengembalikan (hasil terakhir, daftar durasi dalam detik)."""
+    timings = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def filter_scenarios(data):
+    """State filter representatif: default (semua terpilih), sempit, dan satu lokasi."""
+    options = data['options']
+    ages = data['cube']['Age']
+    full_age = (int(ages.min()), int(ages.max()))
+    default = {col: list(options[col]) for col in analytics.FILTER_COLUMNS}
+    return {
+        'default': (default, full_age),
+        'narrow': (
+            {**default, 'Season': options['Season'][:1], 'Category': options['Category'][:2]},
+            (25, 45),
+        ),
+        'single_location': ({**default, 'Location': options['Location'][:1]}, full_age),
+    }
+
+
+def bench_dataset(name, scale, csv_path, args):
+    """Mengukur semua tahap untuk satu dataset; mengembalikan daftar baris hasil."""
+    results = []
+
+    def record(stage, timings, scenario=None, **extra):
+        results.append({
+            'dataset': name,
+            'scale': scale,
+            'stage': stage,
+            'scenario': scenario,
+            'repeats': len(timings),
+            'min_s': min(timings),
+            'median_s': statistics.median(timings),
+            'mean_s': statistics.fmean(timings),
+            **extra,
+        })
+
+    with open(csv_path, 'rb') as f:
+        n_rows = sum(1 for _ in f) - 1
+    load_repeats = 1 if n_rows > 1_000_000 else args.repeats
+    full_load = n_rows <= args.max_full_rows
+    executor = AggregateExecutor(args.workers)
+
+    data = None
+    if full_load:
+        data, timings = time_call(
+            lambda: analytics.build_data(csv_path, use_snapshot=False), load_repeats)
+        record('load_full', timings, rows=n_rows)
+        _, timings = time_call(
+            lambda: analytics.build_data(csv_path, compact=True, use_snapshot=False), load_repeats)
+        record('load_compact', timings, rows=n_rows)
+        if executor.parallel:
+            _, timings = time_call(
+                lambda: analytics.build_data(csv_path, use_snapshot=False, executor=executor), load_repeats)
+            record('load_full', timings, rows=n_rows, workers=executor.workers)
+
+    stream_data, timings = time_call(
+        lambda: analytics.build_data(csv_path, stream=True, max_memory_mb=args.stream_memory_mb), load_repeats)
+    record('load_stream', timings, rows=n_rows, memory_budget_mb=args.stream_memory_mb)
+    if data is None:
+        data = stream_data
+    cube, cube_index = data['cube'], data['cube_index']
+
+    partitioned = None
+    if importlib.util.find_spec('pyarrow') is not None:
+        partitioned, timings = time_call(
+            lambda: PartitionedBackend(csv_path, max_memory_mb=args.stream_memory_mb), 1)
+        record('load_partitioned', timings, rows=n_rows)
+
+    if data['df'] is not None:
+        row_index, timings = time_call(lambda: analytics.build_filter_index(data['df']), load_repeats)
+        record('filter_index_build', timings, rows=n_rows)
+
+    # Graf filter inkremental: satu interaksi (lokasi pertama dilepas lalu dipilih lagi) per pengulangan
+    graph = analytics.FilterGraph(data['version'], history=1)
+    default, full_age = filter_scenarios(data)['default']
+    toggled = {**default, 'Location': default['Location'][1:]}
+    graph.update(data, default, full_age)
+
+    def toggle_location():
+        graph.update(data, toggled, full_age)
+        return graph.update(data, default, full_age)
+
+    _, timings = time_call(toggle_location, args.repeats)
+    record('filter_graph_step', [t / 2 for t in timings], 'single_location_toggle')
+
+    for scenario, (selections, age_range) in filter_scenarios(data).items():
+        if data['df'] is not None:
+            _, timings = time_call(
+                lambda: analytics.filter_rows(data['df'], row_index, selections, age_range, output='rows'),
+                args.repeats)
+            record('filter_rows', timings, scenario)
+
+        cube_slice, timings = time_call(
+            lambda: analytics.filter_rows(cube, cube_index, selections, age_range), args.repeats)
+        record('filter_cube', timings, scenario, cube_cells=len(cube), slice_cells=len(cube_slice))
+
+        selection, timings = time_call(lambda: analytics.select_cube(data, selections, age_range), args.repeats)
+        record('select_cube', timings, scenario, cube_cells=len(cube), slice_cells=len(selection))
+
+        if partitioned is not None:
+            _, timings = time_call(lambda: partitioned.filter_cube(selections, age_range), args.repeats)
+            record('filter_partitioned', timings, scenario, **{
+                f'scan_{key}': value for key, value in partitioned.last_scan.items()})
+
+        # Agregat diukur pada jalur dashboard (seleksi + bincount) dan pada irisan yang dimaterialisasi (groupby)
+        for agg_name, aggregate in analytics.AGGREGATES.items():
+            _, timings = time_call(lambda: aggregate(selection), args.repeats)
+            record(f'aggregate:{agg_name}', timings, scenario)
+            _, timings = time_call(lambda: aggregate(cube_slice), args.repeats)
+            record(f'aggregate_frame:{agg_name}', timings, scenario)
+
+        # Semua agregat sekaligus: serial, lalu bersamaan di executor (tugas per agregat + partisi seleksi)
+        _, timings = time_call(
+            lambda: analytics.AggregationContext(selection).compute(analytics.AGGREGATES), args.repeats)
+        record('aggregate_all', timings, scenario, workers=1)
+        if executor.parallel:
+            parallel_selection = analytics.select_cube(data, selections, age_range, executor)
+            _, timings = time_call(
+                lambda: analytics.AggregationContext(parallel_selection, executor=executor).compute(
+                    analytics.AGGREGATES), args.repeats)
+            record('aggregate_all', timings, scenario, workers=executor.workers)
+
+        # Kesimpulan diukur dengan konteks yang agregatnya sudah dihitung (hanya biaya kesimpulan itu sendiri)
+        ctx = analytics.AggregationContext(selection)
+        for agg_name in analytics.AGGREGATES:
+            ctx[agg_name]
+        for conclusion, conclusion_args in analytics.CONCLUSIONS.values():
+            _, timings = time_call(lambda: conclusion(ctx, *conclusion_args), args.repeats)
+            record(f'conclusion:{conclusion.__name__}', timings, scenario)
+
+    executor.shutdown()
+    return results
+
+
+def environment():
+    """Metadata lingkungan untuk membandingkan hasil antar mesin dan rilis."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 100, 1000, 10000],
+                        help="kelipatan ukuran CSV referensi (1 = file asli)")
+    parser.add_argument('--repeats', type=int, default=5, help="jumlah ulangan per tahap")
+    parser.add_argument('--seed', type=int, default=0, help="seed generator data sintetis")
+    parser.add_argument('--max-full-rows', type=int, default=5_000_000,
+                        help="di atas jumlah baris ini hanya mode streaming yang diukur")
+    parser.add_argument('--stream-memory-mb', type=int, default=256, help="anggaran memori mode streaming")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="worker jalur paralel (0 = semua core; 1 = hanya jalur serial)")
+    parser.add_argument('--output', help="file JSON hasil (default: benchmarks/results/<waktu>.json)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for scale in args.scales:
+        if scale == 1:
+            name, csv_path = 'reference', REFERENCE_CSV
+        else:
+            name = f'synthetic_x{scale}'
+            csv_path = write_synthetic_csv(
+                REFERENCE_CSV, os.path.join(DATA_DIR, f'{name}_seed{args.seed}.csv'), scale, seed=args.seed)
+        print(f"[{name}] {csv_path}", file=sys.stderr)
+        results.extend(bench_dataset(name, scale, csv_path, args))
+
+    created = datetime.now(timezone.utc)
+    output = args.output or os.path.join(RESULTS_DIR, f"{created:%Y%m%dT%H%M%SZ}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'schema': SCHEMA_VERSION,
+            'created': created.isoformat(),
+            'environment': environment(),
+            'config': vars(args),
+            'peak_rss_mb': peak_rss_mb(),
+            'results': results,
+        }, f, indent=1)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
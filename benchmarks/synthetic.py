@@ -0,0 +1,63 @@
+"""Generator data sintetis ber-seed yang mengikuti distribusi kolom shopping_behavior_updated.csv.
+
+Setiap kolom diambil dari distribusi empiris kolom yang sama pada CSV referensi; 'Item Purchased'
+diambil bersyarat pada 'Category' agar pasangan item-kategori tetap konsisten. Karena dimensi lain
+diambil saling bebas, dataset besar mengisi hampir semua kombinasi cube, seperti data produksi.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1_000_000
+
+
+def fit_profile(reference):
+    """Distribusi empiris (nilai dan peluang) setiap kolom pada frame referensi."""
+    profile = {'columns': list(reference.columns), 'marginals': {}, 'items_by_category': {}}
+    for col in reference.columns:
+        if col in ('Customer ID', 'Item Purchased'):
+            continue
+        freq = reference[col].value_counts(normalize=True, sort=False)
+        profile['marginals'][col] = (freq.index.to_numpy(), freq.to_numpy())
+    for category, items in reference.groupby('Category')['Item Purchased']:
+        freq = items.value_counts(normalize=True, sort=False)
+        profile['items_by_category'][category] = (freq.index.to_numpy(), freq.to_numpy())
+    return profile
+
+
+def generate_rows(profile, n_rows, rng, start_id=1):
+    """Membuat `n_rows` baris sintetis dengan urutan kolom yang sama seperti CSV referensi."""
+    columns = {'Customer ID': np.arange(start_id, start_id + n_rows)}
+    for col, (values, probs) in profile['marginals'].items():
+        columns[col] = rng.choice(values, size=n_rows, p=probs)
+
+    items = np.empty(n_rows, dtype=object)
+    for category, (values, probs) in profile['items_by_category'].items():
+        rows = np.flatnonzero(columns['Category'] == category)
+        items[rows] = rng.choice(values, size=len(rows), p=probs)
+    columns['Item Purchased'] = items
+
+    return pd.DataFrame({col: columns[col] for col in profile['columns']})
+
+
+def write_synthetic_csv(reference_path, out_path, scale, seed=0):
+    """Menulis CSV sintetis sebesar `scale` x jumlah baris referensi (per chunk); file yang sudah ada dipakai ulang."""
+    if os.path.exists(out_path):
+        return out_path
+
+    reference = pd.read_csv(reference_path)
+    profile = fit_profile(reference)
+    rng = np.random.default_rng(seed)
+    n_rows = len(reference) * scale
+
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    tmp_path = out_path + '.tmp'
+    written = 0
+    with open(tmp_path, 'w', newline='') as f:
+        while written < n_rows:
+            chunk = generate_rows(profile, min(CHUNK_ROWS, n_rows - written), rng, start_id=written + 1)
+            chunk.to_csv(f, header=(written == 0), index=False)
+            written += len(chunk)
+    os.replace(tmp_path, out_path)
+    return out_path
@@ -0,0 +1,108 @@
+"""Eksekusi paralel untuk agregat dashboard, tanpa ketergantungan pada Streamlit.
+
+`AggregateExecutor` menyediakan tiga tingkat paralelisme yang dipakai `analytics`:
+
+- `map`: tugas independen (agregat per tab dan KPI) dijalankan bersamaan di thread pool.
+- `map_partitions`: posisi seleksi cube yang besar dibagi menjadi rentang berurutan di thread pool
+  terpisah; numpy dan pandas melepas GIL pada loop intinya.
+- `map_frame`: baris mentah yang besar dibagi per rentang baris ke process pool (mis. membangun cube),
+  atau ke thread pool partisi bila `processes=False`.
+
+Hasil selalu dikembalikan dalam urutan tugas atau partisi, dan pemanggil menggabungkan total parsial
+(jumlah dan hitungan) dengan penjumlahan bilangan bulat, sehingga hasilnya identik dengan jalur serial
+berapa pun jumlah worker-nya.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def default_workers():
+    """Jumlah core yang boleh dipakai proses ini (affinity CPU bila tersedia)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class AggregateExecutor:
+    """Thread pool untuk agregat dan partisi seleksi, serta process pool untuk partisi baris mentah.
+
+    Pool dibuat saat pertama kali dibutuhkan. Dengan `workers=1` semua metode berjalan serial di thread
+    pemanggil. `partition_rows` dan `process_rows` adalah ukuran minimum satu partisi; input yang lebih
+    kecil tidak dipecah karena ongkos koordinasinya melebihi penghematannya.
+
+    Di dalam server Streamlit gunakan `processes=False`: Streamlit mengganti modul `__main__` dengan skrip
+    dashboard sehingga worker spawn/forkserver akan menjalankan ulang skrip itu, sedangkan fork tidak aman
+    pada proses yang menjalankan banyak thread.
+    """
+
+    def __init__(self, workers=None, partition_rows=250_000, process_rows=1_000_000, processes=True):
+        self.workers = max(1, workers or default_workers())
+        self.partition_rows = partition_rows
+        self.process_rows = process_rows
+        self.processes = processes
+        self._lock = threading.Lock()
+        self._tasks = None
+        self._partitions = None
+        self._processes = None
+
+    @property
+    def parallel(self):
+        return self.workers > 1
+
+    def _pool(self, attr, factory):
+        with self._lock:
+            if getattr(self, attr) is None:
+                setattr(self, attr, factory())
+            return getattr(self, attr)
+
+    def slices(self, n, min_rows):
+        """Rentang berurutan yang menutupi 0..n, paling banyak satu per worker dan minimal `min_rows` baris."""
+        k = max(1, min(self.workers, n // max(min_rows, 1)))
+        bounds = [n * i // k for i in range(k + 1)]
+        return [slice(lo, hi) for lo, hi in zip(bounds, bounds[1:])]
+
+    def map(self, fn, items):
+        """`fn` untuk setiap item secara bersamaan; hasil dalam urutan item."""
+        items = list(items)
+        if not self.parallel or len(items) < 2:
+            return [fn(item) for item in items]
+        pool = self._pool('_tasks', lambda: ThreadPoolExecutor(self.workers, thread_name_prefix='pb-agg'))
+        return list(pool.map(fn, items))
+
+    def map_partitions(self, fn, n):
+        """`fn(slice)` untuk setiap partisi posisi 0..n; hasil parsial dalam urutan partisi.
+
+        Memakai pool terpisah dari `map` agar agregat yang sedang berjalan di pool tugas dapat
+        menunggu partisinya tanpa deadlock.
+        """
+        parts = self.slices(n, self.partition_rows)
+        if len(parts) < 2:
+            return [fn(part) for part in parts]
+        pool = self._pool('_partitions', lambda: ThreadPoolExecutor(self.workers, thread_name_prefix='pb-part'))
+        return list(pool.map(fn, parts))
+
+    def map_frame(self, fn, frame):
+        """`fn(potongan frame)` per rentang baris di process pool; hasil parsial dalam urutan baris.
+
+        `fn` harus fungsi tingkat modul (dapat di-pickle). Worker dimulai lewat forkserver/spawn, bukan fork.
+        """
+        parts = self.slices(len(frame), self.process_rows)
+        if len(parts) < 2:
+            return [fn(frame)]
+        if not self.processes:
+            pool = self._pool('_partitions', lambda: ThreadPoolExecutor(self.workers, thread_name_prefix='pb-part'))
+            return list(pool.map(fn, [frame.iloc[part] for part in parts]))
+        context = multiprocessing.get_context(
+            'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+        pool = self._pool('_processes', lambda: ProcessPoolExecutor(self.workers, mp_context=context))
+        return list(pool.map(fn, [frame.iloc[part] for part in parts]))
+
+    def shutdown(self):
+        with self._lock:
+            for attr in ('_tasks', '_partitions', '_processes'):
+                pool = getattr(self, attr)
+                if pool is not None:
+                    pool.shutdown(cancel_futures=True)
+                    setattr(self, attr, None)
@@ -0,0 +1,108 @@
+"""Precompute saat deploy: memanaskan snapshot dan menulis view termaterialisasi sebelum server dimulai.
+
+Langkah-langkahnya:
+1. Memuat dataset sekali (jalur yang sama dengan `load_data()`), sehingga snapshot Arrow sudah tersedia
+   dan proses server pertama tidak perlu mem-parse CSV.
+2. Menghitung semua agregat per tab dan teks generate_conclusion_* untuk view default ditambah daftar
+   kombinasi filter populer, bersamaan di AggregateExecutor.
+3. Menulis hasilnya ke store berversi di samping CSV (`<csv>.<mode>.views.pkl`). Dashboard memuat store
+   itu saat startup dan melayani state filter yang cocok tanpa filter maupun agregasi; store otomatis
+   diabaikan bila CSV berubah (versi dataset berbeda).
+
+Kombinasi filter ditulis dalam format query string API (lihat api.py), satu per baris; baris kosong
+berarti view default dan baris berawalan '#' diabaikan:
+
+    season=Winter,Fall&age_min=25&age_max=50
+    category=Clothing&payment_method=Cash,PayPal
+
+Contoh:
+    python -m precompute --combos deploy/popular_filters.txt --workers 4
+    PB_COMPACT=1 python -m precompute --compact && streamlit run app.py
+"""
+import argparse
+import sys
+import time
+
+from analytics import (
+    CONCLUSIONS,
+    AggregationContext,
+    build_data,
+    make_filter_key,
+    materialize_view,
+    write_view_store,
+)
+from api import parse_filters
+from backends import BACKENDS, PandasBackend, open_backend
+from parallel import AggregateExecutor
+
+
+def read_combos(paths, queries):
+    """Query string kombinasi filter dari file (satu per baris) dan argumen `--combo`; view default selalu ada."""
+    combos = ['']
+    for path in paths:
+        with open(path) as f:
+            combos.extend(line.strip() for line in f if not line.lstrip().startswith('#'))
+    combos.extend(queries)
+    return list(dict.fromkeys(combos))
+
+
+def precompute(backend, info, combos, executor):
+    """{filter_key: view} untuk setiap kombinasi, dihitung bersamaan; kombinasi dengan kunci sama dihitung sekali."""
+    states = {}
+    for query in combos:
+        selections, age_range = parse_filters(query, info)
+        states.setdefault(make_filter_key(selections, age_range), (selections, age_range))
+
+    def materialize(item):
+        key, (selections, age_range) = item
+        # Paralel per kombinasi atas satu backend bersama: filter_cube setiap backend aman dipanggil dari banyak
+        # thread (DuckDB memakai cursor per query; diuji benchmarks.parity --threads). Agregat di dalam satu
+        # kombinasi serial agar pool tugas tidak saling menunggu
+        ctx = AggregationContext(backend.filter_cube(selections, age_range), key=key)
+        return key, materialize_view(ctx, CONCLUSIONS.values())
+
+    return dict(executor.map(materialize, states.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='shopping_behavior_updated.csv')
+    parser.add_argument('--backend', default='pandas', choices=list(BACKENDS),
+                        help="backend query yang sama dengan PB_BACKEND dashboard")
+    parser.add_argument('--compact', action='store_true', help="mode kompak (PB_COMPACT=1)")
+    parser.add_argument('--stream', action='store_true', help="bangun cube secara streaming (PB_STREAM=1)")
+    parser.add_argument('--combos', action='append', default=[], metavar='FILE',
+                        help="file kombinasi filter populer (boleh diulang)")
+    parser.add_argument('--combo', action='append', default=[], metavar='QUERY',
+                        help="satu kombinasi filter dalam format query string (boleh diulang)")
+    parser.add_argument('--workers', type=int, default=0, help="worker paralel (0 = semua core)")
+    args = parser.parse_args(argv)
+
+    executor = AggregateExecutor(args.workers)
+    try:
+        began = time.perf_counter()
+        if args.backend != 'pandas':
+            backend = open_backend(args.backend, args.csv, compact=args.compact)
+            info = backend.describe()
+        else:
+            info = build_data(args.csv, args.compact, args.stream, executor=executor)
+            backend = PandasBackend(info, executor)
+        loaded = time.perf_counter()
+
+        try:
+            combos = read_combos(args.combos, args.combo)
+            entries = precompute(backend, info, combos, executor)
+        except ValueError as exc:
+            parser.error(str(exc))
+        path = write_view_store(args.csv, info['version'], entries, args.compact)
+    finally:
+        executor.shutdown()
+    print(
+        f"{len(entries)} view ditulis ke {path} (muat {loaded - began:.2f}s, "
+        f"precompute {time.perf_counter() - loaded:.2f}s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == '__main__':
+    main()
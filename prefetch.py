@@ -0,0 +1,191 @@
+"""Prefetch spekulatif state filter berikutnya di thread latar, tanpa ketergantungan pada Streamlit.
+
+Pengguna umumnya mengubah satu filter per interaksi: menambah/melepas satu lokasi, kategori, atau musim,
+atau menggeser rentang usia sedikit. `neighbor_states` menurunkan state-state itu dari state sekarang,
+dan `Prefetcher` menghitungnya satu per satu saat tidak ada request nyata, lalu hasilnya disimpan di
+`ResultCache` sehingga interaksi berikutnya cukup berupa lookup cache.
+
+Batasan kerja latar:
+- Anggaran CPU: setelah menghitung satu state selama t detik CPU, worker tidur t * (1 - b) / b detik,
+  sehingga porsinya paling banyak `cpu_budget` (b) dari satu core.
+- Pembatalan: selama request nyata berjalan (`foreground()`), worker tidak memulai state baru dan fungsi
+  compute diberi `should_stop()` untuk berhenti di batas agregat berikutnya; rencana sesi yang mengirim
+  request dibuang, karena state-nya sudah berubah.
+- Worker baru mulai `idle_s` detik setelah request nyata terakhir selesai.
+"""
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+
+# Pergeseran batas usia yang dicoba, dari yang paling mungkin
+AGE_STEPS = (1, 5)
+
+
+def neighbor_states(selections, age_range, options, age_bounds, age_steps=AGE_STEPS):
+    """State filter yang berjarak satu interaksi dari state sekarang, urut dari yang paling mungkin.
+
+    Pertama geser batas usia, lalu tambah/lepas satu nilai per kolom; kolom dengan opsi lebih sedikit
+    didahulukan karena setiap nilainya lebih mungkin disentuh.
+    """
+    lo, hi = age_bounds
+    a, b = age_range
+    for step in age_steps:
+        for candidate in ((a - step, b), (a + step, b), (a, b - step), (a, b + step)):
+            if lo <= candidate[0] <= candidate[1] <= hi:
+                yield selections, candidate
+    for col in sorted(options, key=lambda col: len(options[col])):
+        current = set(selections[col])
+        for value in options[col]:
+            yield {**selections, col: [v for v in options[col] if (v in current) != (v == value)]}, age_range
+
+
+class ResultCache:
+    """Cache LRU thread-safe untuk hasil prefetch (mis. AggregationContext per state filter)."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class Prefetcher:
+    """Satu thread worker per proses yang menjalankan rencana prefetch semua sesi secara bergiliran.
+
+    Rencana sesi adalah iterable state `(selections, age_range)` dan fungsi
+    `compute(selections, age_range, should_stop)` yang mengembalikan True bila state selesai dihitung,
+    False bila dihentikan `should_stop()`, dan None bila state sudah ada di cache.
+    """
+
+    def __init__(self, cpu_budget=0.25, idle_s=0.3):
+        self.cpu_budget = cpu_budget
+        self.idle_s = idle_s
+        self.computed = 0
+        self.skipped = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.cpu_s = 0.0
+        self._plans = OrderedDict()
+        self._active = 0
+        self._last_foreground = 0.0
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+
+    @contextlib.contextmanager
+    def foreground(self, session=None):
+        """Menandai request nyata: worker berhenti di batas berikutnya dan rencana `session` dibuang."""
+        with self._cond:
+            self._active += 1
+            self._plans.pop(session, None)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._last_foreground = time.monotonic()
+                self._cond.notify_all()
+
+    def should_stop(self):
+        return self._active > 0 or self._closed
+
+    def submit(self, session, states, compute):
+        """Mengganti rencana prefetch `session`; state dihitung malas, jadi `states` boleh berupa generator."""
+        with self._cond:
+            self._plans[session] = (iter(states), compute)
+            self._plans.move_to_end(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pb-prefetch', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._plans.clear()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'sessions': len(self._plans),
+                'computed': self.computed,
+                'skipped': self.skipped,
+                'cancelled': self.cancelled,
+                'failed': self.failed,
+                'cpu_s': self.cpu_s,
+            }
+
+    def _next(self):
+        """Menunggu sampai ada rencana dan tidak ada request nyata selama `idle_s`; giliran antar sesi round-robin."""
+        with self._cond:
+            while not self._closed:
+                if not self._plans or self._active:
+                    self._cond.wait()
+                    continue
+                wait = self._last_foreground + self.idle_s - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                session, (states, compute) = next(iter(self._plans.items()))
+                state = next(states, None)
+                if state is None:
+                    del self._plans[session]
+                    continue
+                self._plans.move_to_end(session)
+                return state, compute
+            return None
+
+    def _run(self):
+        while True:
+            task = self._next()
+            if task is None:
+                return
+            (selections, age_range), compute = task
+            started = time.thread_time()
+            try:
+                done = compute(selections, age_range, self.should_stop)
+            except Exception:
+                # Prefetch bersifat spekulatif: kegagalannya tidak boleh mengganggu sesi mana pun
+                done, failed = False, True
+            else:
+                failed = False
+            spent = time.thread_time() - started
+            with self._cond:
+                self.cpu_s += spent
+                if failed:
+                    self.failed += 1
+                elif done:
+                    self.computed += 1
+                elif done is None:
+                    self.skipped += 1
+                else:
+                    self.cancelled += 1
+            if self.cpu_budget < 1:
+                time.sleep(spent * (1 - self.cpu_budget) / self.cpu_budget)
@@ -0,0 +1,200 @@
+"""Instrumentasi waktu per tahap untuk satu rerun dashboard, tanpa ketergantungan pada Streamlit.
+
+Setiap rerun membuka sebuah `RunProfile` untuk thread skrip yang sedang berjalan. Tahap-tahap
+(pemuatan data, filter, agregat, build figur, kesimpulan, serialisasi) dicatat dengan `stage()`
+atau dekorator `profiled()`, lengkap dengan jumlah baris dan ukuran payload. Saat tidak ada profil
+aktif, `stage()` mengembalikan objek no-op bersama dan `profiled()` langsung memanggil fungsi aslinya.
+"""
+import contextlib
+import functools
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+# --- Profil per Rerun ---
+_local = threading.local()
+
+
+class _NullStage:
+    """Tahap no-op yang dipakai saat profiling mati; satu instance dipakai bersama."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """Satu pengukuran tahap; `set(rows=..., bytes=...)` menambahkan metrik sebelum tahap ditutup."""
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.record = {'stage': name, 'depth': profile.depth}
+
+    def __enter__(self):
+        self.profile.depth += 1
+        self._start = time.perf_counter()
+        self.record['start'] = self._start - self.profile._start
+        return self
+
+    def __exit__(self, *exc):
+        self.record['seconds'] = time.perf_counter() - self._start
+        self.profile.depth -= 1
+        self.profile.stages.append(self.record)
+        return False
+
+    def set(self, **fields):
+        self.record.update(fields)
+
+
+class RunProfile:
+    """Catatan tahap-tahap satu rerun; `start` tiap tahap relatif terhadap awal rerun (detik)."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.seconds = None
+        self.depth = 0
+        self.stages = []
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._start
+        return self
+
+    def to_dict(self):
+        return {
+            'started_at': self.started_at,
+            'seconds': self.seconds,
+            'stages': self.stages,
+        }
+
+
+def start_run():
+    """Membuka profil baru untuk thread ini (menggantikan profil rerun sebelumnya yang tidak ditutup)."""
+    _local.profile = RunProfile()
+    return _local.profile
+
+
+def finish_run():
+    """Menutup profil aktif thread ini dan mengembalikannya, atau None bila profiling tidak aktif."""
+    profile = getattr(_local, 'profile', None)
+    _local.profile = None
+    return profile.finish() if profile is not None else None
+
+
+def stage(name):
+    """Context manager pengukur satu tahap pada profil aktif; no-op bila tidak ada profil."""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        return NULL_STAGE
+    return profile.stage(name)
+
+
+def profiled(name):
+    """Dekorator: mencatat setiap pemanggilan sebagai tahap `name` (ukuran hasil string dicatat sebagai byte)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profile = getattr(_local, 'profile', None)
+            if profile is None:
+                return fn(*args, **kwargs)
+            with profile.stage(name) as s:
+                result = fn(*args, **kwargs)
+                if isinstance(result, str):
+                    s.set(bytes=len(result.encode()))
+            return result
+        return wrapper
+    return decorator
+
+
+# --- Sink: Log Terstruktur dan Prometheus ---
+class StageMetrics:
+    """Akumulasi per tahap lintas rerun (jumlah, total detik, maksimum, baris dan byte) untuk eksposisi Prometheus."""
+
+    def __init__(self):
+        self.runs = 0
+        self.run_seconds = 0.0
+        self._stages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self.runs += 1
+            self.run_seconds += profile.seconds or 0.0
+            for record in profile.stages:
+                agg = self._stages.setdefault(
+                    record['stage'], {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'bytes': 0})
+                agg['count'] += 1
+                agg['seconds'] += record['seconds']
+                agg['max_seconds'] = max(agg['max_seconds'], record['seconds'])
+                agg['rows'] += record.get('rows') or 0
+                agg['bytes'] += record.get('bytes') or 0
+
+    def to_prometheus(self):
+        """Teks dalam format eksposisi Prometheus (cocok untuk textfile collector node_exporter)."""
+        with self._lock:
+            lines = [
+                '# HELP pb_runs_total Jumlah rerun dashboard yang diprofil.',
+                '# TYPE pb_runs_total counter',
+                f'pb_runs_total {self.runs}',
+                '# HELP pb_run_seconds_total Total durasi rerun dalam detik.',
+                '# TYPE pb_run_seconds_total counter',
+                f'pb_run_seconds_total {self.run_seconds:.6f}',
+            ]
+            series = [
+                ('pb_stage_calls_total', 'counter', 'Jumlah pemanggilan per tahap.', 'count', 'd'),
+                ('pb_stage_seconds_total', 'counter', 'Total durasi per tahap dalam detik.', 'seconds', '.6f'),
+                ('pb_stage_seconds_max', 'gauge', 'Durasi terlama per tahap dalam detik.', 'max_seconds', '.6f'),
+                ('pb_stage_rows_total', 'counter', 'Total baris yang diproses per tahap.', 'rows', 'd'),
+                ('pb_stage_bytes_total', 'counter', 'Total ukuran payload per tahap dalam byte.', 'bytes', 'd'),
+            ]
+            for metric, kind, help_text, field, fmt in series:
+                lines.append(f'# HELP {metric} {help_text}')
+                lines.append(f'# TYPE {metric} {kind}')
+                for name, agg in self._stages.items():
+                    label = name.replace('\\', '\\\\').replace('"', '\\"')
+                    lines.append(f'{metric}{{stage="{label}"}} {agg[field]:{fmt}}')
+            return '\n'.join(lines) + '\n'
+
+
+def append_jsonl(profile, path):
+    """Menambahkan satu baris JSON per rerun ke `path`; kegagalan tulis diabaikan."""
+    try:
+        with open(path, 'a') as f:
+            f.write(json.dumps(profile.to_dict(), default=str) + '\n')
+    except OSError:
+        pass
+
+
+def write_prometheus(metrics, path):
+    """Menulis ulang file teks Prometheus secara atomik (file sementara lalu rename).
+
+    Setiap penulisan memakai file sementara unik di direktori yang sama, sehingga rerun sesi yang bersamaan
+    tidak saling menimpa file sementara; rename terakhir yang menang.
+    """
+    tmp = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            'w', dir=os.path.dirname(path) or '.', prefix=os.path.basename(path) + '.', suffix='.tmp', delete=False,
+        ) as f:
+            tmp = f.name
+            f.write(metrics.to_prometheus())
+        os.replace(tmp, path)
+    except OSError:
+        if tmp is not None:
+            with contextlib.suppress(OSError):
+                os.remove(tmp)
@@ -0,0 +1,157 @@
+"""Registry dataset dengan anggaran memori untuk melayani banyak ekspor CSV dari satu server dashboard.
+
+Setiap CSV di direktori yang dikonfigurasi (mis. ekspor per region atau per bulan) menjadi satu dataset
+yang dimuat malas saat pertama dipilih, lengkap dengan cube, indeks, dan (opsional) sketch-nya. Total
+memori semua dataset yang dimuat dibatasi; bila anggaran terlampaui, dataset yang paling lama tidak
+dipakai (LRU) dilepas. Dataset yang sedang diminta tidak pernah dilepas, meskipun ia sendiri lebih
+besar dari anggaran.
+
+Memori yang tercatat adalah perkiraan ukuran paket data (frame, cube, indeks bitmap, grup cube, sketch).
+Dataset yang dilepas baru benar-benar dibebaskan setelah tidak ada sesi yang masih memegang irisannya.
+Modul ini tidak bergantung pada Streamlit.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from analytics import dataset_version, source_signature
+
+
+def dataset_nbytes(data):
+    """Perkiraan byte paket data: frame dan cube (deep), bitmap dan urutan usia indeks, serta id grup cube."""
+    total = 0
+    for frame in (data.get('df'), data['cube']):
+        if frame is not None:
+            total += int(frame.memory_usage(index=True, deep=True).sum())
+    index = data['cube_index']
+    total += sum(bits.nbytes for bitmaps in index['bitmaps'].values() for bits in bitmaps.values())
+    total += index['age_order'].nbytes + index['age_sorted'].nbytes
+    total += sum(ids.nbytes for ids, _ in data['cube_groups'].values())
+    if data.get('sketches') is not None:
+        total += sketch_nbytes(data['sketches'])
+    return total
+
+
+def sketch_nbytes(sketches):
+    """Perkiraan byte SketchSet: sampel reservoir (deep) serta larik Count-Min, HyperLogLog, dan kuantil per partisi."""
+    sample = sketches.reservoir.sample
+    total = int(sample.memory_usage(index=True, deep=True).sum()) if sample is not None else 0
+    for partition in sketches.partitions.values():
+        total += sum(cms.table.nbytes for cms in partition['cms'].values())
+        total += sum(hll.registers.nbytes for hll in partition['hll'].values())
+        total += sum(level.nbytes for quantiles in partition['quantiles'].values() for level in quantiles.levels)
+    return total
+
+
+class DatasetRegistry:
+    """Dataset CSV dalam `directory`, dimuat lewat `loader(path)` dan dilepas secara LRU di atas `budget_bytes`.
+
+    `get()` aman dipanggil dari banyak sesi sekaligus: dataset yang sama hanya dimuat sekali, dan
+    dimuat ulang bila ukuran atau mtime CSV-nya berubah.
+    """
+
+    def __init__(self, directory, loader, budget_bytes=1024 ** 3, extensions=('.csv',)):
+        self.directory = directory
+        self.loader = loader
+        self.budget_bytes = budget_bytes
+        self.extensions = extensions
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        """Nama file dataset yang tersedia di direktori, terurut."""
+        try:
+            files = os.listdir(self.directory)
+        except OSError:
+            return []
+        return sorted(
+            name for name in files
+            if name.endswith(self.extensions) and os.path.isfile(os.path.join(self.directory, name))
+        )
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _stat(self, name):
+        return self._stats.setdefault(name, {'hits': 0, 'loads': 0, 'evictions': 0, 'load_s': 0.0})
+
+    def get(self, name):
+        """Paket data untuk dataset `name`, dari memori bila masih valid atau dimuat (lalu LRU ditegakkan).
+
+        KeyError bila dataset tidak dikenal atau filenya hilang/tidak terbaca sebelum selesai dimuat (mis.
+        dihapus setelah daftar dataset ditampilkan).
+        """
+        if name not in self.names():
+            raise KeyError(f"Dataset tidak dikenal: {name}")
+        try:
+            version = dataset_version(self.path(name), source_signature(self.path(name)))
+        except OSError as exc:
+            raise KeyError(f"Dataset tidak dapat dibaca: {name} ({exc})") from exc
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry['data']['version'] == version:
+                self._entries.move_to_end(name)
+                self._stat(name)['hits'] += 1
+                return entry['data']
+            load_lock = self._loading.setdefault(name, threading.Lock())
+
+        with load_lock:
+            # Sesi lain mungkin sudah memuat dataset ini selama kita menunggu
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None and entry['data']['version'] == version:
+                    self._entries.move_to_end(name)
+                    self._stat(name)['hits'] += 1
+                    return entry['data']
+            began = time.perf_counter()
+            try:
+                data = self.loader(self.path(name))
+            except OSError as exc:
+                raise KeyError(f"Dataset tidak dapat dibaca: {name} ({exc})") from exc
+            elapsed = time.perf_counter() - began
+            nbytes = dataset_nbytes(data)
+            with self._lock:
+                stat = self._stat(name)
+                stat['loads'] += 1
+                stat['load_s'] += elapsed
+                self._entries[name] = {'data': data, 'nbytes': nbytes}
+                self._entries.move_to_end(name)
+                self._evict(keep=name)
+            return data
+
+    def _evict(self, keep):
+        """Melepas dataset LRU (kecuali `keep`) sampai total memori kembali di bawah anggaran."""
+        for name in list(self._entries):
+            if self.nbytes() <= self.budget_bytes:
+                return
+            if name != keep:
+                del self._entries[name]
+                self._stat(name)['evictions'] += 1
+                self.evictions += 1
+
+    def nbytes(self):
+        return sum(entry['nbytes'] for entry in self._entries.values())
+
+    def stats(self):
+        """Statistik per dataset (memori, hit, muat, pelepasan) beserta total terhadap anggaran."""
+        with self._lock:
+            datasets = [
+                {
+                    'dataset': name,
+                    'loaded': name in self._entries,
+                    'mb': self._entries[name]['nbytes'] / 1024 ** 2 if name in self._entries else 0.0,
+                    'rows': self._entries[name]['data']['n_rows'] if name in self._entries else None,
+                    **self._stat(name),
+                }
+                for name in self.names()
+            ]
+            return {
+                'datasets': datasets,
+                'total_mb': self.nbytes() / 1024 ** 2,
+                'budget_mb': self.budget_bytes / 1024 ** 2,
+                'evictions': self.evictions,
+            }
@@ -0,0 +1,255 @@
+"""Struktur data probabilistik yang dapat digabung (mergeable) untuk mode perkiraan dashboard.
+
+Semua sketch dibangun satu kali saat ingest, dapat di-update per chunk, dan dapat digabung antar partisi
+atau antar chunk. Setiap sketch menyediakan batas galat untuk nilai yang dilaporkannya:
+
+- `CountMinSketch`: frekuensi per kunci (heavy hitters), galat <= eps * N dengan peluang 1 - delta.
+- `HyperLogLog`: jumlah nilai berbeda, galat relatif standar 1.04 / sqrt(m).
+- `QuantileSketch`: CDF/kuantil bergaya KLL, batas galat rank dihitung dari kompaksi yang terjadi.
+- `Reservoir`: sampel acak seragam berukuran tetap (algoritme R), untuk estimasi dengan filter apa pun.
+
+Modul ini hanya bergantung pada numpy dan pandas; hash bersifat deterministik antar proses.
+"""
+import hashlib
+import math
+
+import numpy as np
+import pandas as pd
+
+# Nilai z untuk selang kepercayaan 95%
+Z_95 = 1.96
+
+
+def hash64(values, seed=0):
+    """Hash 64-bit deterministik per nilai: integer di-hash vektorial (splitmix64), selain itu per nilai unik (blake2b)."""
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if pd.api.types.is_integer_dtype(values.dtype):
+        x = values.to_numpy().astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+        with np.errstate(over='ignore'):
+            x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    hashed = np.array([
+        int.from_bytes(hashlib.blake2b(f'{seed}:{u}'.encode(), digest_size=8).digest(), 'little')
+        for u in uniques
+    ], dtype=np.uint64)
+    return hashed[codes]
+
+
+# --- Count-Min Sketch ---
+class CountMinSketch:
+    """Frekuensi per kunci dengan galat satu arah (tidak pernah di bawah nilai sebenarnya)."""
+
+    def __init__(self, eps=0.005, delta=0.01, seed=0):
+        self.eps = eps
+        self.delta = delta
+        self.seed = seed
+        self.width = math.ceil(math.e / eps)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+
+    def _buckets(self, keys):
+        return [(hash64(keys, seed=self.seed * 1000 + d) % np.uint64(self.width)).astype(np.intp)
+                for d in range(self.depth)]
+
+    def add(self, keys, weights=None):
+        keys = pd.Series(keys)
+        codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+        counts = np.bincount(codes, weights=weights, minlength=len(uniques)).astype(np.int64)
+        for d, buckets in enumerate(self._buckets(pd.Series(uniques))):
+            np.add.at(self.table[d], buckets, counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, keys):
+        """Perkiraan frekuensi untuk setiap kunci (array), batas atas dari nilai sebenarnya."""
+        buckets = self._buckets(pd.Series(keys))
+        return np.min([self.table[d, b] for d, b in enumerate(buckets)], axis=0)
+
+    def error_bound(self):
+        """Galat aditif maksimum eps * N (berlaku dengan peluang 1 - delta per kunci)."""
+        return self.eps * self.total
+
+    def merge(self, other):
+        merged = CountMinSketch(self.eps, self.delta, self.seed)
+        merged.table = self.table + other.table
+        merged.total = self.total + other.total
+        return merged
+
+
+# --- HyperLogLog ---
+class HyperLogLog:
+    """Perkiraan jumlah nilai berbeda dengan 2**p register."""
+
+    def __init__(self, p=12, seed=0):
+        self.p = p
+        self.seed = seed
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def add(self, values):
+        h = hash64(values, seed=self.seed)
+        if not len(h):
+            return
+        rest_bits = 64 - self.p
+        index = (h >> np.uint64(rest_bits)).astype(np.intp)
+        rest = (h & np.uint64((1 << rest_bits) - 1)).astype(np.float64)
+        # frexp memberi panjang bit secara eksak karena rest < 2**52; rho = posisi bit 1 pertama dari kiri
+        rho = (rest_bits - np.frexp(rest)[1] + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rho)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Koreksi rentang kecil (linear counting)
+            return m * math.log(m / zeros)
+        return raw
+
+    def relative_error(self):
+        """Galat relatif standar 1.04 / sqrt(m)."""
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def error_bound(self):
+        """Galat absolut pada selang kepercayaan ~95% (dua kali galat standar)."""
+        return 2 * self.relative_error() * self.estimate()
+
+    def merge(self, other):
+        merged = HyperLogLog(self.p, self.seed)
+        merged.registers = np.maximum(self.registers, other.registers)
+        return merged
+
+
+# --- Quantile Sketch (KLL) ---
+class QuantileSketch:
+    """Sketch kuantil bergaya KLL: level h menyimpan item berbobot 2**h, dipadatkan bila melebihi kapasitas k.
+
+    Setiap kompaksi di level h menggeser rank suatu query paling banyak 2**h dengan arah acak,
+    sehingga variansnya diakumulasi untuk batas galat rank pada selang kepercayaan 95%.
+    """
+
+    def __init__(self, k=256, seed=0):
+        self.k = k
+        self.seed = seed
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self.variance = 0.0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            if len(self.levels[h]) > self.k:
+                items = np.sort(self.levels[h])
+                # Jumlah item genap agar bobot total tetap; sisa satu item tinggal di level ini
+                keep = items[len(items) - len(items) % 2:]
+                items = items[:len(items) - len(items) % 2]
+                promoted = items[self._rng.integers(2)::2]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = keep
+                self.variance += 4.0 ** h
+            h += 1
+
+    def rank(self, x):
+        """Perkiraan jumlah item <= x."""
+        return sum(
+            np.searchsorted(np.sort(level), x, side='right') * (1 << h)
+            for h, level in enumerate(self.levels)
+        )
+
+    def cdf(self, x):
+        return self.rank(x) / self.n if self.n else 0.0
+
+    def quantile(self, q):
+        """Nilai pada kuantil q (0..1) dari item berbobot."""
+        if not self.n:
+            return float('nan')
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 1 << h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        return float(items[order][min(np.searchsorted(cumulative, q * cumulative[-1]), len(items) - 1)])
+
+    def rank_error_bound(self):
+        """Galat rank absolut pada selang kepercayaan ~95%."""
+        return Z_95 * math.sqrt(self.variance)
+
+    def merge(self, other):
+        # RNG baru per merge, diturunkan dari seed dan ukuran kedua sisi: sumber tidak ikut berubah
+        merged = QuantileSketch(self.k, self.seed)
+        merged._rng = np.random.default_rng([self.seed, other.seed, self.n, other.n])
+        merged.n = self.n + other.n
+        merged.variance = self.variance + other.variance
+        size = max(len(self.levels), len(other.levels))
+        merged.levels = [
+            np.concatenate([
+                self.levels[h] if h < len(self.levels) else np.empty(0),
+                other.levels[h] if h < len(other.levels) else np.empty(0),
+            ])
+            for h in range(size)
+        ]
+        merged._compress()
+        return merged
+
+
+# --- Reservoir Sample ---
+class Reservoir:
+    """Sampel acak seragam berukuran tetap atas semua baris yang pernah dilihat (algoritme R, vektorial per chunk).
+
+    Urutan baris di dalam sampel tidak bermakna; slot yang diganti dipilih seragam sehingga sampel tetap seragam.
+    """
+
+    def __init__(self, size=100_000, seed=0):
+        self.size = size
+        self.seed = seed
+        self.seen = 0
+        self.sample = None
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, frame):
+        frame = frame.reset_index(drop=True)
+        if self.sample is None:
+            self.sample = frame.iloc[:0]
+        positions = np.arange(self.seen, self.seen + len(frame))
+        self.seen += len(frame)
+
+        fill = positions < self.size
+        parts = [self.sample, frame[fill]]
+        rest = np.flatnonzero(~fill)
+        if len(rest):
+            slots = self._rng.integers(0, positions[rest] + 1)
+            accepted = slots < self.size
+            # Penggantian yang lebih akhir menimpa yang lebih awal pada slot yang sama, seperti algoritme R
+            winners = pd.Series(rest[accepted], index=slots[accepted]).groupby(level=0).last()
+            sample = pd.concat(parts, ignore_index=True)
+            keep = np.ones(len(sample), dtype=bool)
+            keep[winners.index.to_numpy()] = False
+            parts = [sample[keep], frame.iloc[winners.to_numpy()]]
+        self.sample = pd.concat(parts, ignore_index=True)
+
+    def merge(self, other):
+        """Reservoir dari gabungan dua populasi terpisah: komposisi sampel diambil secara hipergeometrik."""
+        merged = Reservoir(self.size, self.seed)
+        merged._rng = rng = np.random.default_rng([self.seed, other.seed, self.seen, other.seen])
+        merged.seen = self.seen + other.seen
+        samples = [s.sample for s in (self, other) if s.sample is not None]
+        if sum(len(sample) for sample in samples) <= self.size:
+            merged.sample = pd.concat(samples, ignore_index=True) if samples else None
+            return merged
+        take = min(int(rng.hypergeometric(self.seen, other.seen, self.size)), len(self.sample))
+        merged.sample = pd.concat([
+            self.sample.sample(n=take, random_state=rng),
+            other.sample.sample(n=min(self.size - take, len(other.sample)), random_state=rng),
+        ], ignore_index=True)
+        return merged